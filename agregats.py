@@ -0,0 +1,187 @@
+import sqlite3
+import threading
+import time
+from zoneinfo import ZoneInfo
+
+import numpy as np
+import pandas as pd
+
+from historique import HISTORIQUE_DB
+
+# Niveaux d'agrégation, du plus fin au plus grossier (durée d'une tranche en secondes)
+NIVEAUX = {
+    '5min': 300,
+    'heure': 3600,
+    'jour': 86400,
+}
+
+# Nombre maximal de points affichés sur un graphique
+MAX_POINTS = 500
+
+FUSEAU = ZoneInfo("Europe/Paris")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS agregats (
+    pas INTEGER NOT NULL,
+    parking TEXT NOT NULL,
+    tranche INTEGER NOT NULL,
+    n INTEGER NOT NULL,
+    somme INTEGER NOT NULL,
+    minimum INTEGER NOT NULL,
+    maximum INTEGER NOT NULL,
+    PRIMARY KEY (pas, parking, tranche)
+) WITHOUT ROWID;
+
+-- Date du dernier relevé intégré par parking : rend l'ingestion idempotente
+CREATE TABLE IF NOT EXISTS agregats_derniers (
+    parking TEXT PRIMARY KEY,
+    ts INTEGER NOT NULL
+) WITHOUT ROWID;
+"""
+
+# Fusion d'un agrégat partiel avec la tranche déjà stockée
+_UPSERT = """
+INSERT INTO agregats (pas, parking, tranche, n, somme, minimum, maximum)
+VALUES (?, ?, ?, ?, ?, ?, ?)
+ON CONFLICT (pas, parking, tranche) DO UPDATE SET
+    n = n + excluded.n,
+    somme = somme + excluded.somme,
+    minimum = MIN(minimum, excluded.minimum),
+    maximum = MAX(maximum, excluded.maximum)
+"""
+
+_UPSERT_DERNIER = """
+INSERT INTO agregats_derniers (parking, ts) VALUES (?, ?)
+ON CONFLICT (parking) DO UPDATE SET ts = MAX(ts, excluded.ts)
+"""
+
+
+def tranches(ts, pas):
+    """Début de la tranche de `pas` secondes de chaque date (epoch)
+
+    Les tranches d'un jour commencent à minuit, heure de Paris (23 ou 25 h aux
+    changements d'heure) ; les autres sont des multiples de `pas` (le décalage
+    de Paris est un nombre entier d'heures).
+    """
+    ts = np.asarray(ts, dtype=np.int64)
+    if pas < NIVEAUX['jour']:
+        return ts // pas * pas
+    return pd.to_datetime(ts, unit='s', utc=True).tz_convert(FUSEAU).normalize().asi8 // 10**9
+
+
+def choisir_niveau(duree, max_points=MAX_POINTS):
+    """Niveau le plus fin dont le nombre de tranches sur `duree` secondes tient dans max_points"""
+    for niveau, pas in NIVEAUX.items():
+        if duree / pas <= max_points:
+            return niveau
+    return niveau
+
+
+class Agregats:
+    """Agrégats min / moyenne / max des places libres par parking, à 5 min, 1 h et 1 jour
+
+    Les tranches sont mises à jour de façon incrémentale à chaque sweep ; les
+    graphiques longue durée lisent ces tranches au lieu de l'historique brut.
+    Comme l'historique (INSERT OR REPLACE), l'ingestion est idempotente : un
+    relevé n'est compté que s'il est postérieur au dernier intégré pour son parking.
+    """
+
+    def __init__(self, chemin=HISTORIQUE_DB):
+        self.chemin = chemin
+        self._verrou = threading.Lock()
+        self._connexion = sqlite3.connect(chemin, check_same_thread=False, timeout=10)
+        self._connexion.execute("PRAGMA journal_mode=WAL")
+        self._connexion.execute("PRAGMA synchronous=NORMAL")
+        self._connexion.executescript(_SCHEMA)
+        self._derniers = dict(self._connexion.execute("SELECT parking, ts FROM agregats_derniers"))
+
+    def ajouter_releves(self, parkings, ts, places):
+        """Intègre un lot de relevés (tableaux parallèles parking / ts epoch / places libres)
+
+        Les relevés déjà intégrés (date antérieure ou égale au dernier relevé
+        intégré du parking) sont ignorés.
+        """
+        releves = pd.DataFrame({
+            'parking': np.asarray(parkings, dtype=object),
+            'ts': np.asarray(ts, dtype=np.int64),
+            'places': np.asarray(places, dtype=np.int64),
+        })
+        with self._verrou:
+            derniers = releves['parking'].map(self._derniers).fillna(-1).to_numpy(dtype=np.int64)
+        releves = releves[releves['ts'].to_numpy() > derniers]
+        if releves.empty:
+            return
+
+        lignes = []
+        for pas in NIVEAUX.values():
+            releves['tranche'] = tranches(releves['ts'].to_numpy(), pas)
+            partiel = (releves.groupby(['parking', 'tranche'], sort=False)['places']
+                       .agg(['count', 'sum', 'min', 'max'])
+                       .reset_index())
+            # tolist() convertit les entiers NumPy en int Python pour sqlite3
+            lignes.extend(zip(
+                [pas] * len(partiel),
+                partiel['parking'].tolist(),
+                partiel['tranche'].tolist(),
+                partiel['count'].tolist(),
+                partiel['sum'].tolist(),
+                partiel['min'].tolist(),
+                partiel['max'].tolist(),
+            ))
+
+        maxima = releves.groupby('parking', sort=False)['ts'].max()
+        maxima = list(zip(maxima.index.tolist(), maxima.tolist()))
+
+        with self._verrou, self._connexion:
+            self._connexion.executemany(_UPSERT, lignes)
+            self._connexion.executemany(_UPSERT_DERNIER, maxima)
+            for parking, dernier in maxima:
+                self._derniers[parking] = max(dernier, self._derniers.get(parking, dernier))
+
+    def ajouter(self, data, ts=None):
+        """Intègre un sweep complet (dict au format du cache)"""
+        ts = int(ts if ts is not None else time.time())
+        noms = list(data)
+        places = [int(data[nom]['Places']) for nom in noms]
+        self.ajouter_releves(noms, np.full(len(noms), ts), places)
+
+    def reconstruire(self, historique, taille_lot=500_000):
+        """Recalcule tous les agrégats à partir de l'historique brut (par lots)
+
+        L'historique est parcouru dans l'ordre de sa clé (parking, ts) : les
+        dates de chaque parking arrivent croissantes d'un lot à l'autre.
+        """
+        with self._verrou, self._connexion:
+            self._connexion.execute("DELETE FROM agregats")
+            self._connexion.execute("DELETE FROM agregats_derniers")
+            self._derniers.clear()
+        for lot in historique.parcourir(taille_lot=taille_lot):
+            parkings, ts, places, _ = zip(*lot)
+            self.ajouter_releves(parkings, ts, places)
+
+    def serie(self, parking, debut, fin=None, niveau=None):
+        """Agrégats d'un parking entre debut et fin (epoch)
+
+        Sans niveau explicite, choisit le niveau adapté à la durée demandée.
+        Retourne un DataFrame indexé par le début de tranche (heure de Paris)
+        avec les colonnes Moyenne, Minimum et Maximum.
+        """
+        fin = int(fin if fin is not None else time.time())
+        niveau = niveau or choisir_niveau(fin - debut)
+        pas = NIVEAUX[niveau]
+        with self._verrou:
+            lignes = self._connexion.execute(
+                "SELECT tranche, CAST(somme AS REAL) / n, minimum, maximum FROM agregats "
+                "WHERE pas = ? AND parking = ? AND tranche >= ? AND tranche <= ? ORDER BY tranche",
+                (pas, parking, int(tranches([int(debut)], pas)[0]), fin)
+            ).fetchall()
+
+        serie = pd.DataFrame(lignes, columns=['tranche', 'Moyenne', 'Minimum', 'Maximum'])
+        serie.index = pd.to_datetime(serie.pop('tranche'), unit='s', utc=True).dt.tz_convert(FUSEAU)
+        serie.index.name = 'Heure'
+        return serie
+
+    def fermer(self):
+        """Ferme la connexion SQLite"""
+        with self._verrou:
+            self._connexion.close()
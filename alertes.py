@@ -0,0 +1,354 @@
+"""Alertes sur seuils : « quand Carnot passe sous 10 % », « quand Méjanes rouvre »...
+
+Types de règles :
+    sous        taux de places libres (places / capacité) sous `seuil`
+    dessus      taux de places libres au-dessus de `seuil`
+    ouverture   le parking rouvre
+    fermeture   le parking ferme
+
+Les règles sont indexées par parking, et par seuil dans des listes triées : à
+chaque sweep, seules les règles des parkings dont le relevé a changé sont
+examinées, et parmi elles seulement celles dont le seuil a été franchi.
+
+Hystérésis : une règle déclenchée ne se réarme qu'une fois le taux repassé de
+l'autre côté du seuil d'au moins `hysteresis`. Anti-rebond : la condition doit
+être vraie sur `confirmations` relevés consécutifs avant l'envoi de l'alerte.
+
+PARKING_ALERTES     fichier des règles et des sorties (alertes.json par défaut)
+"""
+import json
+import os
+import queue
+import threading
+import time
+from bisect import bisect_left, bisect_right, insort
+
+import requests
+
+ALERTES_FILE = os.environ.get('PARKING_ALERTES', 'alertes.json')
+
+HYSTERESIS = 0.05
+CONFIRMATIONS = 2
+TYPES = ('sous', 'dessus', 'ouverture', 'fermeture')
+
+ARMEE, EN_ATTENTE, DECLENCHEE = 0, 1, 2
+
+
+class Regle:
+    """Abonnement d'un destinataire à une condition sur un parking"""
+
+    __slots__ = ('id', 'parking', 'type', 'seuil', 'sortie', 'abonne', 'hysteresis', 'confirmations',
+                 'etat', 'compteur')
+
+    def __init__(self, id, parking, type, seuil=None, sortie='fichier', abonne=None,
+                 hysteresis=HYSTERESIS, confirmations=CONFIRMATIONS):
+        if type not in TYPES:
+            raise ValueError(f"Type de règle inconnu : {type}")
+        if type in ('sous', 'dessus') and seuil is None:
+            raise ValueError(f"Seuil manquant pour la règle {id}")
+        self.id = id
+        self.parking = parking
+        self.type = type
+        self.seuil = seuil
+        self.sortie = sortie
+        self.abonne = abonne
+        self.hysteresis = hysteresis
+        self.confirmations = max(1, confirmations)
+        self.etat = ARMEE
+        self.compteur = 0
+
+    def condition(self, taux, ouvert):
+        """Vrai si la condition de la règle est remplie par ce relevé"""
+        if self.type == 'ouverture':
+            return ouvert
+        if self.type == 'fermeture':
+            return not ouvert
+        if not ouvert:
+            return False
+        return taux < self.seuil if self.type == 'sous' else taux > self.seuil
+
+    def rearmable(self, taux, ouvert):
+        """Vrai si la règle déclenchée peut se réarmer (condition levée, hystérésis comprise)"""
+        if self.type == 'ouverture':
+            return not ouvert
+        if self.type == 'fermeture':
+            return ouvert
+        if not ouvert:
+            return False
+        if self.type == 'sous':
+            return taux >= self.seuil + self.hysteresis
+        return taux <= self.seuil - self.hysteresis
+
+
+def _seuil(entree):
+    return entree[0]
+
+
+class ReglesParking:
+    """Règles d'un parking : seuils triés par type, transitions d'état et règles en attente"""
+
+    def __init__(self):
+        # Listes triées de (seuil, id), et de (seuil de réarmement, id) pour l'hystérésis
+        self.seuils = {'sous': [], 'dessus': [], 'sous_rearmement': [], 'dessus_rearmement': []}
+        self.etats = {'ouverture': set(), 'fermeture': set()}
+        self.en_attente = set()
+        self.taux = None
+        self.ouvert = None
+
+    def _cles(self, regle):
+        if regle.type == 'sous':
+            return [('sous', regle.seuil), ('sous_rearmement', regle.seuil + regle.hysteresis)]
+        return [('dessus', regle.seuil), ('dessus_rearmement', regle.seuil - regle.hysteresis)]
+
+    def ajouter(self, regle):
+        if regle.type in self.etats:
+            self.etats[regle.type].add(regle.id)
+            return
+        for liste, seuil in self._cles(regle):
+            insort(self.seuils[liste], (seuil, regle.id), key=_seuil)
+
+    def retirer(self, regle):
+        self.en_attente.discard(regle.id)
+        if regle.type in self.etats:
+            self.etats[regle.type].discard(regle.id)
+            return
+        for liste, seuil in self._cles(regle):
+            liste = self.seuils[liste]
+            i = bisect_left(liste, seuil, key=_seuil)
+            while liste[i][1] != regle.id:
+                i += 1
+            del liste[i]
+
+    def ids(self):
+        """Identifiants de toutes les règles du parking"""
+        return ([id for _, id in self.seuils['sous']] + [id for _, id in self.seuils['dessus']]
+                + list(self.etats['ouverture']) + list(self.etats['fermeture']))
+
+    def _entre(self, liste, bas, haut, inclure_bas, inclure_haut):
+        """Identifiants des règles dont le seuil est entre bas et haut"""
+        liste = self.seuils[liste]
+        debut = (bisect_left if inclure_bas else bisect_right)(liste, bas, key=_seuil)
+        fin = (bisect_right if inclure_haut else bisect_left)(liste, haut, key=_seuil)
+        return [id for _, id in liste[debut:fin]]
+
+    def candidates(self, taux, ouvert):
+        """Règles dont l'état peut changer entre le relevé précédent et celui-ci"""
+        a, b = self.taux, taux
+        ids = set(self.en_attente)
+        if ouvert != self.ouvert:
+            # Changement de statut : toutes les règles du parking peuvent basculer
+            ids.update(self.ids())
+            return ids
+        if not ouvert or a == b:
+            return ids
+        if b < a:
+            # Baisse : « sous » devenues vraies (b < seuil <= a), « dessus » réarmables (b <= seuil - h < a)
+            ids.update(self._entre('sous', b, a, False, True))
+            ids.update(self._entre('dessus_rearmement', b, a, True, False))
+        else:
+            # Hausse : « dessus » devenues vraies (a <= seuil < b), « sous » réarmables (a < seuil + h <= b)
+            ids.update(self._entre('dessus', a, b, True, False))
+            ids.update(self._entre('sous_rearmement', a, b, False, True))
+        return ids
+
+
+class MoteurAlertes:
+    """Règles de tous les parkings, évaluées à chaque sweep sur les seuls parkings modifiés"""
+
+    def __init__(self, sorties=None):
+        self.regles = {}
+        self.parkings = {}
+        self.sorties = dict(sorties or {})
+        self._verrou = threading.Lock()
+
+    def ajouter(self, regle):
+        """Ajoute une règle ; si sa condition est déjà vraie, elle ne se déclenchera qu'après réarmement"""
+        if regle.hysteresis < 0:
+            raise ValueError(f"Hystérésis négative pour la règle {regle.id}")
+        with self._verrou:
+            if regle.id in self.regles:
+                self._retirer(regle.id)
+            index = self.parkings.setdefault(regle.parking, ReglesParking())
+            if index.ouvert is not None and regle.condition(index.taux, index.ouvert):
+                regle.etat = DECLENCHEE
+            self.regles[regle.id] = regle
+            index.ajouter(regle)
+
+    def _retirer(self, id):
+        regle = self.regles.pop(id)
+        self.parkings[regle.parking].retirer(regle)
+
+    def retirer(self, id):
+        with self._verrou:
+            self._retirer(id)
+
+    def _premier_releve(self, index, releve):
+        """Premier relevé d'un parking : les conditions déjà vraies ne déclenchent pas d'alerte"""
+        index.taux, index.ouvert = _observation(releve)
+        for id in index.ids():
+            regle = self.regles[id]
+            regle.etat = DECLENCHEE if regle.condition(index.taux, index.ouvert) else ARMEE
+            regle.compteur = 0
+        index.en_attente.clear()
+
+    def initialiser(self, data):
+        """Enregistre l'état courant des parkings sans envoyer d'alerte (ex. au démarrage)"""
+        with self._verrou:
+            for nom, releve in data.items():
+                if releve['Statut'] != '❌ Erreur':
+                    self._premier_releve(self.parkings.setdefault(nom, ReglesParking()), releve)
+
+    def evaluer(self, data, ts=None):
+        """Évalue les règles des parkings relevés dans ce sweep et envoie les alertes ; les retourne"""
+        ts = int(ts if ts is not None else time.time())
+        alertes = []
+        with self._verrou:
+            for nom, releve in data.items():
+                index = self.parkings.get(nom)
+                if index is None:
+                    continue
+                if releve['Statut'] == '❌ Erreur':
+                    # Échec du scraping : rien appris sur le parking
+                    continue
+                if index.ouvert is None:
+                    self._premier_releve(index, releve)
+                    continue
+                taux, ouvert = _observation(releve)
+                for id in index.candidates(taux, ouvert):
+                    regle = self.regles[id]
+                    if self._transition(index, regle, taux, ouvert):
+                        alertes.append(_alerte(regle, releve, ts))
+                index.taux, index.ouvert = taux, ouvert
+        self._envoyer(alertes)
+        return alertes
+
+    def _transition(self, index, regle, taux, ouvert):
+        """Fait évoluer l'état d'une règle ; True si l'alerte doit être envoyée"""
+        if regle.etat == DECLENCHEE:
+            if regle.rearmable(taux, ouvert):
+                regle.etat = ARMEE
+            return False
+        if not regle.condition(taux, ouvert):
+            # Condition levée avant confirmation (anti-rebond)
+            regle.etat, regle.compteur = ARMEE, 0
+            index.en_attente.discard(regle.id)
+            return False
+        regle.compteur += 1
+        if regle.compteur >= regle.confirmations:
+            regle.etat, regle.compteur = DECLENCHEE, 0
+            index.en_attente.discard(regle.id)
+            return True
+        regle.etat = EN_ATTENTE
+        index.en_attente.add(regle.id)
+        return False
+
+    def _envoyer(self, alertes):
+        par_sortie = {}
+        for alerte in alertes:
+            par_sortie.setdefault(alerte['sortie'], []).append(alerte)
+        for nom, lot in par_sortie.items():
+            sortie = self.sorties.get(nom)
+            if sortie is None:
+                print(f"Sortie d'alertes inconnue : {nom}")
+                continue
+            try:
+                sortie.envoyer(lot)
+            except Exception as e:
+                print(f"Erreur d'envoi des alertes ({nom}): {e}")
+
+
+def _observation(releve):
+    """(taux de places libres, ouvert) d'un relevé au format du cache"""
+    capacite = int(releve['Capacite']) or 1
+    return int(releve['Places']) / capacite, releve['Statut'] == '✅ Ouvert'
+
+
+def _alerte(regle, releve, ts):
+    return {
+        'regle': regle.id,
+        'abonne': regle.abonne,
+        'sortie': regle.sortie,
+        'parking': regle.parking,
+        'type': regle.type,
+        'seuil': regle.seuil,
+        'places': releve['Places'],
+        'capacite': releve['Capacite'],
+        'statut': releve['Statut'],
+        'ts': ts,
+    }
+
+
+class SortieFichier:
+    """Ajoute les alertes à un fichier, une ligne JSON par alerte"""
+
+    def __init__(self, chemin='alertes.log'):
+        self.chemin = chemin
+
+    def envoyer(self, alertes):
+        with open(self.chemin, 'a', encoding='utf-8') as f:
+            for alerte in alertes:
+                f.write(json.dumps(alerte, ensure_ascii=False) + '\n')
+
+
+class SortieWebhook:
+    """POST JSON des alertes vers une URL, depuis un thread dédié (le collecteur n'attend pas)"""
+
+    def __init__(self, url, timeout=5):
+        self.url = url
+        self.timeout = timeout
+        self._file = queue.Queue(maxsize=1000)
+        threading.Thread(target=self._boucle, daemon=True).start()
+
+    def envoyer(self, alertes):
+        try:
+            self._file.put_nowait(alertes)
+        except queue.Full:
+            print(f"Webhook {self.url} saturé, {len(alertes)} alerte(s) perdue(s)")
+
+    def _boucle(self):
+        session = requests.Session()
+        while True:
+            alertes = self._file.get()
+            try:
+                session.post(self.url, json={'alertes': alertes}, timeout=self.timeout).raise_for_status()
+            except requests.RequestException as e:
+                print(f"Erreur webhook {self.url}: {e}")
+
+
+class SortieMemoire:
+    """Garde les alertes en mémoire (tests et benchmarks)"""
+
+    def __init__(self):
+        self.alertes = []
+
+    def envoyer(self, alertes):
+        self.alertes.extend(alertes)
+
+
+SORTIES = {
+    'fichier': SortieFichier,
+    'webhook': SortieWebhook,
+    'memoire': SortieMemoire,
+}
+
+
+def charger_alertes(chemin=ALERTES_FILE):
+    """Moteur configuré depuis le fichier des règles ; None s'il n'existe pas
+
+    {"sorties": {"fichier": {"type": "fichier", "chemin": "alertes.log"}},
+     "regles": [{"id": "carnot-10", "parking": "Carnot", "type": "sous", "seuil": 0.1, "sortie": "fichier"}]}
+    """
+    try:
+        with open(chemin, 'r', encoding='utf-8') as f:
+            config = json.load(f)
+    except FileNotFoundError:
+        return None
+    sorties = {
+        nom: SORTIES[parametres.pop('type')](**parametres)
+        for nom, parametres in config.get('sorties', {'fichier': {'type': 'fichier'}}).items()
+    }
+    moteur = MoteurAlertes(sorties)
+    for i, regle in enumerate(config.get('regles', [])):
+        regle.setdefault('id', f"regle-{i}")
+        moteur.ajouter(Regle(**regle))
+    return moteur
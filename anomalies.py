@@ -0,0 +1,184 @@
+"""Détection des anomalies de capteur dans le flux des relevés
+
+Certains compteurs se trompent : Signoret reste sur '❓ Pas de données', un
+compteur se fige pendant des heures, un autre tombe à 0 pendant un relevé puis
+revient. À chaque sweep, chaque relevé frais est comparé à l'état du parking :
+
+    hors_bornes     places négatives ou au-delà de la capacité (plus MARGE_CAPACITE)
+    saut            écart à la dernière valeur acceptée au-delà de SAUT_RELATIF de la
+                    capacité et de SAUT_SIGMAS écarts-types des variations habituelles ;
+                    un nouveau niveau confirmé par CONFIRMATIONS relevés consécutifs est accepté
+    fige            valeur inchangée depuis au moins DUREE_FIGEE_MIN alors qu'on attendait,
+                    d'après le taux de changement appris pour chaque heure de la journée,
+                    au moins CHANGEMENTS_ATTENDUS changements (les nuits calmes ne comptent pas)
+    sans_donnees    '❓ Pas de données' sur SANS_DONNEES_MAX relevés consécutifs ou plus
+
+Un relevé suspect n'entre ni dans l'historique, ni dans les agrégats, ni dans les
+prévisions et les alertes ; il est marqué dans le snapshot (champs Anomalies et
+Qualite) et exclu du total des places. Le score de qualité d'un parking (0 à 100)
+est la part de relevés sains, en moyenne mobile exponentielle.
+
+L'état tient dans une dizaine de tableaux NumPy (taille fixe par parking, quelle
+que soit la durée) et un sweep est traité en un seul calcul vectorisé.
+"""
+import time
+from datetime import datetime
+
+import numpy as np
+
+import metriques
+from modele import ANOMALIES, CODES_STATUT, FUSEAU, MESSAGE, OUVERT, SANS_DONNEES, SEUIL_COMPLET, noms_anomalies
+
+FIGE, SAUT, HORS_BORNES, SANS_DONNEES_PROLONGE = (1 << i for i in range(len(ANOMALIES)))
+
+MARGE_CAPACITE = 0.05
+SAUT_RELATIF = 0.1
+SAUT_SIGMAS = 6
+# Écart toléré (part de la capacité) entre relevés confirmant un nouveau niveau
+TOLERANCE_NIVEAU = 0.05
+CONFIRMATIONS = 3
+DUREE_FIGEE_MIN = 3600
+CHANGEMENTS_ATTENDUS = 8
+SANS_DONNEES_MAX = 3
+# Taux d'apprentissage : variations, taux de changement par heure, score de qualité
+ALPHA_VARIATIONS = 0.05
+ALPHA_CHANGEMENTS = 0.02
+ALPHA_QUALITE = 0.02
+# Jours d'historique rejoués au démarrage du collecteur (entrainer)
+JOURS_APPRENTISSAGE = 3
+
+
+class DetecteurAnomalies:
+    """État de détection de tous les parkings, tenu dans des tableaux NumPy
+
+    Les parkings sont indexés dans l'ordre de `capacites` (nom -> capacité).
+    """
+
+    def __init__(self, capacites):
+        self.noms = list(capacites)
+        self.indices = {nom: i for i, nom in enumerate(self.noms)}
+        self.capacites = np.array([capacites[nom] for nom in self.noms], dtype=np.float64)
+        n = len(self.noms)
+        self.reference = np.full(n, np.nan)         # dernière valeur acceptée (NaN : aucune)
+        self.variance = np.zeros(n)                 # variance des variations acceptées
+        self.attente = np.full(n, np.nan)           # nouveau niveau en attente de confirmation
+        self.confirmations = np.zeros(n, dtype=np.int16)
+        self.derniere = np.full(n, np.nan)          # dernière valeur relevée, même suspecte
+        self.ts_changement = np.full(n, np.nan)
+        self.attendus = np.zeros(n)                 # changements attendus depuis le dernier
+        self.changements = np.zeros((n, 24), dtype=np.float32)  # probabilité de changement par heure
+        self.sans_donnees = np.zeros(n, dtype=np.int16)
+        self.qualite = np.full(n, np.nan)
+
+    def evaluer(self, mesures, ts=None):
+        """Évalue un sweep (dict au format du cache, relevés frais sans les échecs)
+
+        Retourne (suspects, qualites) : nom -> anomalies des relevés suspects,
+        et nom -> score de qualité (%) des parkings évalués.
+        """
+        ts = float(ts if ts is not None else time.time())
+        noms = [nom for nom in mesures if nom in self.indices]
+        if not noms:
+            return {}, {}
+        lignes = np.array([self.indices[nom] for nom in noms], dtype=np.int64)
+        places = np.array([mesures[nom]['Places'] for nom in noms], dtype=np.float64)
+        statuts = np.array([CODES_STATUT.get(mesures[nom]['Statut'], MESSAGE) for nom in noms], dtype=np.uint8)
+        anomalies = self._evaluer(lignes, places, statuts, ts)
+        qualites = np.rint(self.qualite[lignes] * 100).astype(np.int64).tolist()
+        suspects = {noms[k]: noms_anomalies(int(anomalies[k])) for k in np.flatnonzero(anomalies).tolist()}
+        return suspects, dict(zip(noms, qualites))
+
+    def _evaluer(self, lignes, places, statuts, ts):
+        """Anomalies (bits) des relevés, et mise à jour de l'état des parkings `lignes`"""
+        capacites = self.capacites[lignes]
+        ouverts = statuts == OUVERT
+        anomalies = np.zeros(len(lignes), dtype=np.uint8)
+
+        # Pas de données persistant
+        self.sans_donnees[lignes] = np.where(statuts == SANS_DONNEES, self.sans_donnees[lignes] + 1, 0)
+        anomalies[self.sans_donnees[lignes] >= SANS_DONNEES_MAX] |= SANS_DONNEES_PROLONGE
+
+        # Valeur impossible
+        hors_bornes = ouverts & ((places < 0) | (places > capacites * (1 + MARGE_CAPACITE)))
+        anomalies[hors_bornes] |= HORS_BORNES
+
+        # Saut : écart anormal à la dernière valeur acceptée, sauf nouveau niveau confirmé
+        reference = self.reference[lignes]
+        with np.errstate(invalid='ignore'):
+            seuil = np.maximum(SAUT_RELATIF * capacites, SAUT_SIGMAS * np.sqrt(self.variance[lignes]))
+            grand = ouverts & ~hors_bornes & (np.abs(places - reference) > seuil)
+            meme_niveau = np.abs(places - self.attente[lignes]) <= TOLERANCE_NIVEAU * capacites
+        confirmations = np.where(grand, np.where(meme_niveau, self.confirmations[lignes] + 1, 1), 0)
+        confirme = grand & (confirmations >= CONFIRMATIONS)
+        saut = grand & ~confirme
+        anomalies[saut] |= SAUT
+        self.attente[lignes] = np.where(saut, places, np.nan)
+        self.confirmations[lignes] = np.where(saut, confirmations, 0)
+
+        # Variations habituelles : seulement entre valeurs acceptées d'un même niveau
+        acceptes = ouverts & ~hors_bornes & ~saut
+        variation = acceptes & ~confirme & ~np.isnan(reference)
+        ecart = np.where(variation, places - np.nan_to_num(reference), 0.0)
+        self.variance[lignes] = np.where(
+            variation, (1 - ALPHA_VARIATIONS) * self.variance[lignes] + ALPHA_VARIATIONS * ecart ** 2,
+            self.variance[lignes]
+        )
+        # Un parking fermé ou sans données repart sans référence à sa réouverture
+        self.reference[lignes] = np.where(acceptes, places, np.where(ouverts, reference, np.nan))
+
+        # Valeur figée : changements attendus à cette heure sans qu'aucun n'arrive
+        heure = datetime.fromtimestamp(ts, FUSEAU).hour
+        derniere = self.derniere[lignes]
+        connue = ouverts & ~np.isnan(derniere)
+        change = ~connue | (places != derniere)
+        probabilite = self.changements[lignes, heure]
+        attendus = np.where(change, 0.0, self.attendus[lignes] + probabilite)
+        self.ts_changement[lignes] = np.where(change, ts, self.ts_changement[lignes])
+        fige = (connue & (attendus >= CHANGEMENTS_ATTENDUS)
+                & (ts - self.ts_changement[lignes] >= DUREE_FIGEE_MIN)
+                & (places > SEUIL_COMPLET) & (places < capacites))
+        anomalies[fige] |= FIGE
+        # Le taux de changement n'apprend pas d'un compteur figé (il finirait par le trouver normal)
+        apprend = connue & ~fige
+        self.changements[lignes[apprend], heure] = (
+            probabilite[apprend] + ALPHA_CHANGEMENTS * (change[apprend] - probabilite[apprend])
+        ).astype(np.float32)
+        self.attendus[lignes] = np.where(ouverts, attendus, 0.0)
+        self.derniere[lignes] = np.where(ouverts, places, np.nan)
+
+        sains = (anomalies == 0).astype(np.float64)
+        qualite = self.qualite[lignes]
+        self.qualite[lignes] = np.where(np.isnan(qualite), sains,
+                                        (1 - ALPHA_QUALITE) * qualite + ALPHA_QUALITE * sains)
+        return anomalies
+
+    def entrainer(self, historique, jours=JOURS_APPRENTISSAGE, maintenant=None):
+        """Rejoue les derniers jours de l'historique, sweep par sweep, pour apprendre l'état
+
+        Les qualités apprises sont oubliées : l'historique ne contient que les relevés sains.
+        """
+        maintenant = int(maintenant if maintenant is not None else time.time())
+        lignes = [ligne for lot in historique.parcourir(debut=maintenant - jours * 86400, par_date=True)
+                  for ligne in lot if ligne[0] in self.indices]
+        if not lignes:
+            return
+        parkings, ts, places, statuts = zip(*lignes)
+        parkings = np.array([self.indices[nom] for nom in parkings], dtype=np.int64)
+        ts = np.array(ts, dtype=np.int64)
+        places = np.array(places, dtype=np.float64)
+        statuts = np.array([CODES_STATUT.get(statut, MESSAGE) for statut in statuts], dtype=np.uint8)
+        debuts = np.flatnonzero(np.r_[True, ts[1:] != ts[:-1]])
+        for debut, fin in zip(debuts, np.r_[debuts[1:], len(ts)]):
+            self._evaluer(parkings[debut:fin], places[debut:fin], statuts[debut:fin], float(ts[debut]))
+        self.qualite[:] = np.nan
+
+
+def annoter(releves, suspects, qualites):
+    """Ajoute aux relevés évalués leur score de qualité et, s'ils sont suspects, leurs anomalies"""
+    for nom, releve in releves.items():
+        if nom in qualites:
+            releve['Qualite'] = qualites[nom]
+        if nom in suspects:
+            releve['Anomalies'] = suspects[nom]
+            for anomalie in suspects[nom]:
+                metriques.anomalies.inc(type=anomalie)
@@ -0,0 +1,366 @@
+"""API REST en lecture seule sur le dernier snapshot (application ASGI)
+
+Usage : uvicorn api:app --port 8000
+
+    GET /parkings                      tous les parkings du snapshot
+    GET /parkings/{nom}                un parking
+    GET /parkings/{nom}/historique     historique (?debut=&fin=&pas= en secondes epoch)
+    GET /evenements                    flux Server-Sent Events des parkings modifiés
+    GET /proches?lat=&lon=             parkings ouverts les plus proches (&k=3&min_places=1)
+    GET /leger                         page HTML légère générée par le collecteur (page_legere.py)
+
+Les réponses portent un ETag (version du snapshot) et sont compressées en
+gzip si le client l'accepte. Chaque version est sérialisée une seule fois.
+"""
+import asyncio
+import gzip
+import json
+import os
+import time
+from collections import deque
+from urllib.parse import parse_qs
+
+from cache import changements, load_snapshot
+from historique import Historique
+from page_legere import PAGE_FILE, STATIQUE_DIR
+from proximite import IndexSpatial
+from registre import registre
+from snapshot_partage import SegmentLecteur
+
+TAILLE_MIN_GZIP = 512
+
+
+class Reponse:
+    """Corps JSON pré-encodé (et sa version gzip) avec son ETag"""
+
+    def __init__(self, objet, etag):
+        self.corps = json.dumps(objet, ensure_ascii=False).encode('utf-8')
+        self.corps_gzip = gzip.compress(self.corps, 6) if len(self.corps) >= TAILLE_MIN_GZIP else None
+        self.etag = etag
+
+
+class EtatSnapshot:
+    """Snapshot courant gardé en mémoire, rechargé seulement quand sa version change"""
+
+    def __init__(self):
+        self.lecteur = SegmentLecteur()
+        self.version = None
+        self.snapshot = None
+        self._reponses = {}
+
+    def actualiser(self):
+        """Relit la source (en-tête du segment partagé, sinon stat du cache JSON)"""
+        _, snapshot = self.lecteur.lire_snapshot()
+        if snapshot is None:
+            snapshot = load_snapshot()
+        if snapshot is None:
+            return
+        version = (snapshot['sequence'], snapshot['ts'])
+        if version != self.version:
+            self.version, self.snapshot = version, snapshot
+            self._reponses = {}
+
+    def reponse(self, cle, construire):
+        """Réponse mise en cache pour la version courante"""
+        reponse = self._reponses.get(cle)
+        if reponse is None:
+            etag = f'"{self.version[0]}-{self.version[1]}"'
+            reponse = self._reponses[cle] = Reponse(construire(self.snapshot), etag)
+        return reponse
+
+
+class PageStatique:
+    """Page légère et sa version gzip, relues seulement quand le collecteur les remplace"""
+
+    def __init__(self, dossier=STATIQUE_DIR):
+        self.chemin = os.path.join(dossier, PAGE_FILE)
+        self.signature = None
+        self.corps = self.corps_gzip = self.etag = None
+
+    def actualiser(self):
+        """True si la page existe ; la relit si le fichier gzip a changé
+
+        Seul le fichier gzip est lu, la page non compressée en est décompressée : les
+        deux corps et l'ETag viennent toujours de la même version, même si le
+        collecteur remplace les fichiers pendant la lecture.
+        """
+        try:
+            st = os.stat(self.chemin + '.gz')
+        except OSError:
+            return False
+        if (st.st_ino, st.st_size, st.st_mtime_ns) == self.signature:
+            return True
+        try:
+            with open(self.chemin + '.gz', 'rb') as f:
+                # Signature du fichier ouvert : celui qui est lu, s'il a été remplacé depuis os.stat
+                st = os.fstat(f.fileno())
+                corps_gzip = f.read()
+            corps = gzip.decompress(corps_gzip)
+        except (OSError, EOFError, gzip.BadGzipFile):
+            return self.corps is not None
+        signature = (st.st_ino, st.st_size, st.st_mtime_ns)
+        self.corps, self.corps_gzip = corps, corps_gzip
+        self.etag = f'"{st.st_mtime_ns:x}-{st.st_size:x}"'
+        self.signature = signature
+        return True
+
+
+class Evenement:
+    """Maillon de la liste chaînée des événements diffusés
+
+    `suivant` est un futur résolu avec l'événement suivant : chaque abonné
+    attend simplement ce futur, sans file d'attente par client.
+    """
+
+    __slots__ = ('sequence', 'donnees', 'suivant')
+
+    def __init__(self, sequence, donnees, boucle):
+        self.sequence = sequence
+        self.donnees = donnees
+        self.suivant = boucle.create_future()
+
+
+class Diffuseur:
+    """Surveille le snapshot et diffuse les parkings modifiés aux abonnés SSE
+
+    Une seule tâche surveille la version du snapshot et encode chaque
+    événement une seule fois, quel que soit le nombre d'abonnés. Les parkings
+    envoyés sont ceux qui diffèrent du dernier état diffusé : les snapshots
+    publiés entre deux passages de la surveillance ne perdent aucun changement.
+    """
+
+    def __init__(self, intervalle=0.5, a_garder=100, keepalive=15):
+        self.intervalle = intervalle
+        self.keepalive = keepalive
+        self.recents = deque(maxlen=a_garder)
+        self.dernier = None
+        self.diffuses = {}
+        self._tache = None
+
+    def demarrer(self):
+        """Lance la surveillance dans la boucle asyncio courante (une seule fois)"""
+        if self._tache is None:
+            etat.actualiser()
+            sequence = etat.version[0] if etat.version else 0
+            self.dernier = Evenement(sequence, None, asyncio.get_running_loop())
+            self.diffuses = etat.snapshot['parkings'] if etat.snapshot else {}
+            self._tache = asyncio.create_task(self._surveiller())
+
+    async def _surveiller(self):
+        version = etat.version
+        while True:
+            await asyncio.sleep(self.intervalle)
+            etat.actualiser()
+            if etat.version != version:
+                version = etat.version
+                self._publier(etat.snapshot)
+
+    def _publier(self, snapshot):
+        noms = changements(self.diffuses, snapshot['parkings'])
+        self.diffuses = snapshot['parkings']
+        if not noms:
+            return
+        objet = {
+            'sequence': snapshot['sequence'],
+            'timestamp': snapshot['timestamp'],
+            'parkings': {nom: snapshot['parkings'][nom] for nom in noms},
+        }
+        donnees = (
+            f"id: {snapshot['sequence']}\nevent: changements\n"
+            f"data: {json.dumps(objet, ensure_ascii=False)}\n\n"
+        ).encode('utf-8')
+        evenement = Evenement(snapshot['sequence'], donnees, asyncio.get_running_loop())
+        self.dernier.suivant.set_result(evenement)
+        self.dernier = evenement
+        self.recents.append(evenement)
+
+    def point_de_depart(self, dernier_id):
+        """Événement à partir duquel reprendre pour un client (Last-Event-ID)"""
+        for evenement in self.recents:
+            if str(evenement.sequence) == dernier_id:
+                return evenement
+        return self.dernier
+
+    async def diffuser(self, send, dernier_id=''):
+        """Envoie les événements à un client jusqu'à son annulation"""
+        evenement = self.point_de_depart(dernier_id)
+        while True:
+            try:
+                evenement = await asyncio.wait_for(asyncio.shield(evenement.suivant), self.keepalive)
+            except asyncio.TimeoutError:
+                await send({'type': 'http.response.body', 'body': b': keepalive\n\n', 'more_body': True})
+                continue
+            await send({'type': 'http.response.body', 'body': evenement.donnees, 'more_body': True})
+
+
+etat = EtatSnapshot()
+page_statique = PageStatique()
+diffuseur = Diffuseur()
+index_spatial = IndexSpatial()
+_historique = None
+
+
+def get_historique():
+    """Connexion à l'historique, ouverte à la première requête"""
+    global _historique
+    if _historique is None:
+        _historique = Historique()
+    return _historique
+
+
+def _en_tete(scope, nom):
+    """Valeur d'un en-tête de la requête ('' s'il est absent)"""
+    for cle, valeur in scope['headers']:
+        if cle == nom:
+            return valeur.decode('latin-1')
+    return ''
+
+
+async def envoyer(send, statut, corps=b'', en_tetes=()):
+    """Envoie une réponse HTTP complète"""
+    en_tetes = [(b'content-length', str(len(corps)).encode())] + list(en_tetes)
+    await send({'type': 'http.response.start', 'status': statut, 'headers': en_tetes})
+    await send({'type': 'http.response.body', 'body': corps})
+
+
+async def envoyer_reponse(scope, send, reponse, type_contenu=b'application/json; charset=utf-8'):
+    """Envoie une Reponse (ou la page statique) en gérant If-None-Match et Accept-Encoding"""
+    en_tetes = [
+        (b'etag', reponse.etag.encode()),
+        (b'cache-control', b'no-cache'),
+        (b'vary', b'Accept-Encoding'),
+    ]
+    if reponse.etag in _en_tete(scope, b'if-none-match'):
+        await envoyer(send, 304, b'', en_tetes)
+        return
+    en_tetes.append((b'content-type', type_contenu))
+    if reponse.corps_gzip is not None and 'gzip' in _en_tete(scope, b'accept-encoding'):
+        en_tetes.append((b'content-encoding', b'gzip'))
+        await envoyer(send, 200, reponse.corps_gzip, en_tetes)
+    else:
+        await envoyer(send, 200, reponse.corps, en_tetes)
+
+
+async def erreur(send, statut, message):
+    """Réponse d'erreur JSON"""
+    corps = json.dumps({'erreur': message}, ensure_ascii=False).encode('utf-8')
+    await envoyer(send, statut, corps, [(b'content-type', b'application/json; charset=utf-8')])
+
+
+async def historique_parking(scope, send, nom):
+    """Historique d'un parking, agrégé par tranches de `pas` secondes"""
+    params = parse_qs(scope.get('query_string', b'').decode())
+    try:
+        fin = int(params.get('fin', [time.time()])[0])
+        debut = int(params.get('debut', [fin - 86400])[0])
+        pas = max(1, int(params.get('pas', [300])[0]))
+    except ValueError:
+        await erreur(send, 400, "Paramètres debut / fin / pas invalides")
+        return
+    lignes = await asyncio.to_thread(get_historique().serie, nom, debut, fin, pas)
+    objet = {
+        'parking': nom,
+        'pas': pas,
+        'points': [
+            {'ts': tranche, 'moyenne': moyenne, 'min': minimum, 'max': maximum}
+            for tranche, moyenne, minimum, maximum in lignes
+        ]
+    }
+    corps = json.dumps(objet, ensure_ascii=False).encode('utf-8')
+    await envoyer(send, 200, corps, [(b'content-type', b'application/json; charset=utf-8')])
+
+
+async def parkings_proches(scope, send):
+    """Les k parkings ouverts les plus proches d'un point, avec au moins min_places places libres"""
+    params = parse_qs(scope.get('query_string', b'').decode())
+    try:
+        lat = float(params['lat'][0])
+        lon = float(params['lon'][0])
+        k = min(50, max(1, int(params.get('k', [3])[0])))
+        min_places = max(0, int(params.get('min_places', [1])[0]))
+    except (KeyError, ValueError):
+        await erreur(send, 400, "Paramètres lat / lon / k / min_places invalides")
+        return
+    registre.actualiser()
+    index_spatial.synchroniser(registre.parkings, registre.version)
+    parkings = etat.snapshot['parkings']
+    objet = {
+        'sequence': etat.snapshot['sequence'],
+        'resultats': [
+            {'parking': nom, 'distance_marche': metres, 'minutes': minutes, **parkings[nom]}
+            for nom, metres, minutes in index_spatial.proches(lat, lon, parkings, k, min_places)
+        ]
+    }
+    corps = json.dumps(objet, ensure_ascii=False).encode('utf-8')
+    await envoyer(send, 200, corps, [(b'content-type', b'application/json; charset=utf-8')])
+
+
+async def evenements(scope, receive, send):
+    """Flux Server-Sent Events : un événement par snapshot, avec les seuls parkings modifiés"""
+    diffuseur.demarrer()
+    await send({'type': 'http.response.start', 'status': 200, 'headers': [
+        (b'content-type', b'text/event-stream; charset=utf-8'),
+        (b'cache-control', b'no-cache'),
+        (b'x-accel-buffering', b'no'),
+    ]})
+    await send({'type': 'http.response.body', 'body': b'retry: 5000\n\n', 'more_body': True})
+    flux = asyncio.create_task(diffuseur.diffuser(send, _en_tete(scope, b'last-event-id')))
+    try:
+        while (await receive())['type'] != 'http.disconnect':
+            pass
+    finally:
+        flux.cancel()
+
+
+async def app(scope, receive, send):
+    """Point d'entrée ASGI"""
+    if scope['type'] == 'lifespan':
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                diffuseur.demarrer()
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+    if scope['type'] != 'http':
+        return
+    if scope['method'] != 'GET':
+        await erreur(send, 405, "Méthode non autorisée")
+        return
+
+    if scope['path'].rstrip('/') == '/leger':
+        # Fichier pré-compressé : ni lecture du snapshot, ni sérialisation
+        if page_statique.actualiser():
+            await envoyer_reponse(scope, send, page_statique, b'text/html; charset=utf-8')
+        else:
+            await erreur(send, 503, "Page légère pas encore générée")
+        return
+
+    etat.actualiser()
+    if etat.snapshot is None:
+        await erreur(send, 503, "Aucun snapshot disponible")
+        return
+
+    morceaux = [m for m in scope['path'].split('/') if m]
+    if morceaux == ['evenements']:
+        await evenements(scope, receive, send)
+    elif morceaux == ['proches']:
+        await parkings_proches(scope, send)
+    elif morceaux == ['parkings']:
+        await envoyer_reponse(scope, send, etat.reponse('*', lambda s: s))
+    elif len(morceaux) in (2, 3) and morceaux[0] == 'parkings':
+        nom = morceaux[1]
+        if nom not in etat.snapshot['parkings']:
+            await erreur(send, 404, f"Parking inconnu : {nom}")
+        elif len(morceaux) == 2:
+            await envoyer_reponse(scope, send, etat.reponse(nom, lambda s: {
+                'sequence': s['sequence'], 'timestamp': s['timestamp'], 'ts': s['ts'],
+                'parking': nom, **s['parkings'][nom], 'prevision': s.get('previsions', {}).get(nom)
+            }))
+        elif morceaux[2] == 'historique':
+            await historique_parking(scope, send, nom)
+        else:
+            await erreur(send, 404, "Ressource inconnue")
+    else:
+        await erreur(send, 404, "Ressource inconnue")
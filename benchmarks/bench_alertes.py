@@ -0,0 +1,114 @@
+"""Benchmark du moteur d'alertes : 100 000 abonnements évalués à chaque sweep
+
+Les places de chaque parking suivent une marche aléatoire ; on compare la durée
+d'évaluation d'un sweep par le moteur (règles indexées par parking et par seuil)
+à l'évaluation de toutes les règles, et on vérifie que les alertes sont identiques.
+
+Usage : python benchmarks/bench_alertes.py [--abonnements 100000] [--parkings 9] [--sweeps 500]
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from alertes import TYPES, MoteurAlertes, Regle, SortieMemoire
+
+
+def regles_aleatoires(nb, parkings, graine=1):
+    aleatoire = random.Random(graine)
+    regles = []
+    for i in range(nb):
+        type = aleatoire.choice(TYPES[:2] * 4 + TYPES[2:])  # surtout des seuils
+        regles.append(dict(
+            id=i, parking=aleatoire.choice(parkings), type=type,
+            seuil=round(aleatoire.uniform(0.02, 0.9), 3) if type in ('sous', 'dessus') else None,
+            sortie='memoire', confirmations=aleatoire.choice((1, 2, 3)),
+            hysteresis=aleatoire.choice((0.0, 0.05, 0.1)),
+        ))
+    return regles
+
+
+class MoteurNaif(MoteurAlertes):
+    """Référence : toutes les règles des parkings relevés sont examinées à chaque sweep"""
+
+    def evaluer(self, data, ts=None):
+        alertes = []
+        for nom, releve in data.items():
+            index = self.parkings.get(nom)
+            if index is None:
+                continue
+            if index.ouvert is None:
+                self._premier_releve(index, releve)
+                continue
+            ouvert = releve['Statut'] == '✅ Ouvert'
+            taux = releve['Places'] / releve['Capacite']
+            for id in index.ids():
+                regle = self.regles[id]
+                if self._transition(index, regle, taux, ouvert):
+                    alertes.append(id)
+            index.taux, index.ouvert = taux, ouvert
+        return alertes
+
+
+def sweeps_aleatoires(parkings, nb, graine=2):
+    aleatoire = random.Random(graine)
+    places = {nom: 500 for nom in parkings}
+    ouverts = {nom: True for nom in parkings}
+    for _ in range(nb):
+        data = {}
+        for nom in parkings:
+            # La plupart des parkings changent peu d'un sweep à l'autre, certains pas du tout
+            if aleatoire.random() < 0.3:
+                places[nom] = min(1000, max(0, places[nom] + aleatoire.randint(-40, 40)))
+            if aleatoire.random() < 0.005:
+                ouverts[nom] = not ouverts[nom]
+            statut = '✅ Ouvert' if ouverts[nom] else '⚠️ Fermeture temporaire'
+            data[nom] = {'Places': places[nom], 'Capacite': 1000, 'Statut': statut}
+        yield data
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--abonnements', type=int, default=100_000)
+    parser.add_argument('--parkings', type=int, default=9)
+    parser.add_argument('--sweeps', type=int, default=500)
+    args = parser.parse_args()
+
+    parkings = [f'Parking {i:05d}' for i in range(args.parkings)]
+    configuration = regles_aleatoires(args.abonnements, parkings)
+    moteur = MoteurAlertes({'memoire': SortieMemoire()})
+    naif = MoteurNaif()
+    debut = time.perf_counter()
+    for regle in configuration:
+        moteur.ajouter(Regle(**regle))
+    chargement = time.perf_counter() - debut
+    for regle in configuration:
+        naif.ajouter(Regle(**regle))
+
+    durees, durees_naif, differences, total = [], [], 0, 0
+    for data in sweeps_aleatoires(parkings, args.sweeps):
+        t0 = time.perf_counter()
+        alertes = moteur.evaluer(data)
+        durees.append(time.perf_counter() - t0)
+        t0 = time.perf_counter()
+        attendues = naif.evaluer(data)
+        durees_naif.append(time.perf_counter() - t0)
+        total += len(alertes)
+        differences += sorted(a['regle'] for a in alertes) != sorted(attendues)
+
+    durees.sort()
+    durees_naif.sort()
+    print(f"{args.abonnements} abonnements sur {args.parkings} parkings, {args.sweeps} sweeps "
+          f"(chargement {chargement * 1000:.0f} ms)\n")
+    print(f"Moteur indexé  : médiane {durees[len(durees) // 2] * 1000:7.3f} ms | "
+          f"p99 {durees[int(len(durees) * 0.99)] * 1000:7.3f} ms")
+    print(f"Toutes règles  : médiane {durees_naif[len(durees_naif) // 2] * 1000:7.3f} ms | "
+          f"p99 {durees_naif[int(len(durees_naif) * 0.99)] * 1000:7.3f} ms")
+    print(f"{total} alertes envoyées, sweeps différents de la référence : {differences}")
+
+
+if __name__ == '__main__':
+    main()
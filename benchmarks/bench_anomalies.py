@@ -0,0 +1,85 @@
+"""Benchmark de la détection d'anomalies (anomalies.py) dans la boucle du collecteur
+
+Sur un flux synthétique (sweeps toutes les 2 min, marche aléatoire des places,
+activité plus faible la nuit), des pannes sont injectées le dernier jour :
+un parking sur 50 se fige, un sur 50 tombe à 0 le temps d'un relevé, un sur 100
+reste sur '❓ Pas de données'. Sont mesurés :
+- la durée d'un sweep de détection (evaluer, relevés au format dict) ;
+- la mémoire de l'état par parking ;
+- les pannes détectées et les relevés sains marqués suspects à tort.
+
+Usage : python benchmarks/bench_anomalies.py [--parkings 9 1000 10000] [--jours 3]
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from anomalies import DetecteurAnomalies
+
+PAS_SWEEP = 120
+DEBUT = 1_760_000_000
+CAPACITE = 500
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--parkings', type=int, nargs='+', default=[9, 1000, 10000])
+    parser.add_argument('--jours', type=int, default=3)
+    args = parser.parse_args()
+
+    for nb in args.parkings:
+        aleatoire = np.random.default_rng(1)
+        noms = [f'Parking {i:05d}' for i in range(nb)]
+        detecteur = DetecteurAnomalies({nom: CAPACITE for nom in noms})
+        figes = set(range(0, nb, 50))
+        chutes = set(range(25, nb, 50))
+        sans_donnees = set(range(10, nb, 100))
+        places = aleatoire.integers(50, CAPACITE - 50, nb)
+        sweeps = args.jours * 86400 // PAS_SWEEP
+        debut_pannes = sweeps - 86400 // PAS_SWEEP
+        detectes, faux, sains, durees = set(), 0, 0, []
+        for k in range(sweeps):
+            ts = DEBUT + k * PAS_SWEEP
+            heure = (ts // 3600 + 2) % 24
+            # La nuit, un parking sur dix change à chaque sweep ; le jour, un sur deux
+            bouge = aleatoire.random(nb) < (0.1 if heure < 7 else 0.5)
+            places = np.clip(places + bouge * aleatoire.integers(-8, 9, nb), 0, CAPACITE)
+            if k == debut_pannes:
+                valeurs_figees = places.copy()
+            mesures = {}
+            for i, (nom, p) in enumerate(zip(noms, places.tolist())):
+                if k >= debut_pannes and i in figes:
+                    p = int(valeurs_figees[i])
+                if k >= debut_pannes and i in sans_donnees:
+                    mesures[nom] = {'Places': 0, 'Statut': '❓ Pas de données'}
+                    continue
+                if k == debut_pannes + 200 and i in chutes:
+                    p = 0
+                mesures[nom] = {'Places': p, 'Statut': '✅ Ouvert'}
+            debut = time.perf_counter()
+            suspects, _ = detecteur.evaluer(mesures, ts)
+            durees.append(time.perf_counter() - debut)
+            for nom in suspects:
+                i = int(nom.rsplit(' ', 1)[1])
+                if i in figes | chutes | sans_donnees and k >= debut_pannes:
+                    detectes.add(i)
+                else:
+                    faux += 1
+            sains += nb - len(figes | chutes | sans_donnees) if k >= debut_pannes else nb
+
+        memoire = sum(v.nbytes for v in vars(detecteur).values() if isinstance(v, np.ndarray))
+        pannes = figes | chutes | sans_donnees
+        print(f"{nb} parkings, {args.jours} jour(s) de sweeps toutes les {PAS_SWEEP // 60} min")
+        print(f"  sweep de détection (médiane) : {sorted(durees)[len(durees) // 2] * 1000:8.3f} ms | "
+              f"état {memoire / nb:.0f} octets par parking")
+        print(f"  pannes détectées : {len(detectes)}/{len(pannes)} | "
+              f"relevés sains marqués suspects : {faux} sur {sains} ({faux / sains:.4%})")
+
+
+if __name__ == '__main__':
+    main()
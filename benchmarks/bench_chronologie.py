@@ -0,0 +1,114 @@
+"""Benchmark de la chronologie (chronologie.py) : état de la ville à un instant passé
+
+Un historique SQLite synthétique (sweeps toutes les 2 min, environ un parking sur
+trois change à chaque sweep) est écrit dans un dossier temporaire, puis :
+- construction de la chronologie sur toute la période, mémoire du journal et des images clés ;
+- état complet à un instant aléatoire : chronologie (image non calculée) contre une
+  requête SQL par parking (dernier relevé avant l'instant, par l'index) ;
+- défilement du curseur pas à pas (5 min), avec et sans préchargement des images voisines.
+
+Usage : python benchmarks/bench_chronologie.py [--parkings 9 1000] [--jours 7]
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from chronologie import Chronologie
+from historique import Historique
+from modele import Metadonnees
+
+PAS_SWEEP = 120
+PAS_CURSEUR = 300
+DEBUT = 1_760_000_000
+
+
+def remplir(historique, noms, jours, graine=1):
+    """Écrit `jours` jours de sweeps ; retourne la date du dernier sweep"""
+    aleatoire = random.Random(graine)
+    places = {nom: aleatoire.randint(0, 500) for nom in noms}
+    ts = DEBUT
+    for ts in range(DEBUT, DEBUT + jours * 86400, PAS_SWEEP):
+        for nom in noms:
+            if aleatoire.random() < 0.3:
+                places[nom] = max(0, min(500, places[nom] + aleatoire.randint(-20, 20)))
+        historique.ajouter({nom: {'Places': p, 'Capacite': 500, 'Statut': '✅ Ouvert'} for nom, p in places.items()}, ts)
+    return ts
+
+
+def etat_sql(historique, noms, ts):
+    """État à `ts` sans chronologie : le dernier relevé de chaque parking, une requête par parking"""
+    with historique._verrou:
+        return {nom: historique._connexion.execute(
+            "SELECT places, statut FROM releves WHERE parking = ? AND ts <= ? ORDER BY ts DESC LIMIT 1",
+            (nom, ts)).fetchone() for nom in noms}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--parkings', type=int, nargs='+', default=[9, 1000])
+    parser.add_argument('--jours', type=int, default=7, help="jours d'historique (1 au-delà de 100 parkings)")
+    parser.add_argument('--instants', type=int, default=200)
+    args = parser.parse_args()
+
+    dossier = tempfile.mkdtemp(prefix='bench_chronologie_')
+    aleatoire = random.Random(2)
+    for nb in args.parkings:
+        jours = args.jours if nb <= 100 else 1
+        noms = [f'Parking {i:05d}' for i in range(nb)]
+        meta = Metadonnees(noms, [500] * nb, [43.5] * nb, [5.4] * nb)
+        historique = Historique(os.path.join(dossier, f'historique_{nb}.db'))
+        debut = time.perf_counter()
+        fin = remplir(historique, noms, jours)
+        duree_ecriture = time.perf_counter() - debut
+
+        debut = time.perf_counter()
+        chronologie = Chronologie.depuis_historique(historique, meta, DEBUT, fin)
+        duree_construction = time.perf_counter() - debut
+        memoire = sum(getattr(chronologie, nom)[:chronologie.nb].nbytes
+                      for nom in ('_ts', '_parkings', '_places', '_statuts', '_messages'))
+        memoire += sum(etat.nbytes for etat in chronologie.cles_etats)
+
+        instants = [aleatoire.randint(DEBUT, fin) for _ in range(args.instants)]
+        debut = time.perf_counter()
+        for ts in instants:
+            chronologie._images.clear()
+            chronologie.image(ts)
+        duree_image = (time.perf_counter() - debut) / len(instants)
+        echantillon = instants[:max(1, args.instants // 10)]
+        debut = time.perf_counter()
+        for ts in echantillon:
+            etat_sql(historique, noms, ts)
+        duree_sql = (time.perf_counter() - debut) / len(echantillon)
+
+        curseur = list(range(DEBUT, fin, PAS_CURSEUR))[:288]
+        durees = {}
+        for prechargement in (False, True):
+            chronologie._images.clear()
+            attentes = []
+            for i, ts in enumerate(curseur):
+                debut = time.perf_counter()
+                chronologie.image(ts)
+                attentes.append(time.perf_counter() - debut)
+                if prechargement:
+                    chronologie.precharger(curseur[i + 1:i + 4])
+                # Temps de rendu de l'image par le dashboard, pendant lequel le préchargement travaille
+                time.sleep(0.002)
+            durees[prechargement] = sorted(attentes)[len(attentes) // 2], max(attentes)
+
+        print(f"{nb} parkings, {jours} jour(s) : {chronologie.nb} changements, {len(chronologie.cles_etats)} images clés, "
+              f"{memoire / 1024:.0f} Ko (écriture SQLite {duree_ecriture:.1f} s)")
+        print(f"  construction                 : {duree_construction * 1000:8.1f} ms")
+        print(f"  état à un instant aléatoire  : chronologie {duree_image * 1000:7.3f} ms | "
+              f"SQL par parking {duree_sql * 1000:8.2f} ms")
+        print(f"  curseur pas à pas (médiane / max) : sans préchargement {durees[False][0] * 1000:6.3f} / "
+              f"{durees[False][1] * 1000:6.3f} ms | avec {durees[True][0] * 1000:6.3f} / {durees[True][1] * 1000:6.3f} ms")
+        historique.fermer()
+
+
+if __name__ == '__main__':
+    main()
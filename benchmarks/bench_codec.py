@@ -0,0 +1,64 @@
+"""Benchmark des codecs du snapshot (codec_snapshot.py) : JSON contre binaire
+
+Pour des snapshots synthétiques de 9, 1 000 et 50 000 parkings (avec prévisions) :
+- taille encodée ;
+- durée d'encodage (celle payée par le collecteur à chaque sweep) ;
+- durée de décodage complet, au format dict (API, outils) ;
+- durée de lecture du chemin chaud : VueSnapshot, puis la vue d'une ville de
+  250 parkings comme la construit le dashboard (vues.preparer_vue).
+
+Usage : python benchmarks/bench_codec.py [--tailles 9 1000 50000]
+"""
+import argparse
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, os.path.dirname(__file__))
+
+from bench_modele import chronometrer, registre_synthetique
+from codec_snapshot import CODECS
+from modele import Metadonnees
+from vues import preparer_vue
+
+TAILLE_VILLE = 250
+
+
+def snapshot_synthetique(nb_parkings):
+    parkings, data = registre_synthetique(nb_parkings)
+    previsions = {nom: {'15': r['Places'], '30': r['Places'], '60': r['Places']}
+                  for nom, r in data.items() if r['Statut'] == '✅ Ouvert'}
+    snapshot = {'sequence': 1, 'timestamp': '12:00:00', 'ts': 1_760_000_000, 'parkings': data,
+                'previsions': previsions}
+    return parkings, snapshot
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--tailles', type=int, nargs='+', default=[9, 1000, 50000])
+    args = parser.parse_args()
+
+    for taille in args.tailles:
+        parkings, snapshot = snapshot_synthetique(taille)
+        meta = Metadonnees.depuis_registre(parkings)
+        ville = list(parkings)[:TAILLE_VILLE]
+        repetitions = max(3, 20000 // taille)
+        print(f"{taille} parkings")
+        for codec in CODECS.values():
+            duree_encodage, octets = chronometrer(lambda: codec.encoder(snapshot, meta), repetitions)
+            duree_complet, decode = chronometrer(lambda: codec.decoder(octets), repetitions)
+            if decode['parkings'].keys() != snapshot['parkings'].keys():
+                raise RuntimeError(f"{codec.nom} : décodage incomplet")
+
+            def chemin_chaud():
+                return preparer_vue(codec.decoder_vue(octets).modele, ville)
+
+            duree_vue, _ = chronometrer(lambda: codec.decoder_vue(octets), repetitions)
+            duree_page, _ = chronometrer(chemin_chaud, repetitions)
+            print(f"  {codec.nom:<8} {len(octets) / 1024:9.1f} Ko | encodage {duree_encodage * 1000:8.2f} ms | "
+                  f"décodage complet {duree_complet * 1000:8.2f} ms | vue {duree_vue * 1000:7.3f} ms | "
+                  f"vue + ville ({len(ville)}) {duree_page * 1000:7.2f} ms")
+
+
+if __name__ == '__main__':
+    main()
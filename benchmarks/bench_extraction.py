@@ -0,0 +1,60 @@
+"""Micro-benchmark de l'extraction du bloc nbPlaces sur les pages de fixtures/html
+
+Usage : python benchmarks/bench_extraction.py [nombre_de_repetitions]
+"""
+import os
+import re
+import sys
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from extraction import extraire, extraire_flux
+
+DOSSIER_FIXTURES = os.path.join(os.path.dirname(__file__), '..', 'fixtures', 'html')
+TAILLE_MORCEAU = 8 * 1024
+
+
+def ancienne_extraction(contenu):
+    """Extraction d'origine : décodage complet puis deux regex non compilées"""
+    texte = contenu.decode('utf-8')
+    match_nombre = re.search(r'<p class="nbPlaces"><span[^>]*>(\d+)</span>', texte)
+    match_texte = re.search(r'<p class="nbPlaces"><span[^>]*>([^<]+)</span>', texte)
+    if match_nombre:
+        return int(match_nombre.group(1))
+    elif match_texte:
+        return match_texte.group(1).strip()
+    return None
+
+
+def extraction_flux(contenu):
+    """Extraction en flux, avec des morceaux de la taille utilisée par le scraper"""
+    morceaux = (contenu[i:i + TAILLE_MORCEAU] for i in range(0, len(contenu), TAILLE_MORCEAU))
+    return extraire_flux(morceaux)
+
+
+def main():
+    repetitions = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    methodes = [
+        ('ancienne', ancienne_extraction),
+        ('extraire', extraire),
+        ('extraire_flux', extraction_flux),
+    ]
+
+    print(f"{'page':20} {'taille':>8}  " + "  ".join(f"{nom:>15}" for nom, _ in methodes))
+    for fichier in sorted(os.listdir(DOSSIER_FIXTURES)):
+        with open(os.path.join(DOSSIER_FIXTURES, fichier), 'rb') as f:
+            contenu = f.read()
+
+        resultats = {fonction(contenu) for _, fonction in methodes}
+        assert len(resultats) == 1, f"{fichier}: résultats différents {resultats}"
+
+        durees = []
+        for _, fonction in methodes:
+            duree = timeit.timeit(lambda: fonction(contenu), number=repetitions)
+            durees.append(duree / repetitions * 1e6)
+        print(f"{fichier:20} {len(contenu):>8}  " + "  ".join(f"{d:>12.1f} µs" for d in durees))
+
+
+if __name__ == '__main__':
+    main()
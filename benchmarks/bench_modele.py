@@ -0,0 +1,121 @@
+"""Benchmark du modèle colonnaire (modele.py) contre le snapshot en dict de dicts
+
+Pour des registres synthétiques de plusieurs tailles :
+- mémoire des relevés (objets Python parcourus en profondeur, contre les tableaux
+  NumPy et leurs tables de chaînes ; métadonnées du registre à part, partagées) ;
+- taille sérialisée (JSON du dict, contre les octets des enregistrements) ;
+- construction de la vue du dashboard : ancien chemin (DataFrame.from_dict,
+  tri, get_color ligne à ligne) contre vues.preparer_vue sur le modèle ;
+- conversion depuis le format dict (payée une fois par version du snapshot).
+
+Usage : python benchmarks/bench_modele.py [--tailles 9 1000 50000]
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+import pandas as pd
+
+from modele import Metadonnees, SnapshotParkings
+from vues import preparer_vue
+
+
+def chronometrer(fonction, repetitions):
+    """Meilleure durée (s) et résultat de `repetitions` appels"""
+    meilleure, resultat = float('inf'), None
+    for _ in range(repetitions):
+        debut = time.perf_counter()
+        resultat = fonction()
+        meilleure = min(meilleure, time.perf_counter() - debut)
+    return meilleure, resultat
+
+
+def taille_profonde(objet, vus=None):
+    """Octets occupés par un objet et tout ce qu'il référence (dict, list, str, nombres)"""
+    vus = set() if vus is None else vus
+    if id(objet) in vus:
+        return 0
+    vus.add(id(objet))
+    taille = sys.getsizeof(objet)
+    if isinstance(objet, dict):
+        taille += sum(taille_profonde(k, vus) + taille_profonde(v, vus) for k, v in objet.items())
+    elif isinstance(objet, (list, tuple)):
+        taille += sum(taille_profonde(v, vus) for v in objet)
+    return taille
+
+
+def registre_synthetique(nb_parkings, graine=1):
+    """(parkings au format du registre, relevés au format dict)"""
+    aleatoire = random.Random(graine)
+    parkings, data = {}, {}
+    for i in range(nb_parkings):
+        nom = f'Parking {i:05d}'
+        capacite = aleatoire.randint(100, 1500)
+        lat, lon = 43.5 + aleatoire.random() / 10, 5.4 + aleatoire.random() / 10
+        parkings[nom] = ('http://exemple/', i, capacite, lat, lon)
+        places = aleatoire.randint(0, capacite)
+        if aleatoire.random() > 0.05:
+            affichage, statut = ('COMPLET' if places <= 2 else f'{places} / {capacite}'), '✅ Ouvert'
+        else:
+            places, affichage, statut = 0, 'Fermeture temporaire', '⚠️ Fermeture temporaire'
+        ts = 1_760_000_000 + i // 100
+        data[nom] = {
+            'Places': places, 'Capacite': capacite, 'Affichage': affichage, 'Statut': statut,
+            'Timestamp': time.strftime('%H:%M:%S', time.gmtime(ts)), 'Ts': ts,
+            'latitude': lat, 'longitude': lon, 'Source': 'semepa',
+        }
+    return parkings, data
+
+
+def get_color(statut, places, capacite):
+    """Couleur de la carte, calculée ligne à ligne comme avant le modèle colonnaire"""
+    if statut != '✅ Ouvert':
+        return 'gray'
+    taux = places / capacite
+    return 'green' if taux > 0.5 else 'orange' if taux > 0.1 else 'red'
+
+
+def vue_dict(data, noms):
+    """Ancienne préparation de la vue : DataFrame d'objets depuis le dict de dicts"""
+    df = pd.DataFrame.from_dict({nom: data[nom] for nom in noms if nom in data}, orient='index')
+    df = df.sort_values('Places', ascending=False)
+    couleurs = [get_color(s, int(p), int(c)) for s, p, c in zip(df['Statut'], df['Places'], df['Capacite'])]
+    return df, couleurs
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--tailles', type=int, nargs='+', default=[9, 1000, 50000])
+    args = parser.parse_args()
+
+    for taille in args.tailles:
+        parkings, data = registre_synthetique(taille)
+        noms = list(parkings)
+        meta = Metadonnees.depuis_registre(parkings)
+        repetitions = max(3, 20000 // taille)
+        duree_conversion, modele = chronometrer(lambda: SnapshotParkings.depuis_releves(data, meta), repetitions)
+
+        memoire_dict = taille_profonde(data)
+        memoire_meta = meta.capacites.nbytes + meta.latitudes.nbytes + meta.longitudes.nbytes
+        json_dict = len(json.dumps(data).encode('utf-8'))
+        duree_dict, _ = chronometrer(lambda: vue_dict(data, noms), repetitions)
+        duree_modele, (df, _, _) = chronometrer(lambda: preparer_vue(modele, noms), repetitions)
+        if df.memory_usage(deep=True).sum() <= 0 or len(df) != taille:
+            raise RuntimeError("vue incomplète")
+
+        print(f"{taille} parkings")
+        print(f"  mémoire des relevés : dict {memoire_dict / 1024:10.1f} Ko | modèle {modele.octets() / 1024:8.1f} Ko"
+              f" (+ {memoire_meta / 1024:.1f} Ko de métadonnées partagées)")
+        print(f"  taille sérialisée   : JSON {json_dict / 1024:10.1f} Ko | enregistrements "
+              f"{modele.octets() / 1024:8.1f} Ko")
+        print(f"  vue du dashboard    : dict {duree_dict * 1000:8.2f} ms | modèle {duree_modele * 1000:8.2f} ms"
+              f" (conversion depuis le dict : {duree_conversion * 1000:.2f} ms, une fois par version)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,132 @@
+"""Benchmark d'un registre synthétique de plusieurs milliers de parkings sur plusieurs villes
+
+Des serveurs HTTP locaux (un par « hôte ») servent une page Semepa minimale avec
+une latence configurable. On mesure :
+- la durée d'un sweep complet, avec les shards par hôte et avec l'ancien ordre (registre) ;
+- la préparation de la vue d'une ville et d'une page de cartes, contre toutes les cartes.
+
+Usage : python benchmarks/bench_multi_villes.py [--parkings 5000] [--villes 20] [--hotes 25] [--latence 0.02]
+"""
+import argparse
+import csv
+import os
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+PAGE = (
+    '<!DOCTYPE html><html lang="fr-FR"><head><meta charset="UTF-8"><title>Parking</title></head>'
+    '<body><p class="nbPlaces"><span style="font-size:30px;color:#ae0a15;">{}</span> places libres</p>'
+    '</body></html>'
+)
+
+
+def lancer_serveur(latence):
+    """Serveur HTTP/1.1 local (keep-alive) servant une page de parking ; retourne son URL"""
+
+    class Gestionnaire(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+
+        def do_GET(self):
+            time.sleep(latence)
+            corps = PAGE.format(hash(self.path) % 500).encode()
+            self.send_response(200)
+            self.send_header('Content-Type', 'text/html; charset=UTF-8')
+            self.send_header('Content-Length', str(len(corps)))
+            self.end_headers()
+            self.wfile.write(corps)
+
+        def log_message(self, *args):
+            pass
+
+    serveur = ThreadingHTTPServer(('127.0.0.1', 0), Gestionnaire)
+    serveur.daemon_threads = True
+    threading.Thread(target=serveur.serve_forever, daemon=True).start()
+    return f'http://127.0.0.1:{serveur.server_address[1]}/'
+
+
+def ecrire_registre(chemin, nb_parkings, nb_villes, urls):
+    """Registre CSV synthétique : parkings répartis entre villes, hôtes attribués par ville"""
+    with open(chemin, 'w', newline='', encoding='utf-8') as f:
+        ecrivain = csv.writer(f)
+        ecrivain.writerow(['ville', 'nom', 'url', 'page_id', 'capacite', 'latitude', 'longitude'])
+        for i in range(nb_parkings):
+            ville = i * nb_villes // nb_parkings
+            # Chaque ville est servie par quelques hôtes voisins, comme des exploitants locaux
+            url = urls[(ville * len(urls) // nb_villes + i % 2) % len(urls)]
+            ecrivain.writerow([f'Ville {ville:02d}', f'Parking {i:05d}', url, i, 100 + i % 900,
+                               43.0 + ville * 0.1 + (i % 97) * 1e-4, 5.0 + (i % 89) * 1e-4])
+
+
+def sweep_ordre_registre(scraper, noms):
+    """Ancien sweep : tâches soumises dans l'ordre du registre, 16 workers"""
+    with ThreadPoolExecutor(max_workers=min(16, len(noms))) as executor:
+        return dict(zip(noms, executor.map(scraper.scraper_parking, noms)))
+
+
+def chronometrer(fonction, repetitions=1):
+    debut = time.perf_counter()
+    for _ in range(repetitions):
+        resultat = fonction()
+    return (time.perf_counter() - debut) / repetitions, resultat
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--parkings', type=int, default=5000)
+    parser.add_argument('--villes', type=int, default=20)
+    parser.add_argument('--hotes', type=int, default=25)
+    parser.add_argument('--latence', type=float, default=0.02, help="latence des serveurs (s)")
+    args = parser.parse_args()
+
+    urls = [lancer_serveur(args.latence) for _ in range(args.hotes)]
+    dossier = tempfile.mkdtemp(prefix='bench_multi_villes_')
+    chemin = os.path.join(dossier, 'registre.csv')
+    ecrire_registre(chemin, args.parkings, args.villes, urls)
+
+    # Le registre est lu à l'import du scraper
+    os.environ['PARKING_REGISTRE'] = chemin
+    os.environ.pop('PARKING_FIXTURES_MODE', None)
+    import scraper
+    from registre import registre
+    from modele import SnapshotParkings, metadonnees
+    from vues import cartes_page, filtrer, preparer_vue
+
+    print(f"{len(registre.parkings)} parkings, {len(registre.villes)} villes, {len(urls)} hôtes, "
+          f"latence {args.latence * 1000:.0f} ms\n")
+
+    print("Sweep (requêtes HTTP locales)")
+    tailles = sorted({t for t in (500, 1000, args.parkings) if t <= args.parkings})
+    data = {}
+    for taille in tailles:
+        noms = registre.noms()[:taille]
+        scraper.sessions.fermer()
+        duree_ancien, _ = chronometrer(lambda: sweep_ordre_registre(scraper, noms))
+        scraper.sessions.fermer()
+        duree, data = chronometrer(lambda: scraper.scraper_parkings(noms))
+        erreurs = sum(1 for r in data.values() if r['Statut'] == '❌ Erreur')
+        print(f"  {taille:>6} parkings : shards par hôte {duree:6.2f} s ({duree / taille * 1000:.2f} ms/parking)"
+              f" | ordre du registre {duree_ancien:6.2f} s | erreurs {erreurs}")
+
+    print("\nRendu (préparation des données)")
+    ville = next(iter(registre.villes))
+    tous = registre.noms()
+    modele = SnapshotParkings.depuis_releves(data, metadonnees(registre))
+    duree_ville, (df, _, _) = chronometrer(lambda: preparer_vue(modele, registre.noms(ville)), 20)
+    duree_page, _ = chronometrer(lambda: cartes_page(filtrer(df, 'Parking 0', True), 1), 200)
+    duree_tous, (df_tous, _, _) = chronometrer(lambda: preparer_vue(modele, tous), 5)
+    duree_cartes, cartes = chronometrer(lambda: cartes_page(df_tous, 1, len(df_tous)), 5)
+    print(f"  vue d'une ville ({len(df)} parkings)    : {duree_ville * 1000:7.2f} ms")
+    print(f"  filtre + page de cartes (30)      : {duree_page * 1000:7.2f} ms")
+    print(f"  vue de tous les parkings ({len(df_tous)}) : {duree_tous * 1000:7.2f} ms")
+    print(f"  toutes les cartes ({len(cartes)})        : {duree_cartes * 1000:7.2f} ms"
+          f" (+ {len(cartes)} éléments Streamlit, contre 30 par page)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,76 @@
+"""Benchmark de la page légère contre le démarrage du dashboard
+
+- durée d'import, dans un processus neuf, de ce que charge le dashboard (streamlit,
+  pandas, folium) et de ce que demande la page légère (page_legere seul) ;
+- durée de génération et taille (brute / gzip) de la page pour des registres de
+  plusieurs tailles, comparée à la fenêtre TCP initiale (10 segments, ~14 Ko).
+
+Usage : python benchmarks/bench_page_legere.py [--tailles 9 100 1000 5000]
+"""
+import argparse
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+
+RACINE = os.path.join(os.path.dirname(__file__), '..')
+sys.path.insert(0, RACINE)
+
+from page_legere import publier_page
+
+FENETRE_INITIALE = 10 * 1460
+
+
+def duree_import(modules, repetitions=3):
+    """Meilleure durée (s) de `import modules` dans un interpréteur neuf"""
+    code = f"import time; t = time.perf_counter(); import {', '.join(modules)}; print(time.perf_counter() - t)"
+    durees = []
+    for _ in range(repetitions):
+        sortie = subprocess.run([sys.executable, '-c', code], cwd=RACINE, capture_output=True, text=True, check=True)
+        durees.append(float(sortie.stdout.strip()))
+    return min(durees)
+
+
+def snapshot_synthetique(nb_parkings, nb_villes, graine=1):
+    aleatoire = random.Random(graine)
+    parkings, villes = {}, {}
+    for i in range(nb_parkings):
+        nom = f'Parking {i:05d}'
+        capacite = aleatoire.randint(100, 1500)
+        places = aleatoire.randint(0, capacite)
+        ouvert = aleatoire.random() > 0.05
+        parkings[nom] = {
+            'Places': places if ouvert else 0, 'Capacite': capacite,
+            'Affichage': f'{places} / {capacite}' if ouvert else 'Fermeture temporaire',
+            'Statut': '✅ Ouvert' if ouvert else '⚠️ Fermeture temporaire', 'Timestamp': '12:00:00',
+        }
+        villes.setdefault(f'Ville {i * nb_villes // nb_parkings:02d}', []).append(nom)
+    previsions = {nom: {'15': r['Places'], '30': r['Places'], '60': r['Places']} for nom, r in parkings.items()}
+    return {'sequence': 1, 'timestamp': '12:00:00', 'ts': 0, 'parkings': parkings, 'previsions': previsions}, villes
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--tailles', type=int, nargs='+', default=[9, 100, 1000, 5000])
+    args = parser.parse_args()
+
+    print("Import dans un processus neuf")
+    for modules in (['streamlit'], ['streamlit', 'pandas'], ['streamlit', 'pandas', 'folium'], ['page_legere']):
+        print(f"  {' + '.join(modules):<28} : {duree_import(modules) * 1000:7.0f} ms")
+
+    print(f"\nPage légère (fenêtre TCP initiale : {FENETRE_INITIALE} octets)")
+    dossier = tempfile.mkdtemp(prefix='bench_page_legere_')
+    for taille in args.tailles:
+        snapshot, villes = snapshot_synthetique(taille, max(1, taille // 250))
+        debut = time.perf_counter()
+        brute, compressee = publier_page(snapshot, villes, dossier)
+        duree = time.perf_counter() - debut
+        aller_retour = 'oui' if compressee <= FENETRE_INITIALE else 'non'
+        print(f"  {taille:>6} parkings : génération {duree * 1000:7.2f} ms | {brute:>9} octets | "
+              f"gzip {compressee:>8} octets | premier aller-retour : {aller_retour}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,111 @@
+"""Sweeps contre un faux serveur à pannes injectées : disjoncteurs, relances, dernière valeur connue
+
+Deux hôtes locaux (benchmarks/serveur_pannes.py) : sur le premier, quelques pages
+bloquent, renvoient 500 / 503 ou coupent la connexion ; le second tombe entièrement.
+Après un sweep sans panne, on enchaîne des sweeps avec pannes puis des sweeps après
+rétablissement, avec et sans disjoncteurs. Pour chaque sweep : durée, requêtes
+reçues par les serveurs, parkings affichés à 0 à tort, dernières valeurs servies.
+
+Usage : python benchmarks/bench_pannes.py [--parkings 40] [--timeout 1.0] [--sweeps 4]
+"""
+import argparse
+import csv
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, os.path.dirname(__file__))
+
+from serveur_pannes import ServeurPannes, places
+
+# page_id -> comportement sur le premier hôte, un parking sur trois (le second hôte tombe entièrement)
+PANNES = {'1': 'bloque', '4': 'erreur', '7': 'intermittent', '10': 'coupure', '13': 'lent',
+          '16': 'bloque', '19': 'erreur', '22': 'intermittent', '25': 'coupure', '28': 'intermittent'}
+
+
+def ecrire_registre(chemin, nb_parkings, urls):
+    """Registre CSV : les trois quarts des parkings sur le premier hôte, le reste sur le second"""
+    with open(chemin, 'w', newline='', encoding='utf-8') as f:
+        ecrivain = csv.writer(f)
+        ecrivain.writerow(['ville', 'nom', 'url', 'page_id', 'capacite', 'latitude', 'longitude'])
+        for i in range(nb_parkings):
+            url = urls[0] if i < nb_parkings * 3 // 4 else urls[1]
+            ecrivain.writerow(['Ville', f'Parking {i:03d}', url, i, 500, 43.5, 5.4])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--parkings', type=int, default=40)
+    parser.add_argument('--timeout', type=float, default=1.0, help="timeout du scraper (s)")
+    parser.add_argument('--sweeps', type=int, default=4, help="sweeps avec pannes")
+    args = parser.parse_args()
+
+    serveurs = [ServeurPannes(blocage=3 * args.timeout).demarrer() for _ in range(2)]
+    chemin = os.path.join(tempfile.mkdtemp(prefix='bench_pannes_'), 'registre.csv')
+    ecrire_registre(chemin, args.parkings, [s.url for s in serveurs])
+
+    # Le registre est lu à l'import du scraper
+    os.environ['PARKING_REGISTRE'] = chemin
+    os.environ.pop('PARKING_FIXTURES_MODE', None)
+    import disjoncteur
+    import scraper
+    from collector import fusionner
+
+    scraper.TIMEOUT = args.timeout
+    scraper.DELAI_MAX_PARKING = 1.6 * args.timeout
+    disjoncteur.DELAI_OUVERTURE = 1.0
+    disjoncteur.DELAI_OUVERTURE_MAX = 2.0
+    noms = list(scraper.parkings)
+    attendu = {nom: places(scraper.parkings[nom][1]) for nom in noms}
+
+    for avec_disjoncteurs in (True, False):
+        print("Avec disjoncteurs, relances et dernière valeur connue" if avec_disjoncteurs
+              else "\nSans disjoncteurs (une tentative, l'échec remplace la valeur)")
+        if avec_disjoncteurs:
+            disjoncteur.hotes = disjoncteur.Disjoncteurs(disjoncteur.DisjoncteurTaux)
+            disjoncteur.parkings = disjoncteur.Disjoncteurs(seuil=disjoncteur.SEUIL_ECHECS_PARKING)
+        else:
+            disjoncteur.hotes = disjoncteur.parkings = disjoncteur.Disjoncteurs(seuil=10 ** 9)
+        disjoncteur.budgets = disjoncteur.BudgetsRelances()
+        disjoncteur.TENTATIVES_MAX = 3 if avec_disjoncteurs else 1
+        scraper.sessions.fermer()
+        for serveur in serveurs:
+            serveur.pannes.clear()
+        snapshot = {}
+
+        etapes = ['sans panne'] + ['pannes'] * args.sweeps + ['rétablis'] * 2
+        for numero, etape in enumerate(etapes):
+            if etape == 'pannes' and numero == 1:
+                serveurs[0].pannes.update(PANNES)
+                serveurs[1].pannes.update({str(i): 'erreur' for i in range(args.parkings)})
+            if etape == 'rétablis' and etapes[numero - 1] == 'pannes':
+                for serveur in serveurs:
+                    serveur.pannes.clear()
+                # Laisser passer le délai de réouverture des disjoncteurs (étalé de ±20 %)
+                time.sleep(1.2 * disjoncteur.DELAI_OUVERTURE_MAX)
+            for serveur in serveurs:
+                serveur.requetes.clear()
+
+            debut = time.perf_counter()
+            mesures = scraper.scraper_parkings(noms)
+            duree = time.perf_counter() - debut
+            if avec_disjoncteurs:
+                snapshot = fusionner(snapshot, mesures, noms)
+            else:
+                snapshot = {**snapshot, **mesures}
+
+            requetes = sum(sum(s.requetes.values()) for s in serveurs)
+            zeros = sum(1 for nom, releve in snapshot.items() if releve['Places'] == 0)
+            anciennes = sum(1 for releve in snapshot.values() if 'Age' in releve)
+            justes = sum(1 for nom, releve in snapshot.items() if releve['Places'] == attendu[nom])
+            print(f"  sweep {numero} ({etape:<10}) : {duree:5.2f} s | {requetes:3d} requêtes | "
+                  f"{zeros:2d} à 0 | {anciennes:2d} dernières valeurs | {justes}/{len(noms)} justes")
+
+    for serveur in serveurs:
+        serveur.arreter()
+
+
+if __name__ == '__main__':
+    main()
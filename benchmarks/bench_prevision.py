@@ -0,0 +1,98 @@
+"""Benchmark du modèle de prévision sur des relevés synthétiques
+
+Chaque parking suit un profil journalier (creux de la mi-journée, week-end plus
+calme), décalé d'un parking à l'autre, plus un écart aléatoire persistant et du bruit.
+On mesure la durée d'apprentissage d'un sweep et de prévision du registre entier,
+puis l'erreur moyenne à 15 / 30 / 60 min comparée à la persistance (dernier relevé).
+
+Usage : python benchmarks/bench_prevision.py [--parkings 5000] [--semaines 3] [--pas 300]
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from prevision import HORIZONS, Prevision, position_semaine
+
+DEBUT = 1_735_513_200  # lundi 30/12/2024 0 h, heure de Paris
+
+
+class Simulation:
+    """Taux de places libres synthétiques, avec un écart AR(1) par parking"""
+
+    def __init__(self, nb_parkings, graine=1):
+        self.aleatoire = np.random.default_rng(graine)
+        self.capacites = self.aleatoire.integers(100, 1500, nb_parkings).astype(np.float64)
+        self.decalage = self.aleatoire.uniform(-2, 2, nb_parkings)
+        self.amplitude = self.aleatoire.uniform(0.2, 0.45, nb_parkings)
+        self.ecart = np.zeros(nb_parkings)
+
+    def taux_moyen(self, ts):
+        heure = position_semaine(ts)
+        jour, heure = divmod(heure, 24)
+        creux = np.cos(2 * np.pi * (heure - 14 - self.decalage) / 24)
+        facteur = 1.0 if jour < 5 else 0.5
+        return 0.5 + facteur * self.amplitude * creux
+
+    def releve(self, ts, pas):
+        # Écart persistant (~1 h) ajouté au profil, plus un bruit de mesure
+        persistance = np.exp(-pas / 3600)
+        self.ecart = persistance * self.ecart + self.aleatoire.normal(0, 0.03, len(self.ecart))
+        taux = self.taux_moyen(ts) + self.ecart + self.aleatoire.normal(0, 0.01, len(self.ecart))
+        return np.rint(np.clip(taux, 0, 1) * self.capacites)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--parkings', type=int, default=5000)
+    parser.add_argument('--semaines', type=int, default=3, help="semaines d'apprentissage")
+    parser.add_argument('--pas', type=int, default=300, help="secondes entre deux sweeps (diviseur de 15 min)")
+    args = parser.parse_args()
+
+    simulation = Simulation(args.parkings)
+    noms = [f'Parking {i:05d}' for i in range(args.parkings)]
+    modele = Prevision(dict(zip(noms, simulation.capacites.astype(int))))
+
+    sweeps_par_semaine = 7 * 86400 // args.pas
+    durees_apprentissage = []
+    ts = DEBUT
+    for _ in range(args.semaines * sweeps_par_semaine):
+        places = simulation.releve(ts, args.pas)
+        t0 = time.perf_counter()
+        modele.apprendre(noms, places, ts)
+        durees_apprentissage.append(time.perf_counter() - t0)
+        ts += args.pas
+
+    # Semaine d'évaluation : prévision à chaque sweep, comparée aux relevés futurs
+    horizons = [h * 60 // args.pas for h in HORIZONS]
+    releves, previsions, durees_prevision = [], [], []
+    for _ in range(sweeps_par_semaine):
+        places = simulation.releve(ts, args.pas)
+        modele.apprendre(noms, places, ts)
+        t0 = time.perf_counter()
+        previsions.append(modele.prevoir(ts))
+        durees_prevision.append(time.perf_counter() - t0)
+        releves.append(places)
+        ts += args.pas
+    releves = np.array(releves)
+    previsions = np.array(previsions)
+
+    print(f"{args.parkings} parkings, {args.semaines} semaines d'apprentissage, un sweep toutes les {args.pas} s\n")
+    print(f"Apprentissage d'un sweep : médiane {np.median(durees_apprentissage) * 1000:6.2f} ms")
+    print(f"Prévision du registre    : médiane {np.median(durees_prevision) * 1000:6.2f} ms\n")
+    print("Erreur absolue moyenne (places)   modèle   persistance")
+    for j, (minutes, decalage) in enumerate(zip(HORIZONS, horizons)):
+        if decalage == 0 or decalage >= len(releves):
+            continue
+        reel = releves[decalage:]
+        modele_mae = np.nanmean(np.abs(previsions[:-decalage, :, j] - reel))
+        persistance_mae = np.mean(np.abs(releves[:-decalage] - reel))
+        print(f"  à {minutes:>2} min                      {modele_mae:8.2f}   {persistance_mae:8.2f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,132 @@
+"""Benchmark de l'index spatial : requêtes « k plus proches » sur un registre synthétique
+
+Compare la grille de proximite.py à un parcours linéaire de tous les parkings,
+et la mise à jour incrémentale de l'index à une reconstruction complète.
+
+Usage : python benchmarks/bench_proximite.py [--parkings 50000] [--villes 100] [--requetes 10000]
+"""
+import argparse
+import heapq
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from proximite import DISTANCE_MAX, FACTEUR_DETOUR, IndexSpatial, disponible, distance
+
+
+def registre_synthetique(nb_parkings, nb_villes, graine=1):
+    """Parkings répartis autour de centres de villes (format scraper : (url, page_id, capacite, lat, lon))"""
+    aleatoire = random.Random(graine)
+    centres = [(aleatoire.uniform(42.5, 49.5), aleatoire.uniform(-1.0, 7.5)) for _ in range(nb_villes)]
+    parkings, data = {}, {}
+    for i in range(nb_parkings):
+        lat, lon = centres[i % nb_villes]
+        lat += aleatoire.gauss(0, 0.02)
+        lon += aleatoire.gauss(0, 0.02)
+        nom = f'Parking {i:06d}'
+        capacite = aleatoire.randint(50, 1500)
+        parkings[nom] = ('http://exemple/', i, capacite, lat, lon)
+        places = aleatoire.randint(0, capacite)
+        statut = '✅ Ouvert' if aleatoire.random() > 0.1 else '⚠️ Fermeture temporaire'
+        data[nom] = {'Places': places, 'Statut': statut}
+    return parkings, data, centres
+
+
+def proches_lineaire(parkings, data, lat, lon, k, min_places):
+    """Référence : distance à tous les parkings puis k plus petites (même distance maximale)"""
+    candidats = (
+        (distance(lat, lon, p[3], p[4]), nom) for nom, p in parkings.items()
+        if disponible(data[nom], min_places)
+    )
+    candidats = ((d, nom) for d, nom in candidats if d <= DISTANCE_MAX / FACTEUR_DETOUR)
+    return [nom for _, nom in heapq.nsmallest(k, candidats)]
+
+
+def percentile(valeurs, p):
+    valeurs = sorted(valeurs)
+    return valeurs[min(len(valeurs) - 1, int(len(valeurs) * p))]
+
+
+def chronometrer_synchro(index, parkings, repetitions=1000):
+    """Durées d'un appel à synchroniser() sans changement de version"""
+    durees = []
+    for _ in range(repetitions):
+        t0 = time.perf_counter()
+        index.synchroniser(parkings, 2)
+        durees.append(time.perf_counter() - t0)
+    return durees
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--parkings', type=int, default=50000)
+    parser.add_argument('--villes', type=int, default=100)
+    parser.add_argument('--requetes', type=int, default=10000)
+    parser.add_argument('--k', type=int, default=3)
+    parser.add_argument('--min-places', type=int, default=20)
+    args = parser.parse_args()
+
+    parkings, data, centres = registre_synthetique(args.parkings, args.villes)
+    print(f"{len(parkings)} parkings, {len(centres)} villes\n")
+
+    index = IndexSpatial()
+    debut = time.perf_counter()
+    index.synchroniser(parkings, 1)
+    construction = time.perf_counter() - debut
+
+    # Registre modifié : 10 parkings déplacés, 10 ajoutés, 10 retirés
+    modifie = dict(parkings)
+    noms = list(parkings)
+    for nom in noms[:10]:
+        url, page_id, capacite, lat, lon = modifie[nom]
+        modifie[nom] = (url, page_id, capacite, lat + 0.001, lon)
+    for nom in noms[10:20]:
+        del modifie[nom]
+    for i in range(10):
+        modifie[f'Nouveau {i}'] = ('http://exemple/', i, 100, *centres[i])
+    debut = time.perf_counter()
+    modifies = index.synchroniser(modifie, 2)
+    incremental = time.perf_counter() - debut
+    debut = time.perf_counter()
+    IndexSpatial().synchroniser(modifie, 2)
+    complet = time.perf_counter() - debut
+    print(f"Construction initiale     : {construction * 1000:8.1f} ms")
+    print(f"Mise à jour ({modifies} parkings) : {incremental * 1000:8.1f} ms (reconstruction complète {complet * 1000:.1f} ms)")
+    print(f"Version inchangée         : {min(chronometrer_synchro(index, modifie)) * 1e6:8.2f} µs\n")
+
+    aleatoire = random.Random(2)
+    points = []
+    for _ in range(args.requetes):
+        lat, lon = aleatoire.choice(centres)
+        points.append((lat + aleatoire.gauss(0, 0.02), lon + aleatoire.gauss(0, 0.02)))
+    for nom in list(data):
+        if nom not in modifie:
+            del data[nom]
+    for nom in modifie:
+        data.setdefault(nom, {'Places': 100, 'Statut': '✅ Ouvert'})
+
+    durees = []
+    for lat, lon in points:
+        t0 = time.perf_counter()
+        index.proches(lat, lon, data, args.k, args.min_places)
+        durees.append(time.perf_counter() - t0)
+    print(f"Index spatial  : p50 {percentile(durees, 0.5) * 1e6:8.1f} µs | p99 {percentile(durees, 0.99) * 1e6:8.1f} µs")
+
+    # Vérification et référence linéaire sur un échantillon (beaucoup plus lente)
+    echantillon = points[:200]
+    durees, differences = [], 0
+    for lat, lon in echantillon:
+        t0 = time.perf_counter()
+        attendu = proches_lineaire(modifie, data, lat, lon, args.k, args.min_places)
+        durees.append(time.perf_counter() - t0)
+        obtenu = [nom for nom, _, _ in index.proches(lat, lon, data, args.k, args.min_places)]
+        differences += obtenu != attendu
+    print(f"Parcours linéaire : p50 {percentile(durees, 0.5) * 1e6:8.1f} µs | p99 {percentile(durees, 0.99) * 1e6:8.1f} µs")
+    print(f"Résultats différents de la référence : {differences}/{len(echantillon)}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,117 @@
+"""Test de charge de l'API REST (api.py)
+
+Deux modes :
+  python benchmarks/charge_api.py                          appels ASGI directs, sur un cœur
+  python benchmarks/charge_api.py --url http://127.0.0.1:8000 [--clients 8]
+                                                           requêtes HTTP keep-alive vers un serveur lancé
+                                                           avec : uvicorn api:app --workers 1
+"""
+import argparse
+import asyncio
+import http.client
+import os
+import sys
+import threading
+import time
+from urllib.parse import urlparse
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+CHEMINS = ['/parkings', '/parkings/Rotonde', '/parkings/Carnot']
+
+
+def scenarios(etag):
+    """(chemin, en-têtes) envoyés en boucle : requêtes complètes, gzip et conditionnelles"""
+    return [
+        (CHEMINS[0], {}),
+        (CHEMINS[0], {'Accept-Encoding': 'gzip'}),
+        (CHEMINS[0], {'If-None-Match': etag}),
+        (CHEMINS[1], {}),
+        (CHEMINS[2], {'Accept-Encoding': 'gzip'}),
+    ]
+
+
+async def charge_asgi(duree):
+    """Appelle directement l'application ASGI, sans réseau : coût de l'API seule"""
+    from api import app, etat
+
+    etat.actualiser()
+    if etat.snapshot is None:
+        sys.exit("Aucun snapshot : lancer le collecteur au moins une fois")
+    etag = f'"{etat.version[0]}-{etat.version[1]}"'
+
+    async def receive():
+        return {'type': 'http.request', 'body': b'', 'more_body': False}
+
+    async def send(message):
+        pass
+
+    requetes = [
+        {'type': 'http', 'method': 'GET', 'path': chemin, 'query_string': b'',
+         'headers': [(cle.lower().encode(), valeur.encode()) for cle, valeur in en_tetes.items()]}
+        for chemin, en_tetes in scenarios(etag)
+    ]
+    total = 0
+    debut = time.perf_counter()
+    while time.perf_counter() - debut < duree:
+        for scope in requetes:
+            await app(scope, receive, send)
+        total += len(requetes)
+    return total, time.perf_counter() - debut
+
+
+def charge_http(url, clients, duree):
+    """Requêtes HTTP keep-alive depuis plusieurs threads vers un serveur lancé"""
+    cible = urlparse(url)
+    connexion = http.client.HTTPConnection(cible.hostname, cible.port or 80)
+    connexion.request('GET', '/parkings')
+    reponse = connexion.getresponse()
+    reponse.read()
+    etag = reponse.getheader('ETag', '')
+    connexion.close()
+
+    compteurs = [0] * clients
+    latences = [[] for _ in range(clients)]
+    arret = time.perf_counter() + duree
+
+    def client(i):
+        connexion = http.client.HTTPConnection(cible.hostname, cible.port or 80)
+        requetes = scenarios(etag)
+        while time.perf_counter() < arret:
+            for chemin, en_tetes in requetes:
+                t0 = time.perf_counter()
+                connexion.request('GET', chemin, headers=en_tetes)
+                connexion.getresponse().read()
+                latences[i].append(time.perf_counter() - t0)
+                compteurs[i] += 1
+        connexion.close()
+
+    debut = time.perf_counter()
+    threads = [threading.Thread(target=client, args=(i,)) for i in range(clients)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    toutes = sorted(l for liste in latences for l in liste)
+    return sum(compteurs), time.perf_counter() - debut, toutes
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--url', help="URL d'un serveur lancé (sinon appels ASGI directs)")
+    parser.add_argument('--clients', type=int, default=8)
+    parser.add_argument('--duree', type=float, default=5.0)
+    args = parser.parse_args()
+
+    if args.url:
+        total, duree, latences = charge_http(args.url, args.clients, args.duree)
+        p50 = latences[len(latences) // 2] * 1000
+        p99 = latences[int(len(latences) * 0.99)] * 1000
+        print(f"{total} requêtes en {duree:.1f} s : {total / duree:,.0f} req/s (p50 {p50:.2f} ms, p99 {p99:.2f} ms)")
+    else:
+        total, duree = asyncio.run(charge_asgi(args.duree))
+        print(f"{total} requêtes ASGI en {duree:.1f} s : {total / duree:,.0f} req/s sur un cœur")
+
+
+if __name__ == '__main__':
+    main()
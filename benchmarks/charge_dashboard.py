@@ -0,0 +1,216 @@
+"""Test de charge du dashboard multi-processus : latence des pages, à froid ou préchauffé
+
+Un serveur local rejoue les réponses enregistrées de Semepa et de l'API AMP
+(enregistrements.ServeurRejeu, latence configurable) ; un processus leader fait
+tourner le collecteur. Chaque processus « serveur » simule un processus Streamlit :
+plusieurs sessions (threads, streamlit.testing AppTest) y chargent la page,
+affichent la carte, puis la rechargent. Deux scénarios, chacun dans un dossier neuf :
+
+    froid        les sessions arrivent dès le lancement : pas encore de snapshot ni de
+                 carte, chaque processus importe ses modules à la première session
+    prechauffe   comme serveur_dashboard.py : premier snapshot publié et cartes
+                 précalculées par le leader, processus préchauffés (prechauffer_processus)
+                 avant la première session
+
+Sont rapportées les latences des pages (p50 / p99 de toutes les pages, de la première
+page et de l'affichage de la carte), puis toutes les sessions cliquent en même temps
+sur « Rafraîchir » : latence du clic et nombre de sweeps déclenchés.
+
+Usage : python benchmarks/charge_dashboard.py [--processus 2] [--sessions 4] [--pages 5] [--latence 0.05]
+"""
+import argparse
+import multiprocessing
+import os
+import sys
+import tempfile
+import threading
+import time
+
+RACINE = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, RACINE)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+SCRIPT = os.path.join(RACINE, 'dashboard_parking.py')
+BOUTON = "🔄 Rafraîchir maintenant"
+SCENARIOS = ('froid', 'prechauffe')
+# Au-delà (s), une session bloquée fait échouer le scénario
+DELAI = 300
+
+
+def centile(valeurs, q):
+    valeurs = sorted(valeurs)
+    return valeurs[min(len(valeurs) - 1, int(q * len(valeurs)))]
+
+
+def leader(prechauffe, latence, registre_pret, pret, arret, sweeps):
+    """Serveur de rejeu et collecteur (seul à scraper) ; `sweeps` compte les sweeps"""
+    from enregistrements import MagasinReponses, ServeurRejeu
+    from suite import registre_local
+
+    serveur = ServeurRejeu(MagasinReponses(), latence).demarrer()
+    registre_local(serveur, os.environ['PARKING_REGISTRE'])
+    registre_pret.set()
+    import sources
+    sources.AMP_URL = serveur.url_locale(sources.AMP_URL)
+    # Relevés AMP datés de leur enregistrement
+    sources.AGE_MAX_AMP = None
+    import collector
+
+    class CollecteurCompte(collector.Collecteur):
+        def collecter(self, noms=None):
+            with sweeps.get_lock():
+                sweeps.value += 1
+            return super().collecter(noms)
+
+    threading.Thread(target=CollecteurCompte(collector.acquerir_verrou()).boucle, daemon=True).start()
+    if prechauffe:
+        from serveur_dashboard import prechauffer
+        prechauffer()
+    pret.set()
+    arret.wait()
+    serveur.arreter()
+
+
+def session(pages, latences, barriere):
+    """Une visite : première page, carte, rechargements, puis clic simultané sur Rafraîchir"""
+    from streamlit.testing.v1 import AppTest
+
+    def mesurer(nom, application):
+        debut = time.perf_counter()
+        application.run()
+        latences.append((nom, time.perf_counter() - debut))
+        if application.exception:
+            raise RuntimeError(application.exception[0].message)
+
+    application = AppTest.from_file(SCRIPT, default_timeout=120)
+    try:
+        mesurer('premiere', application)
+        application.toggle(key='carte').set_value(True)
+        mesurer('carte', application)
+        for _ in range(pages - 2):
+            mesurer('page', application)
+    except BaseException:
+        # Les autres sessions n'attendent pas indéfiniment un clic qui ne viendra pas
+        barriere.abort()
+        raise
+    barriere.wait(timeout=DELAI)
+    next(bouton for bouton in application.button if bouton.label == BOUTON).click()
+    mesurer('rafraichir', application)
+
+
+def runtime_partage():
+    """Un seul Runtime (simulé) pour toutes les sessions du processus, comme un vrai serveur
+
+    AppTest installe son propre Runtime à chaque exécution puis le retire : des sessions
+    simultanées se le retireraient l'une à l'autre, et st.cache_data ne serait pas
+    partagé entre elles.
+    """
+    from unittest.mock import MagicMock
+
+    from streamlit.runtime import Runtime
+    from streamlit.runtime.caching.storage.dummy_cache_storage import MemoryCacheStorageManager
+    from streamlit.runtime.media_file_manager import MediaFileManager
+    from streamlit.runtime.memory_media_file_storage import MemoryMediaFileStorage
+
+    runtime = MagicMock(spec=Runtime)
+    runtime.media_file_mgr = MediaFileManager(MemoryMediaFileStorage('/mock/media'))
+    runtime.cache_storage_manager = MemoryCacheStorageManager()
+    Runtime.instance = classmethod(lambda cls: runtime)
+    Runtime.exists = classmethod(lambda cls: True)
+
+
+def processus_serveur(prechauffe, sessions, pages, prets, depart, barriere, resultats):
+    """Un processus du dashboard et ses sessions simultanées"""
+    runtime_partage()
+    if prechauffe:
+        from serveur_dashboard import prechauffer_processus
+        prechauffer_processus()
+    prets.release()
+    depart.wait()
+    latences = []
+    fils = [threading.Thread(target=session, args=(pages, latences, barriere)) for _ in range(sessions)]
+    for fil in fils:
+        fil.start()
+    for fil in fils:
+        fil.join()
+    resultats.put(latences)
+
+
+def scenario(nom, args):
+    """Lance un scénario dans un dossier neuf ; retourne (latences, sweeps des clics)"""
+    dossier = tempfile.mkdtemp(prefix=f'charge_dashboard_{nom}_')
+    os.chdir(dossier)
+    os.environ.update({
+        'PARKING_REGISTRE': os.path.join(dossier, 'parkings.json'),
+        'PARKING_SNAPSHOT_SHM': os.path.join(dossier, 'parkings_snapshot.shm'),
+        'PARKING_RENDUS_DIR': os.path.join(dossier, 'rendus'),
+        'PARKING_COLLECTEUR_EXTERNE': '1',
+        'PARKING_PRECALCUL_CARTES': '1' if nom == 'prechauffe' else '0',
+    })
+    os.environ.pop('PARKING_FIXTURES_MODE', None)
+    contexte = multiprocessing.get_context('spawn')
+    registre_pret, pret, arret, depart = (contexte.Event() for _ in range(4))
+    sweeps = contexte.Value('i', 0)
+    prets = contexte.Semaphore(0)
+    barriere = contexte.Barrier(args.processus * args.sessions + 1)
+    resultats = contexte.Queue()
+    prechauffe = nom == 'prechauffe'
+
+    processus_leader = contexte.Process(target=leader, args=(prechauffe, args.latence, registre_pret, pret, arret, sweeps))
+    processus_leader.start()
+    registre_pret.wait()
+    if prechauffe:
+        # Le service n'accepte du trafic qu'une fois le snapshot et les cartes prêts
+        pret.wait()
+    serveurs = [contexte.Process(target=processus_serveur, args=(
+        prechauffe, args.sessions, args.pages, prets, depart, barriere, resultats)) for _ in range(args.processus)]
+    for serveur in serveurs:
+        serveur.start()
+    if prechauffe:
+        for _ in serveurs:
+            prets.acquire()
+    depart.set()
+
+    # Les clics attendent que le dernier sweep complet soit assez ancien pour justifier un sweep
+    from collector import FRAICHEUR_DEMANDE, date_sweep_complet
+    while date_sweep_complet() == 0:
+        time.sleep(0.1)
+    time.sleep(max(0.0, date_sweep_complet() + FRAICHEUR_DEMANDE + 1 - time.time()))
+    barriere.wait(timeout=DELAI)
+    avant = sweeps.value
+    latences = [latence for _ in serveurs for latence in resultats.get()]
+    declenches = sweeps.value - avant
+    for serveur in serveurs:
+        serveur.join()
+    arret.set()
+    processus_leader.join()
+    return latences, declenches
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--processus', type=int, default=2, help="processus du dashboard")
+    parser.add_argument('--sessions', type=int, default=4, help="sessions simultanées par processus")
+    parser.add_argument('--pages', type=int, default=5, help="pages chargées par session (au moins 2)")
+    parser.add_argument('--latence', type=float, default=0.05, help="latence du serveur de rejeu (s)")
+    args = parser.parse_args()
+
+    clics = args.processus * args.sessions
+    print(f"{args.processus} processus x {args.sessions} sessions, {args.pages} pages par session, "
+          f"latence de rejeu {args.latence * 1000:.0f} ms")
+    for nom in SCENARIOS:
+        latences, declenches = scenario(nom, args)
+        par_type = {}
+        for type_page, duree in latences:
+            par_type.setdefault(type_page, []).append(duree * 1000)
+        pages = [duree for type_page, durees in par_type.items() if type_page != 'rafraichir' for duree in durees]
+        print(f"  {nom:<11} pages p50 {centile(pages, 0.5):7.0f} ms  p99 {centile(pages, 0.99):7.0f} ms | "
+              f"première page p50 {centile(par_type['premiere'], 0.5):7.0f} ms  "
+              f"p99 {centile(par_type['premiere'], 0.99):7.0f} ms | "
+              f"carte p50 {centile(par_type['carte'], 0.5):6.0f} ms")
+        print(f"  {'':<11} {clics} clics simultanés sur Rafraîchir : {declenches} sweep(s), "
+              f"p50 {centile(par_type['rafraichir'], 0.5):6.0f} ms  p99 {centile(par_type['rafraichir'], 0.99):6.0f} ms")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,120 @@
+"""Faux serveur Semepa à pannes injectées, pour éprouver le scraping sans le réseau
+
+Chaque page (paramètre page_id) suit un comportement, modifiable entre deux sweeps
+(`serveur.pannes[page_id] = 'bloque'`) :
+
+    ok            page normale après `latence` secondes
+    lent          page normale après `latence_lente` secondes
+    bloque        aucune réponse pendant `blocage` secondes (au-delà du timeout du scraper)
+    erreur        HTTP 500
+    intermittent  HTTP 503 une requête sur deux (une relance aboutit)
+    coupure       connexion fermée sans réponse
+
+La page affiche `places(page_id)` places libres, jamais 0 : un zéro dans le
+snapshot est donc une valeur inventée par le collecteur.
+
+Usage autonome : python benchmarks/serveur_pannes.py --port 8765 3=bloque 5=erreur 7=intermittent
+"""
+import argparse
+import threading
+import time
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+PAGE = (
+    '<!DOCTYPE html><html lang="fr-FR"><head><meta charset="UTF-8"><title>Parking</title></head>'
+    '<body><p class="nbPlaces"><span style="font-size:30px;color:#ae0a15;">{}</span> places libres</p>'
+    '</body></html>'
+)
+COMPORTEMENTS = ('ok', 'lent', 'bloque', 'erreur', 'intermittent', 'coupure')
+
+
+def places(page_id):
+    """Places libres servies pour une page (toujours > 0)"""
+    return 10 + int(page_id) * 37 % 400
+
+
+class ServeurPannes:
+    """Serveur HTTP/1.1 local dont chaque page peut être mise en panne"""
+
+    def __init__(self, latence=0.005, latence_lente=0.5, blocage=3.0, port=0):
+        self.latence = latence
+        self.latence_lente = latence_lente
+        self.blocage = blocage
+        self.pannes = {}             # page_id (str) -> comportement, 'ok' par défaut
+        self.requetes = Counter()    # page_id -> requêtes reçues
+        self._verrou = threading.Lock()
+        self._serveur = ThreadingHTTPServer(('127.0.0.1', port), self._gestionnaire())
+        self._serveur.daemon_threads = True
+        self.url = f'http://127.0.0.1:{self._serveur.server_address[1]}/'
+
+    def demarrer(self):
+        threading.Thread(target=self._serveur.serve_forever, daemon=True).start()
+        return self
+
+    def arreter(self):
+        self._serveur.shutdown()
+        self._serveur.server_close()
+
+    def _compter(self, page_id):
+        with self._verrou:
+            self.requetes[page_id] += 1
+            return self.requetes[page_id]
+
+    def _gestionnaire(self):
+        serveur = self
+
+        class Gestionnaire(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def do_GET(self):
+                page_id = parse_qs(urlparse(self.path).query).get('page_id', ['0'])[0]
+                numero = serveur._compter(page_id)
+                comportement = serveur.pannes.get(page_id, 'ok')
+                if comportement == 'coupure':
+                    self.close_connection = True
+                    return
+                if comportement == 'bloque':
+                    time.sleep(serveur.blocage)
+                    self.close_connection = True
+                    return
+                if comportement == 'erreur' or (comportement == 'intermittent' and numero % 2):
+                    self._repondre(500 if comportement == 'erreur' else 503, b'indisponible')
+                    return
+                time.sleep(serveur.latence_lente if comportement == 'lent' else serveur.latence)
+                self._repondre(200, PAGE.format(places(page_id)).encode())
+
+            def _repondre(self, code, corps):
+                self.send_response(code)
+                self.send_header('Content-Type', 'text/html; charset=UTF-8')
+                self.send_header('Content-Length', str(len(corps)))
+                self.end_headers()
+                self.wfile.write(corps)
+
+            def log_message(self, *args):
+                pass
+
+        return Gestionnaire
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--latence', type=float, default=0.005)
+    parser.add_argument('--blocage', type=float, default=30.0)
+    parser.add_argument('pannes', nargs='*', help="page_id=comportement")
+    args = parser.parse_args()
+
+    serveur = ServeurPannes(args.latence, blocage=args.blocage, port=args.port)
+    for panne in args.pannes:
+        page_id, comportement = panne.split('=')
+        if comportement not in COMPORTEMENTS:
+            parser.error(f"comportement inconnu : {comportement} ({', '.join(COMPORTEMENTS)})")
+        serveur.pannes[page_id] = comportement
+    print(f"Serveur à pannes sur {serveur.url} : {serveur.pannes or 'aucune panne'}")
+    serveur._serveur.serve_forever()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,263 @@
+"""Suite de benchmarks de bout en bout, comparée à une référence enregistrée
+
+Les réponses enregistrées (fixtures/http, voir enregistrements.py) sont rejouées
+par un serveur HTTP local avec une latence configurable ; le registre et l'URL
+de l'API AMP sont redirigés vers lui. On mesure :
+
+    sweep_froid_ms          premier sweep (API AMP puis Semepa), connexions à ouvrir
+    sweep_ms                sweep suivant, médiane (connexions keep-alive, réponses 304) ;
+                            l'API AMP doit encore y fournir les mêmes parkings
+    extraction_pages_s      débit d'extraction du bloc nbPlaces (pages de fixtures/html)
+    ecriture_snapshot_ms    save_cache() d'un snapshot de 1000 parkings, fichier binaire et export
+                            JSON (meilleure durée, comme les mesures suivantes et l'extraction)
+    lecture_snapshot_ms     load_snapshot() du même fichier, re-décodé en dicts (API)
+    lecture_vue_ms          load_vue() du même fichier, re-mappé (chemin chaud du dashboard)
+    segment_publication_ms  publication dans le segment partagé (codec binaire)
+    segment_lecture_ms      lecture d'une nouvelle version du segment (copie et VueSnapshot)
+    rendu_premier_ms        premier rendu complet de dashboard_parking.py (AppTest)
+    rendu_ms                rendus suivants, médiane
+
+Chaque mesure est comparée à benchmarks/reference.json : au-delà de la tolérance
+(30 % par défaut), elle est signalée en régression et le code de sortie vaut 1.
+
+Usage : python benchmarks/suite.py [--latence 0.05] [--repetitions 5] [--tolerance 0.3]
+        python benchmarks/suite.py --mettre-a-jour      # remplace la référence
+
+Pour rejouer des réponses réelles : PARKING_FIXTURES_MODE=enregistrer python collector.py
+(écrit fixtures/http/), puis relancer la suite.
+"""
+import argparse
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+RACINE = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, RACINE)
+
+REFERENCE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'reference.json')
+DOSSIER_PAGES = os.path.join(RACINE, 'fixtures', 'html')
+TAILLE_MORCEAU = 8 * 1024
+
+# nom -> (unité, sens) ; 'bas' : plus petit est meilleur
+MESURES = {
+    'sweep_froid_ms': ('ms', 'bas'),
+    'sweep_ms': ('ms', 'bas'),
+    'extraction_pages_s': ('pages/s', 'haut'),
+    'ecriture_snapshot_ms': ('ms', 'bas'),
+    'lecture_snapshot_ms': ('ms', 'bas'),
+    'lecture_vue_ms': ('ms', 'bas'),
+    'segment_publication_ms': ('ms', 'bas'),
+    'segment_lecture_ms': ('ms', 'bas'),
+    'rendu_premier_ms': ('ms', 'bas'),
+    'rendu_ms': ('ms', 'bas'),
+}
+
+
+def chronometrer(fonction, repetitions, statistique=statistics.median):
+    """Médiane (ou autre statistique) des durées (s) de `repetitions` appels"""
+    durees = []
+    for _ in range(repetitions):
+        debut = time.perf_counter()
+        fonction()
+        durees.append(time.perf_counter() - debut)
+    return statistique(durees)
+
+
+def chronometrer_court(fonction, repetitions):
+    """Meilleure durée (s) d'une opération de quelques ms, moins sensible à la charge de la machine"""
+    return chronometrer(fonction, repetitions * 20, min)
+
+
+def registre_local(serveur, chemin):
+    """Copie du registre dont les URLs pointent vers le serveur de rejeu"""
+    with open(os.path.join(RACINE, 'parkings.json'), encoding='utf-8') as f:
+        config = json.load(f)
+    for ville in config['villes'].values():
+        for parking in ville['parkings'].values():
+            parking['url'] = serveur.url_locale(parking['url'])
+    with open(chemin, 'w', encoding='utf-8') as f:
+        json.dump(config, f, ensure_ascii=False)
+
+
+def snapshot_synthetique(nb_parkings):
+    return {
+        f'Parking {i:05d}': {
+            'Places': i % 700, 'Capacite': 800, 'Affichage': f'{i % 700} / 800', 'Statut': '✅ Ouvert',
+            'Timestamp': '12:00:00', 'Ts': 1_760_000_000, 'latitude': 43.5 + i * 1e-5, 'longitude': 5.4,
+        }
+        for i in range(nb_parkings)
+    }
+
+
+def mesurer_sweeps(repetitions):
+    import sources
+    from scraper import sessions
+
+    sessions.fermer()
+    debut = time.perf_counter()
+    data = sources.collecter()
+    froid = time.perf_counter() - debut
+    if len(data) != len(sources.parkings):
+        print(f"  attention : {len(data)} parkings relevés sur {len(sources.parkings)}")
+    chaud = chronometrer(sources.collecter, repetitions)
+    # Sweeps suivants : l'API répond 304 (ETag), ses relevés doivent rester ceux de la page déjà lue
+    amp = sorted(nom for nom, releve in data.items() if releve['Source'] == 'amp')
+    amp_chaud = sorted(nom for nom, releve in sources.collecter().items() if releve['Source'] == 'amp')
+    if amp_chaud != amp:
+        raise RuntimeError(f"Sweep suivant : {len(amp_chaud)} parkings de l'API AMP au lieu de {len(amp)}")
+    return {'sweep_froid_ms': froid * 1000, 'sweep_ms': chaud * 1000}, data
+
+
+def mesurer_extraction(repetitions):
+    from extraction import extraire_flux
+
+    pages = []
+    for fichier in sorted(os.listdir(DOSSIER_PAGES)):
+        with open(os.path.join(DOSSIER_PAGES, fichier), 'rb') as f:
+            pages.append(f.read())
+
+    def extraire_tout():
+        for contenu in pages:
+            extraire_flux(contenu[i:i + TAILLE_MORCEAU] for i in range(0, len(contenu), TAILLE_MORCEAU))
+
+    duree = chronometrer_court(extraire_tout, repetitions * 10)
+    return {'extraction_pages_s': len(pages) / duree}
+
+
+def mesurer_snapshot(repetitions):
+    import cache
+    from snapshot_partage import SegmentEcrivain, SegmentLecteur
+
+    data = snapshot_synthetique(1000)
+    mesures = {'ecriture_snapshot_ms': chronometrer_court(lambda: cache.save_cache(data), repetitions) * 1000}
+
+    def relire():
+        cache._derniers.clear()  # oublie le dernier snapshot lu : le fichier est re-décodé
+        cache.load_snapshot()
+
+    def relire_vue():
+        cache._dernieres_vues.clear()
+        cache.load_vue()
+
+    mesures['lecture_snapshot_ms'] = chronometrer_court(relire, repetitions) * 1000
+    mesures['lecture_vue_ms'] = chronometrer_court(relire_vue, repetitions) * 1000
+
+    chemin = os.path.join(os.getcwd(), 'bench.shm')
+    ecrivain = SegmentEcrivain(chemin)
+    snapshot = cache.load_snapshot()
+    mesures['segment_publication_ms'] = chronometrer_court(lambda: ecrivain.publier_snapshot(snapshot), repetitions) * 1000
+    lecteur = SegmentLecteur(chemin)
+
+    def relire_segment():
+        lecteur.sequence, lecteur._sequence_objet = 0, None  # comme une nouvelle version : copie et décodage
+        lecteur.lire_vue()
+
+    mesures['segment_lecture_ms'] = chronometrer_court(relire_segment, repetitions) * 1000
+    ecrivain.fermer()
+    return mesures
+
+
+def mesurer_rendu(data, repetitions):
+    from streamlit.testing.v1 import AppTest
+
+    import cache
+
+    cache.save_cache(data)
+
+    def rendre():
+        application = AppTest.from_file(os.path.join(RACINE, 'dashboard_parking.py'), default_timeout=120).run()
+        if application.exception:
+            raise RuntimeError(application.exception[0].message)
+
+    debut = time.perf_counter()
+    rendre()
+    premier = time.perf_counter() - debut
+    return {'rendu_premier_ms': premier * 1000, 'rendu_ms': chronometrer(rendre, repetitions) * 1000}
+
+
+def comparer(mesures, reference, tolerance):
+    """Affiche chaque mesure face à la référence ; retourne les noms des régressions"""
+    regressions = []
+    print(f"\n{'mesure':<24} {'valeur':>12} {'référence':>12} {'écart':>8}")
+    for nom, (unite, sens) in MESURES.items():
+        if nom not in mesures:
+            continue
+        valeur = mesures[nom]
+        ref = reference.get(nom, {}).get('valeur')
+        if ref is None:
+            print(f"{nom:<24} {valeur:>9.2f} {unite:<3} {'-':>11}")
+            continue
+        ecart = valeur / ref - 1 if ref else 0.0
+        pire = ecart > tolerance if sens == 'bas' else ecart < -tolerance
+        if pire:
+            regressions.append(nom)
+        print(f"{nom:<24} {valeur:>9.2f} {unite:<3} {ref:>9.2f} {unite:<3} {ecart:>+7.0%}"
+              f"{'  RÉGRESSION' if pire else ''}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--latence', type=float, default=0.05, help="latence du serveur de rejeu (s)")
+    parser.add_argument('--repetitions', type=int, default=5)
+    parser.add_argument('--tolerance', type=float, default=0.3, help="écart toléré avant régression")
+    parser.add_argument('--reference', default=REFERENCE)
+    parser.add_argument('--mettre-a-jour', action='store_true', help="enregistre les mesures comme référence")
+    parser.add_argument('--sans-rendu', action='store_true', help="ne mesure pas le rendu Streamlit")
+    args = parser.parse_args()
+
+    from enregistrements import MagasinReponses, ServeurRejeu
+
+    # Tout ce que le collecteur et le dashboard écrivent va dans un dossier temporaire
+    dossier = tempfile.mkdtemp(prefix='bench_suite_')
+    os.chdir(dossier)
+    serveur = ServeurRejeu(MagasinReponses(), args.latence).demarrer()
+    chemin_registre = os.path.join(dossier, 'parkings.json')
+    registre_local(serveur, chemin_registre)
+    os.environ.update({
+        'PARKING_REGISTRE': chemin_registre,
+        'PARKING_SNAPSHOT_SHM': os.path.join(dossier, 'parkings_snapshot.shm'),
+        'PARKING_COLLECTEUR_EXTERNE': '1',
+    })
+    os.environ.pop('PARKING_FIXTURES_MODE', None)
+    import sources
+    sources.AMP_URL = serveur.url_locale(sources.AMP_URL)
+    # Relevés AMP datés de leur enregistrement
+    sources.AGE_MAX_AMP = None
+
+    print(f"Rejeu de {len(MagasinReponses().entrees())} réponses enregistrées, latence {args.latence * 1000:.0f} ms, "
+          f"{args.repetitions} répétitions")
+    mesures, data = mesurer_sweeps(args.repetitions)
+    mesures.update(mesurer_extraction(args.repetitions))
+    mesures.update(mesurer_snapshot(args.repetitions))
+    if not args.sans_rendu:
+        mesures.update(mesurer_rendu(data, args.repetitions))
+    serveur.arreter()
+
+    reference = {}
+    if os.path.exists(args.reference):
+        with open(args.reference, encoding='utf-8') as f:
+            reference = json.load(f)['mesures']
+    regressions = comparer(mesures, reference, args.tolerance)
+
+    if args.mettre_a_jour:
+        with open(args.reference, 'w', encoding='utf-8') as f:
+            json.dump({
+                'latence': args.latence,
+                'mesures': {nom: {'valeur': round(valeur, 3), 'unite': MESURES[nom][0]}
+                            for nom, valeur in mesures.items()},
+            }, f, indent=1, ensure_ascii=False)
+            f.write('\n')
+        print(f"\nRéférence mise à jour : {args.reference}")
+        return 0
+    if regressions:
+        print(f"\n{len(regressions)} régression(s) au-delà de {args.tolerance:.0%} : {', '.join(regressions)}")
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
@@ -0,0 +1,172 @@
+"""Snapshot sur disque : fichier binaire (codec_snapshot) et export JSON
+
+    parkings_snapshot.bin   snapshot au format du codec (binaire par défaut), lu par le
+                            dashboard et l'API quand le segment partagé est absent
+    parkings_cache.json     export JSON du même snapshot (notebook, outils externes)
+
+PARKING_EXPORT_JSON=0      n'écrit plus l'export JSON à chaque sweep
+"""
+import mmap
+import os
+import tempfile
+import threading
+import time
+from datetime import datetime
+from zoneinfo import ZoneInfo
+
+import codec_snapshot
+
+CACHE_FILE = 'parkings_cache.json'
+# Avec PARKING_SNAPSHOT_FORMAT=json, le fichier principal est l'export JSON lui-même
+SNAPSHOT_FILE = CACHE_FILE if codec_snapshot.CODEC.nom == 'json' else 'parkings_snapshot.bin'
+EXPORT_JSON = os.environ.get('PARKING_EXPORT_JSON', '1') != '0'
+
+# Dernier snapshot (et dernière vue) lus par fichier, associés à la signature du fichier
+_derniers = {}
+_dernieres_vues = {}
+_verrou = threading.Lock()
+
+
+def _signature(chemin):
+    """Signature (inode, taille, mtime) : change à chaque remplacement du fichier"""
+    st = os.stat(chemin)
+    return st.st_ino, st.st_size, st.st_mtime_ns
+
+
+def _chemin_lecture(chemin):
+    """Fichier à lire : le fichier principal, sinon l'export JSON (snapshot écrit avant le format binaire)"""
+    if chemin is not None:
+        return chemin
+    return SNAPSHOT_FILE if os.path.exists(SNAPSHOT_FILE) else CACHE_FILE
+
+
+def save_snapshot(snapshot, chemin=SNAPSHOT_FILE, codec=None, meta=None):
+    """Écrit le snapshot de façon atomique (fichier temporaire puis rename)
+
+    Le snapshot contient sa séquence, son horodatage et les parkings :
+    un lecteur voit toujours soit l'ancienne version complète, soit la nouvelle.
+    Le codec est celui de PARKING_SNAPSHOT_FORMAT par défaut ; `meta` évite de
+    reconstruire les métadonnées du registre (modele.metadonnees).
+    """
+    codec = codec_snapshot.CODEC if codec is None else codec
+    contenu = codec.encoder(snapshot, meta)
+    dossier = os.path.dirname(os.path.abspath(chemin))
+    fd, temporaire = tempfile.mkstemp(dir=dossier, prefix='.parkings_cache.', suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(contenu)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temporaire, chemin)
+    except BaseException:
+        os.unlink(temporaire)
+        raise
+    with _verrou:
+        # Évite de relire le fichier qu'on vient d'écrire
+        _derniers[chemin] = ((chemin,) + _signature(chemin), snapshot)
+
+
+def load_snapshot(chemin=None):
+    """Charge le snapshot complet (dict) ; None s'il n'existe pas
+
+    Le format (binaire ou JSON) est reconnu au contenu. Le fichier n'est
+    re-décodé que si sa signature a changé depuis la dernière lecture. En
+    cas d'erreur, le dernier snapshot lu est conservé.
+    """
+    chemin = _chemin_lecture(chemin)
+    try:
+        signature = (chemin,) + _signature(chemin)
+    except OSError:
+        return None
+    with _verrou:
+        signature_precedente, precedent = _derniers.get(chemin, (None, None))
+        if signature_precedente == signature:
+            return precedent
+        try:
+            with open(chemin, 'rb') as f:
+                snapshot = codec_snapshot.decoder(f.read())
+        except (OSError, ValueError):
+            return precedent
+        if 'parkings' not in snapshot:
+            # Ancien format : dictionnaire des parkings seul
+            snapshot = {'sequence': 0, 'timestamp': 'N/A', 'ts': 0, 'parkings': snapshot}
+        _derniers[chemin] = (signature, snapshot)
+        return snapshot
+
+
+def load_vue(chemin=None):
+    """VueSnapshot du fichier (chemin chaud du dashboard) ; None s'il n'existe pas
+
+    Un fichier binaire est mappé en mémoire : les relevés sont lus sur place,
+    sans copie (le collecteur remplace le fichier, il ne le modifie jamais).
+    """
+    chemin = _chemin_lecture(chemin)
+    try:
+        signature = (chemin,) + _signature(chemin)
+    except OSError:
+        return None
+    with _verrou:
+        signature_precedente, precedente = _dernieres_vues.get(chemin, (None, None))
+        if signature_precedente == signature:
+            return precedente
+    try:
+        with open(chemin, 'rb') as f:
+            contenu = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        if codec_snapshot.detecter(contenu).nom == 'json':
+            snapshot = load_snapshot(chemin)
+            vue = codec_snapshot.VueSnapshot.depuis_snapshot(snapshot) if snapshot else None
+        else:
+            vue = codec_snapshot.decoder_vue(contenu)
+    except (OSError, ValueError):
+        return precedente
+    with _verrou:
+        _dernieres_vues[chemin] = (signature, vue)
+    return vue
+
+
+def sequence_cache(chemin=None):
+    """Séquence du snapshot sur disque (0 si absent), sans re-parser s'il n'a pas changé"""
+    snapshot = load_snapshot(chemin)
+    return snapshot['sequence'] if snapshot else 0
+
+
+def save_cache(data, meta=None, **champs):
+    """Sauvegarde un sweep comme nouvelle version du snapshot et retourne ce snapshot
+
+    `champs` sont des entrées supplémentaires du snapshot (ex. previsions). L'export
+    JSON est écrit avec le fichier principal, sauf PARKING_EXPORT_JSON=0.
+    """
+    snapshot = {
+        'sequence': sequence_cache() + 1,
+        'timestamp': datetime.now(ZoneInfo("Europe/Paris")).strftime("%H:%M:%S"),
+        'ts': int(time.time()),
+        'parkings': data,
+        **champs
+    }
+    if EXPORT_JSON and SNAPSHOT_FILE != CACHE_FILE:
+        save_snapshot(snapshot, CACHE_FILE, codec_snapshot.CODECS['json'])
+    save_snapshot(snapshot, meta=meta)
+    return snapshot
+
+
+def changements(precedent, data):
+    """Noms des parkings de `data` dont les places ou le statut diffèrent de `precedent`"""
+    return [
+        nom for nom, releve in data.items()
+        if nom not in precedent
+        or precedent[nom]['Places'] != releve['Places']
+        or precedent[nom]['Statut'] != releve['Statut']
+        or precedent[nom].get('Anomalies') != releve.get('Anomalies')
+    ]
+
+
+def load_cache():
+    """Charge les données des parkings du cache"""
+    snapshot = load_snapshot()
+    return snapshot['parkings'] if snapshot else {}
+
+
+def load_timestamp():
+    """Heure de la dernière mise à jour du cache"""
+    snapshot = load_snapshot()
+    return snapshot['timestamp'] if snapshot else "N/A"
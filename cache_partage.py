@@ -0,0 +1,110 @@
+"""Cache de rendus partagé entre les processus du dashboard (HTML des cartes)
+
+Chaque entrée est un fichier de PARKING_RENDUS_DIR, nommé d'après sa famille
+(ex. 'carte-Aix-en-Provence') et sa version (séquence et date du snapshot), écrit
+de façon atomique (fichier temporaire puis rename). Tous les processus lisent les
+mêmes fichiers, qui restent dans le cache de pages du système (/dev/shm par défaut).
+
+Lecture traversante : lire_ou_calculer() retourne l'entrée si elle existe, sinon
+la calcule une seule fois, quel que soit le nombre de sessions et de processus qui
+la demandent en même temps (verrou par clé entre threads, puis verrou fcntl entre
+processus) ; les autres demandeurs attendent le verrou puis lisent le fichier écrit.
+
+Le collecteur (seul à rafraîchir, PARKING_PRECALCUL_CARTES=1) écrit les cartes de
+chaque nouveau snapshot dès sa publication : les processus du dashboard n'ont
+plus qu'à les lire. Seules les GARDER dernières versions d'une famille sont gardées.
+
+PARKING_RENDUS_DIR    dossier des entrées (/dev/shm/parkings_rendus, sinon rendus/)
+"""
+import os
+import re
+import tempfile
+import threading
+
+try:
+    import fcntl
+except ImportError:  # Windows : calcul sans verrou entre processus
+    fcntl = None
+
+RENDUS_DIR = os.environ.get(
+    'PARKING_RENDUS_DIR',
+    '/dev/shm/parkings_rendus' if os.path.isdir('/dev/shm') else 'rendus'
+)
+GARDER = 4
+
+
+def _nom_fichier(famille, version):
+    cle = '-'.join(str(v) for v in version) if isinstance(version, tuple) else str(version)
+    return re.sub(r'[^\w.-]', '_', f'{famille}.{cle}') + '.html'
+
+
+class CachePartage:
+    """Entrées texte par (famille, version), partagées par fichiers entre processus"""
+
+    def __init__(self, dossier=RENDUS_DIR, garder=GARDER):
+        self.dossier = dossier
+        self.garder = garder
+        os.makedirs(dossier, exist_ok=True)
+        self._verrous = {}
+        self._verrou = threading.Lock()
+
+    def chemin(self, famille, version):
+        return os.path.join(self.dossier, _nom_fichier(famille, version))
+
+    def lire(self, famille, version):
+        """Contenu de l'entrée, None si elle n'a pas encore été écrite"""
+        try:
+            with open(self.chemin(famille, version), encoding='utf-8') as f:
+                return f.read()
+        except FileNotFoundError:
+            return None
+
+    def ecrire(self, famille, version, contenu):
+        """Écrit une entrée (atomique) et supprime les versions anciennes de la famille"""
+        chemin = self.chemin(famille, version)
+        fd, temporaire = tempfile.mkstemp(dir=self.dossier, prefix='.rendu.', suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                f.write(contenu)
+            os.replace(temporaire, chemin)
+        except BaseException:
+            os.unlink(temporaire)
+            raise
+        self._elaguer(_nom_fichier(famille, '')[:-len('.html')])
+
+    def _elaguer(self, prefixe):
+        entrees = []
+        for nom in os.listdir(self.dossier):
+            if nom.startswith(prefixe) and nom.endswith('.html'):
+                try:
+                    entrees.append((os.stat(os.path.join(self.dossier, nom)).st_mtime_ns, nom))
+                except FileNotFoundError:
+                    continue
+        for _, nom in sorted(entrees, reverse=True)[self.garder:]:
+            for fichier in (nom, nom + '.lock'):
+                try:
+                    os.unlink(os.path.join(self.dossier, fichier))
+                except FileNotFoundError:
+                    pass
+
+    def lire_ou_calculer(self, famille, version, calculer):
+        """Contenu de l'entrée ; absente, `calculer()` est appelé une seule fois pour tous"""
+        contenu = self.lire(famille, version)
+        if contenu is not None:
+            return contenu
+        cle = (famille, version)
+        with self._verrou:
+            verrou = self._verrous.setdefault(cle, threading.Lock())
+        with verrou:
+            # Le fichier de verrou reste en place (supprimé avec l'entrée quand elle vieillit)
+            with open(self.chemin(famille, version) + '.lock', 'a') as f:
+                if fcntl is not None:
+                    fcntl.flock(f, fcntl.LOCK_EX)
+                # Calculée par un autre pendant l'attente du verrou
+                contenu = self.lire(famille, version)
+                if contenu is None:
+                    contenu = calculer()
+                    self.ecrire(famille, version, contenu)
+        with self._verrou:
+            self._verrous.pop(cle, None)
+        return contenu
@@ -0,0 +1,206 @@
+"""Chronologie des relevés : état complet de tous les parkings à n'importe quel instant
+
+Construite depuis l'historique SQLite, elle garde en mémoire, en colonnes :
+
+    journal     les changements (date, parking, places, statut), triés par date ;
+                un relevé identique au précédent du même parking n'y entre pas
+    images clés l'état complet (tableau modele.RELEVE) tous les `deltas_par_cle`
+                changements
+
+L'état à l'instant t s'obtient par une recherche dichotomique dans le journal
+(O(log n)), puis en partant de l'image clé précédente (ou d'une image déjà
+calculée plus proche) et en appliquant au plus `deltas_par_cle` changements,
+de façon vectorisée. Le résultat est un modele.SnapshotParkings : le dashboard
+l'affiche comme le snapshot courant (vues.preparer_vue, carte, tableau).
+
+Les images calculées sont gardées (LRU) et les images voisines peuvent être
+calculées d'avance dans un thread (precharger), pour un curseur fluide.
+"""
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from modele import CODES_STATUT, MESSAGE, SnapshotParkings, TableChaines, releves_vides
+
+# Au moins une image clé tous les DELTAS_PAR_CLE_MIN changements (et au plus une par
+# parking et par changement : le coût d'une image clé est celui de N changements)
+DELTAS_PAR_CLE_MIN = 256
+IMAGES_MAX = 64
+
+
+class Chronologie:
+    """Journal des changements et images clés, alignés sur des métadonnées (modele.Metadonnees)"""
+
+    def __init__(self, meta, deltas_par_cle=None):
+        self.meta = meta
+        n = len(meta.noms)
+        self.deltas_par_cle = deltas_par_cle or max(DELTAS_PAR_CLE_MIN, 4 * n)
+        self.messages = TableChaines()
+        # Journal en colonnes, capacité doublée à la demande ; self.nb entrées valides
+        self.nb = 0
+        self._ts = np.empty(0, dtype=np.int64)
+        self._parkings = np.empty(0, dtype=np.int32)
+        self._places = np.empty(0, dtype=np.int32)
+        self._statuts = np.empty(0, dtype=np.uint8)
+        self._messages = np.empty(0, dtype=np.int16)
+        # Image clé i : état après les cles_positions[i] premiers changements
+        self.cles_positions = [0]
+        self.cles_etats = [releves_vides(n)]
+        self._courant = releves_vides(n)
+        self.fin = None                      # date du dernier relevé intégré
+        self._images = OrderedDict()         # position dans le journal -> état
+        self._verrou = threading.Lock()
+        # Un seul actualiser() à la fois (chronologie partagée par les sessions du dashboard)
+        self._verrou_actualisation = threading.Lock()
+        self._prechargeur = None
+
+    @classmethod
+    def depuis_historique(cls, historique, meta, debut, fin):
+        """Chronologie de [debut, fin], avec l'état de chaque parking à `debut`"""
+        chronologie = cls(meta)
+        chronologie.etendre(historique.releves_periode(meta.noms, debut, fin))
+        chronologie.fin = fin
+        return chronologie
+
+    def actualiser(self, historique, fin):
+        """Ajoute les relevés arrivés dans l'historique depuis la dernière construction
+
+        Les lectures concurrentes restent possibles : le journal n'est écrit qu'au-delà
+        de `nb`, mis à jour une fois les changements écrits, et les images clés sont
+        ajoutées sous self._verrou.
+        """
+        if self.fin is None or fin <= self.fin:
+            return
+        with self._verrou_actualisation:
+            # Une autre session a pu actualiser pendant l'attente du verrou
+            if fin <= self.fin:
+                return
+            lignes = [ligne for ligne in historique.releves_periode(self.meta.noms, self.fin + 1, fin)
+                      if ligne[1] > self.fin]
+            self.etendre(lignes)
+            self.fin = fin
+
+    # --- Construction ---
+
+    def etendre(self, lignes):
+        """Intègre des relevés (parking, ts, places, statut) postérieurs à ceux déjà intégrés"""
+        index = self.meta.index
+        colonnes = []
+        for nom, ts, places, statut in lignes:
+            i = index.get(nom)
+            if i is None:
+                continue
+            code = CODES_STATUT.get(statut, MESSAGE)
+            message = self.messages.code(statut.removeprefix('⚠️ ')) if code == MESSAGE else -1
+            colonnes.append((ts, i, places, code, message))
+        if not colonnes:
+            return
+        ts, parkings, places, statuts, messages = (np.array(c) for c in zip(*colonnes))
+        # Par parking puis par date : seuls les relevés différents du précédent sont des changements
+        ordre = np.lexsort((ts, parkings))
+        ts, parkings, places, statuts, messages = (c[ordre] for c in (ts, parkings, places, statuts, messages))
+        precedent_places = self._courant['places'][parkings]
+        precedent_statuts = self._courant['statut'][parkings]
+        precedent_messages = self._courant['message'][parkings]
+        meme_parking = np.r_[False, parkings[1:] == parkings[:-1]]
+        precedent_places[meme_parking] = places[:-1][meme_parking[1:]]
+        precedent_statuts[meme_parking] = statuts[:-1][meme_parking[1:]]
+        precedent_messages[meme_parking] = messages[:-1][meme_parking[1:]]
+        change = ((places != precedent_places) | (statuts != precedent_statuts)
+                  | (messages != precedent_messages))
+        ordre = np.argsort(ts[change], kind='stable')
+        self._ajouter_deltas(*(c[change][ordre] for c in (ts, parkings, places, statuts, messages)))
+
+    def _ajouter_deltas(self, ts, parkings, places, statuts, messages):
+        debut = 0
+        while debut < len(ts):
+            # Chaque lot s'arrête à la prochaine image clé
+            place = self.cles_positions[-1] + self.deltas_par_cle - self.nb
+            lot = slice(debut, debut + place)
+            self._ecrire_journal(ts[lot], parkings[lot], places[lot], statuts[lot], messages[lot])
+            _appliquer(self._courant, parkings[lot], places[lot], statuts[lot], messages[lot], ts[lot])
+            if self.nb == self.cles_positions[-1] + self.deltas_par_cle:
+                with self._verrou:
+                    self.cles_positions.append(self.nb)
+                    self.cles_etats.append(self._courant.copy())
+            debut += place
+
+    def _ecrire_journal(self, ts, parkings, places, statuts, messages):
+        fin = self.nb + len(ts)
+        if fin > len(self._ts):
+            capacite = max(fin, 2 * len(self._ts), 1024)
+            for nom in ('_ts', '_parkings', '_places', '_statuts', '_messages'):
+                ancien = getattr(self, nom)
+                nouveau = np.empty(capacite, dtype=ancien.dtype)
+                nouveau[:self.nb] = ancien[:self.nb]
+                setattr(self, nom, nouveau)
+        self._ts[self.nb:fin] = ts
+        self._parkings[self.nb:fin] = parkings
+        self._places[self.nb:fin] = places
+        self._statuts[self.nb:fin] = statuts
+        self._messages[self.nb:fin] = messages
+        self.nb = fin
+
+    # --- Lecture ---
+
+    def bornes(self):
+        """(premier, dernier) instant où un changement a été relevé, None si le journal est vide"""
+        if not self.nb:
+            return None
+        return int(self._ts[0]), int(self._ts[self.nb - 1])
+
+    def position(self, ts):
+        """Nombre de changements relevés jusqu'à `ts` inclus (recherche dichotomique)"""
+        return int(np.searchsorted(self._ts[:self.nb], ts, side='right'))
+
+    def etat(self, ts):
+        """Tableau modele.RELEVE de tous les parkings à l'instant `ts`"""
+        return self._etat(self.position(ts))
+
+    def image(self, ts):
+        """État de tous les parkings à l'instant `ts`, sous forme de modele.SnapshotParkings"""
+        return SnapshotParkings(self.meta, self.etat(ts), self.messages.valeurs)
+
+    def _etat(self, position):
+        with self._verrou:
+            etat = self._images.get(position)
+            if etat is not None:
+                self._images.move_to_end(position)
+                return etat
+            # Point de départ : l'image clé précédente, ou une image calculée entre elle et la cible
+            cle = int(np.searchsorted(self.cles_positions, position, side='right')) - 1
+            depart, base = self.cles_positions[cle], self.cles_etats[cle]
+            for calculee, etat_calcule in self._images.items():
+                if depart < calculee <= position:
+                    depart, base = calculee, etat_calcule
+        etat = base.copy()
+        lot = slice(depart, position)
+        _appliquer(etat, self._parkings[lot], self._places[lot], self._statuts[lot], self._messages[lot],
+                   self._ts[lot])
+        with self._verrou:
+            self._images[position] = etat
+            while len(self._images) > IMAGES_MAX:
+                self._images.popitem(last=False)
+        return etat
+
+    def precharger(self, instants):
+        """Calcule d'avance, dans un thread, les images de `instants` (ex. positions voisines du curseur)"""
+        if self._prechargeur is None:
+            self._prechargeur = ThreadPoolExecutor(max_workers=1, thread_name_prefix='chronologie')
+        for ts in instants:
+            self._prechargeur.submit(self.etat, ts)
+
+
+def _appliquer(etat, parkings, places, statuts, messages, ts):
+    """Applique des changements triés par date : pour chaque parking, le dernier l'emporte"""
+    if not len(parkings):
+        return
+    inverses = parkings[::-1]
+    uniques, premiers = np.unique(inverses, return_index=True)
+    derniers = len(parkings) - 1 - premiers
+    etat['places'][uniques] = places[derniers]
+    etat['statut'][uniques] = statuts[derniers]
+    etat['message'][uniques] = messages[derniers]
+    etat['ts'][uniques] = ts[derniers]
@@ -0,0 +1,228 @@
+"""Codecs du snapshot : JSON (export, compatibilité) et binaire à disposition fixe
+
+Un codec encode le snapshot (dict : sequence, timestamp, ts, parkings, previsions,
+et d'éventuelles autres entrées) en bytes et le décode. Le format se reconnaît à
+ses premiers octets (detecter) : un lecteur accepte les deux.
+
+Format binaire (little-endian, sections alignées sur 8 octets) :
+
+    en-tête      magic b'PKB1', version, nombre de parkings, séquence, ts,
+                 empreinte des métadonnées, (position, longueur) des 4 sections
+    META         capacités (int32), latitudes, longitudes (float64), noms (UTF-8, séparés par \\0)
+    RELEVES      un enregistrement modele.RELEVE (22 octets) par parking
+    PREVISIONS   places prévues (int32) par parking et par horizon, ABSENTE sans prévision
+    TABLES       petit JSON : heure du snapshot, horizons, messages, sources, autres entrées
+
+Le lecteur du chemin chaud (decoder_vue) ne lit que l'en-tête, les tables et des
+vues NumPy sur les relevés et les prévisions, sans copie ni dict par parking ; les
+métadonnées ne sont décodées que quand leur empreinte change (nouveau registre).
+Le fichier étant remplacé par rename, il peut être mappé en mémoire (cache.load_vue).
+
+PARKING_SNAPSHOT_FORMAT    codec d'écriture : binaire (défaut) ou json
+"""
+import hashlib
+import json
+import os
+import struct
+
+import numpy as np
+
+from modele import RELEVE, Metadonnees, SnapshotParkings, releves_vides
+
+MAGIC = b'PKB1'
+VERSION_FORMAT = 2
+# Relevés des versions précédentes, lus puis convertis (version 1 : sans qualité ni anomalies)
+RELEVES_ANCIENS = {1: np.dtype(RELEVE.descr[:-2])}
+# magic, version, réservé, parkings, séquence, ts, empreinte, 4 x (position, longueur)
+_ENTETE = struct.Struct('<4sHHIqqQ8I')
+META, RELEVES, PREVISIONS, TABLES = range(4)
+ABSENTE = np.iinfo(np.int32).min
+CHAMPS = ('sequence', 'timestamp', 'ts', 'parkings', 'previsions')
+
+
+def _aligner(taille):
+    return (taille + 7) & ~7
+
+
+class CodecJSON:
+    """Le snapshot tel quel en JSON : format d'export, lisible par tous les outils"""
+
+    nom = 'json'
+
+    def encoder(self, snapshot, meta=None):
+        return json.dumps(snapshot).encode('utf-8')
+
+    def decoder(self, octets):
+        return json.loads(bytes(octets))
+
+    def decoder_vue(self, octets):
+        return VueSnapshot.depuis_snapshot(self.decoder(octets))
+
+
+class CodecBinaire:
+    """Disposition fixe : en-tête, puis sections lues par des vues NumPy"""
+
+    nom = 'binaire'
+
+    def __init__(self):
+        self._meta_encodee = (None, None, None)    # (meta, octets, empreinte)
+        self._meta_decodee = (None, None)          # (empreinte, meta)
+
+    def _octets_meta(self, meta):
+        """Section META d'un jeu de métadonnées, encodée une seule fois"""
+        if self._meta_encodee[0] is not meta:
+            capacites = meta.capacites.astype('<i4').tobytes()
+            morceaux = [capacites, bytes(_aligner(len(capacites)) - len(capacites)),
+                        meta.latitudes.astype('<f8').tobytes(), meta.longitudes.astype('<f8').tobytes(),
+                        '\0'.join(meta.noms).encode('utf-8')]
+            octets = b''.join(morceaux)
+            empreinte = int.from_bytes(hashlib.blake2b(octets, digest_size=8).digest(), 'little')
+            self._meta_encodee = (meta, octets, empreinte)
+        return self._meta_encodee[1], self._meta_encodee[2]
+
+    def encoder(self, snapshot, meta=None):
+        """`meta` : métadonnées du registre (modele.metadonnees), sinon tirées des relevés"""
+        parkings = snapshot['parkings']
+        meta = Metadonnees.depuis_releves(parkings) if meta is None else meta
+        modele = SnapshotParkings.depuis_releves(parkings, meta)
+        octets_meta, empreinte = self._octets_meta(meta)
+
+        previsions = snapshot.get('previsions', {})
+        horizons = list(next(iter(previsions.values()))) if previsions else []
+        places_prevues = np.full((len(meta.noms), len(horizons)), ABSENTE, dtype='<i4')
+        for nom, prevision in previsions.items():
+            i = meta.index.get(nom)
+            if i is not None:
+                places_prevues[i] = [prevision[h] for h in horizons]
+
+        tables = json.dumps({
+            'timestamp': snapshot['timestamp'], 'horizons': horizons,
+            'messages': modele.messages, 'sources': modele.sources,
+            'autres': {cle: valeur for cle, valeur in snapshot.items() if cle not in CHAMPS},
+        }, ensure_ascii=False).encode('utf-8')
+
+        sections = [octets_meta, modele.releves.tobytes(), places_prevues.tobytes(), tables]
+        positions, position = [], _aligner(_ENTETE.size)
+        for section in sections:
+            positions += [position, len(section)]
+            position = _aligner(position + len(section))
+        tampon = bytearray(position)
+        _ENTETE.pack_into(tampon, 0, MAGIC, VERSION_FORMAT, 0, len(meta.noms), snapshot['sequence'],
+                          snapshot['ts'], empreinte, *positions)
+        for section, debut in zip(sections, positions[::2]):
+            tampon[debut:debut + len(section)] = section
+        return bytes(tampon)
+
+    def entete(self, octets):
+        """(parkings, séquence, ts, empreinte, sections) sans rien décoder d'autre"""
+        magic, version, _, n, sequence, ts, empreinte, *positions = _ENTETE.unpack_from(octets, 0)
+        if magic != MAGIC or (version != VERSION_FORMAT and version not in RELEVES_ANCIENS):
+            raise ValueError(f"Snapshot binaire illisible (magic {magic!r}, version {version})")
+        return n, sequence, ts, empreinte, list(zip(positions[::2], positions[1::2]))
+
+    def _releves(self, octets, n, position):
+        """Relevés du snapshot : vue sans copie, ou conversion d'un snapshot d'une version antérieure"""
+        version = _ENTETE.unpack_from(octets, 0)[1]
+        if version == VERSION_FORMAT:
+            return np.frombuffer(octets, RELEVE, n, position)
+        anciens = np.frombuffer(octets, RELEVES_ANCIENS[version], n, position)
+        releves = releves_vides(n)
+        for champ in anciens.dtype.names:
+            releves[champ] = anciens[champ]
+        return releves
+
+    def _meta(self, octets, n, empreinte, section):
+        """Métadonnées de la section META, décodées seulement si l'empreinte a changé"""
+        if self._meta_decodee[0] != empreinte:
+            debut, longueur = section
+            capacites = np.frombuffer(octets, '<i4', n, debut)
+            debut += _aligner(4 * n)
+            latitudes = np.frombuffer(octets, '<f8', n, debut)
+            longitudes = np.frombuffer(octets, '<f8', n, debut + 8 * n)
+            fin_noms = section[0] + longueur
+            noms = bytes(octets[debut + 16 * n:fin_noms]).decode('utf-8').split('\0') if n else []
+            # Copies : les métadonnées survivent au tampon (segment relu, fichier remplacé)
+            self._meta_decodee = (empreinte, Metadonnees(noms, capacites.copy(), latitudes.copy(),
+                                                         longitudes.copy()))
+        return self._meta_decodee[1]
+
+    def decoder_vue(self, octets):
+        """Vue du chemin chaud : relevés et prévisions en tableaux, partagés avec `octets`"""
+        n, sequence, ts, empreinte, sections = self.entete(octets)
+        meta = self._meta(octets, n, empreinte, sections[META])
+        debut, longueur = sections[TABLES]
+        tables = json.loads(bytes(octets[debut:debut + longueur]))
+        releves = self._releves(octets, n, sections[RELEVES][0])
+        horizons = tables['horizons']
+        previsions = np.frombuffer(octets, '<i4', n * len(horizons), sections[PREVISIONS][0])
+        modele = SnapshotParkings(meta, releves, tables['messages'], tables['sources'])
+        return VueSnapshot(sequence, ts, tables['timestamp'], modele,
+                           previsions.reshape(n, len(horizons)), horizons, tables['autres'])
+
+    def decoder(self, octets):
+        """Snapshot complet au format dict (API, outils) ; plus coûteux que decoder_vue"""
+        return self.decoder_vue(octets).snapshot()
+
+
+class VueSnapshot:
+    """Ce que lit le dashboard : en-tête, relevés en colonnes et prévisions par parking"""
+
+    def __init__(self, sequence, ts, timestamp, modele, previsions, horizons, autres=None):
+        self.sequence = sequence
+        self.ts = ts
+        self.timestamp = timestamp
+        self.modele = modele
+        self.previsions = previsions      # tableau (parkings, horizons), ABSENTE sans prévision
+        self.horizons = horizons
+        self.autres = autres or {}
+
+    @classmethod
+    def depuis_snapshot(cls, snapshot, meta=None):
+        """Depuis un snapshot au format dict (cache JSON, ancien segment)"""
+        meta = Metadonnees.depuis_releves(snapshot['parkings']) if meta is None else meta
+        previsions = snapshot.get('previsions', {})
+        horizons = list(next(iter(previsions.values()))) if previsions else []
+        places_prevues = np.full((len(meta.noms), len(horizons)), ABSENTE, dtype=np.int32)
+        for nom, prevision in previsions.items():
+            if nom in meta.index:
+                places_prevues[meta.index[nom]] = [prevision[h] for h in horizons]
+        autres = {cle: valeur for cle, valeur in snapshot.items() if cle not in CHAMPS}
+        return cls(snapshot['sequence'], snapshot['ts'], snapshot['timestamp'],
+                   SnapshotParkings.depuis_releves(snapshot['parkings'], meta), places_prevues, horizons, autres)
+
+    def prevision(self, nom):
+        """Prévision d'un parking ({'15': places, ...}) ou None"""
+        i = self.modele.meta.index.get(nom)
+        if i is None or not self.horizons or self.previsions[i, 0] == ABSENTE:
+            return None
+        return dict(zip(self.horizons, self.previsions[i].tolist()))
+
+    def snapshot(self):
+        """Snapshot complet au format dict"""
+        noms = self.modele.meta.noms_tableau
+        observes = np.flatnonzero(self.previsions[:, 0] != ABSENTE) if self.horizons else []
+        return {
+            'sequence': self.sequence, 'timestamp': self.timestamp, 'ts': self.ts,
+            'parkings': self.modele.releves_dict(),
+            'previsions': {noms[i]: dict(zip(self.horizons, self.previsions[i].tolist())) for i in observes},
+            **self.autres,
+        }
+
+
+CODECS = {codec.nom: codec for codec in (CodecBinaire(), CodecJSON())}
+CODEC = CODECS[os.environ.get('PARKING_SNAPSHOT_FORMAT', 'binaire')]
+
+
+def detecter(octets):
+    """Codec d'un contenu, reconnu à ses premiers octets"""
+    return CODECS['binaire'] if bytes(octets[:len(MAGIC)]) == MAGIC else CODECS['json']
+
+
+def decoder(octets):
+    """Snapshot complet (dict) d'un contenu binaire ou JSON"""
+    return detecter(octets).decoder(octets)
+
+
+def decoder_vue(octets):
+    """VueSnapshot d'un contenu binaire ou JSON"""
+    return detecter(octets).decoder_vue(octets)
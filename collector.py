@@ -0,0 +1,349 @@
+"""Collecteur autonome : scrape les parkings et publie le dernier snapshot
+
+Un seul collecteur tourne à la fois (verrou sur collector.lock). Il écrit le
+snapshot sur disque (binaire, avec son export JSON), l'historique, la page légère (statique/parkings.html) et publie le
+snapshot dans un segment de mémoire partagée lu par tous les processus du dashboard.
+
+Au démarrage, le dernier snapshot sur disque est republié aussitôt dans le segment :
+les premiers visiteurs n'attendent pas le premier sweep. Une demande de scraping
+immédiat (bouton « Rafraîchir ») est servie par le premier sweep complet (tous les
+parkings) commencé après elle ; la date de début du dernier sweep complet est écrite
+dans collector.sweep pour les processus du dashboard.
+
+PARKING_PRECALCUL_CARTES=1    écrit aussi la carte de chaque ville dans le cache partagé
+                              (cache_partage.py) à chaque snapshot
+
+Usage : python collector.py
+"""
+import os
+import threading
+import time
+from datetime import datetime
+from zoneinfo import ZoneInfo
+
+try:
+    import fcntl
+except ImportError:  # Windows : pas de verrou inter-processus
+    fcntl = None
+
+import metriques
+from agregats import Agregats
+from alertes import charger_alertes
+from anomalies import DetecteurAnomalies, annoter
+from cache import load_snapshot, save_cache
+from cache_partage import CachePartage
+from historique import Historique
+from modele import metadonnees
+from page_legere import publier_page
+from planificateur import Planificateur
+from prevision import Prevision
+from registre import registre
+from scraper import parkings
+from snapshot_partage import SegmentEcrivain
+from sources import actualiser as actualiser_sources, collecter as collecter_sources
+from vues import precalculer_cartes
+
+LOCK_FILE = 'collector.lock'
+DEMANDE_FILE = 'collector.demande'
+SWEEP_FILE = 'collector.sweep'
+# Au-delà (secondes), un parking en échec est affiché en erreur plutôt qu'avec sa dernière valeur
+AGE_MAX_DERNIERE_VALEUR = 3 * 3600
+# Un snapshot plus récent (secondes) est servi tel quel à une demande de rafraîchissement
+FRAICHEUR_DEMANDE = 15
+PRECALCUL_CARTES = os.environ.get('PARKING_PRECALCUL_CARTES') == '1'
+
+
+def acquerir_verrou(chemin=LOCK_FILE):
+    """Prend le verrou exclusif du collecteur ; None s'il est déjà tenu par un autre"""
+    f = open(chemin, 'a')
+    if fcntl is not None:
+        try:
+            fcntl.flock(f, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            f.close()
+            return None
+    return f
+
+
+def demander_collecte():
+    """Demande au collecteur (quel que soit son processus) un scraping immédiat ; retourne sa date"""
+    with open(DEMANDE_FILE, 'w') as f:
+        f.write(str(time.time()))
+    return _date_demande()
+
+
+def _date_demande():
+    """Date de la dernière demande de scraping immédiat (0 si aucune)"""
+    try:
+        return os.stat(DEMANDE_FILE).st_mtime
+    except OSError:
+        return 0.0
+
+
+def date_sweep_complet():
+    """Date de début du dernier sweep complet publié (0 si aucun)"""
+    try:
+        with open(SWEEP_FILE) as f:
+            return float(f.read())
+    except (OSError, ValueError):
+        return 0.0
+
+
+def _noter_sweep_complet(debut):
+    temporaire = SWEEP_FILE + '.tmp'
+    with open(temporaire, 'w') as f:
+        f.write(str(debut))
+    os.replace(temporaire, SWEEP_FILE)
+
+
+def rafraichir(fraicheur=FRAICHEUR_DEMANDE, timeout=30):
+    """Rafraîchissement demandé par une session, dédupliqué entre sessions et processus
+
+    Si le dernier sweep complet a commencé il y a moins de `fraicheur` secondes, rien
+    n'est demandé (les sweeps partiels du planificateur ne comptent pas). Sinon un
+    scraping immédiat est demandé et on attend le premier sweep complet commencé après
+    la demande : les clics simultanés de toutes les sessions sont servis par ce seul sweep.
+
+    Retourne None si les données étaient déjà à jour, True si un sweep complet a été
+    publié, False si le délai `timeout` est dépassé.
+    """
+    if time.time() - date_sweep_complet() < fraicheur:
+        return None
+    demande = demander_collecte()
+    limite = time.monotonic() + timeout
+    while time.monotonic() < limite:
+        if date_sweep_complet() >= demande:
+            return True
+        time.sleep(0.1)
+    return False
+
+
+def attendre_snapshot(lecteur, sequence, timeout=30):
+    """Attend qu'un snapshot plus récent que `sequence` soit publié ; True si c'est le cas"""
+    limite = time.monotonic() + timeout
+    while time.monotonic() < limite:
+        if lecteur.sequence_courante() > sequence:
+            return True
+        time.sleep(0.1)
+    return False
+
+
+def en_erreur(releve):
+    """True si le relevé est un échec de requête (aucune donnée sur le parking)"""
+    return releve['Statut'] == '❌ Erreur'
+
+
+def fusionner(precedent, mesures, noms, maintenant=None):
+    """Snapshot des parkings `noms` après un sweep
+
+    Un parking non scrapé garde son relevé précédent. Un parking en échec garde sa
+    dernière valeur valide, marquée de son âge (champ `Age`, secondes), tant qu'elle
+    a moins de AGE_MAX_DERNIERE_VALEUR : l'échec d'une requête n'est pas un parking vide.
+    """
+    maintenant = maintenant if maintenant is not None else time.time()
+    data = {}
+    for nom in noms:
+        releve = mesures.get(nom)
+        ancien = precedent.get(nom)
+        if releve is None:
+            releve = ancien
+        elif en_erreur(releve) and ancien is not None and not en_erreur(ancien) and 'Ts' in ancien:
+            age = int(maintenant - ancien['Ts'])
+            if age <= AGE_MAX_DERNIERE_VALEUR:
+                releve = {**ancien, 'Age': age}
+        if releve is not None:
+            data[nom] = releve
+    return data
+
+
+def horodatage():
+    """Date et heure courantes (Europe/Paris) pour les logs"""
+    return datetime.now(ZoneInfo("Europe/Paris")).strftime("%d/%m/%Y %H:%M:%S")
+
+
+class Collecteur:
+    """Boucle de scraping propriétaire du segment partagé"""
+
+    def __init__(self, verrou):
+        self.verrou = verrou
+        self.segment = SegmentEcrivain()
+        self.historique = Historique()
+        self.agregats = Agregats()
+        self.derniere_collecte = 0.0
+        precedent = load_snapshot()
+        self.precedent = {
+            nom: releve for nom, releve in (precedent['parkings'] if precedent else {}).items()
+            if nom in parkings
+        }
+        self.rendus = CachePartage() if PRECALCUL_CARTES else None
+        if precedent and self.segment.sequence == 0:
+            # Préchauffage : le dernier snapshot connu est servi pendant le premier sweep
+            self.segment.publier_snapshot(precedent, meta=metadonnees(registre))
+            self.precalculer_cartes(precedent)
+        self.version_registre = registre.version
+        self.planificateur = Planificateur({nom: p[2] for nom, p in parkings.items()})
+        self.entrainer_modeles()
+        # Règles d'alerte (alertes.json), None si aucune n'est configurée
+        self.alertes = charger_alertes()
+        if self.alertes is not None:
+            self.alertes.initialiser(self.precedent)
+
+    def entrainer_modeles(self):
+        """Modèles tenus en tableaux par parking, dimensionnés sur le registre et appris sur l'historique"""
+        capacites = {nom: p[2] for nom, p in parkings.items()}
+        # Profils saisonniers appris sur l'historique, puis mis à jour à chaque sweep
+        self.prevision = Prevision(capacites)
+        self.prevision.entrainer(self.historique)
+        # Anomalies de capteur : taux de changement par heure appris sur les derniers jours
+        self.detecteur = DetecteurAnomalies(capacites)
+        self.detecteur.entrainer(self.historique)
+
+    def actualiser_registre(self):
+        """Relit le registre s'il a changé et redimensionne l'état propre à chaque parking
+
+        La version du registre est comparée plutôt que le retour de actualiser() : le
+        collecteur intégré partage le registre du dashboard, qui peut l'avoir relu avant lui.
+        """
+        registre.actualiser()
+        if registre.version == self.version_registre:
+            return False
+        self.version_registre = registre.version
+        self.precedent = {nom: releve for nom, releve in self.precedent.items() if nom in parkings}
+        self.planificateur.actualiser({nom: p[2] for nom, p in parkings.items()})
+        self.entrainer_modeles()
+        actualiser_sources()
+        print(f"[{horodatage()}] Registre rechargé : {len(parkings)} parking(s)")
+        return True
+
+    def publier(self, data, mesures=None):
+        """Écrit un snapshot dans le cache et le segment partagé, et les mesures dans l'historique"""
+        with metriques.Chrono(metriques.publication):
+            return self._publier(data, mesures)
+
+    def _publier(self, data, mesures):
+        mesures = data if mesures is None else mesures
+        # Les échecs de requête n'entrent ni dans l'historique, ni dans les agrégats, ni dans les prévisions
+        valides = {nom: releve for nom, releve in mesures.items() if not en_erreur(releve)}
+        ts = time.time()
+        # Les relevés suspects (capteur figé, saut, ...) sont marqués dans le snapshot et écartés de même
+        suspects, qualites = self.detecteur.evaluer(valides, ts)
+        annoter(valides, suspects, qualites)
+        if suspects:
+            valides = {nom: releve for nom, releve in valides.items() if nom not in suspects}
+            mesures = {nom: releve for nom, releve in mesures.items() if nom not in suspects}
+        self.prevision.apprendre_sweep(valides, ts)
+        previsions = self.prevision.previsions(ts)
+        with metriques.Chrono(metriques.ecriture_cache):
+            # Métadonnées du registre encodées une fois par version (codec_snapshot)
+            meta = metadonnees(registre)
+            snapshot = save_cache(data, meta, previsions=previsions)
+        try:
+            with metriques.Chrono(metriques.page_legere):
+                publier_page(snapshot, {ville: config['noms'] for ville, config in registre.villes.items()})
+        except OSError as e:
+            print(f"Page légère non publiée: {e}")
+        self.precedent = data
+        self.segment.publier_snapshot(snapshot, meta=meta)
+        self.precalculer_cartes(snapshot)
+        if valides:
+            self.historique.ajouter(valides, snapshot['ts'])
+            self.agregats.ajouter(valides, snapshot['ts'])
+        if mesures and self.alertes is not None:
+            self.alertes.evaluer(mesures, snapshot['ts'])
+        return snapshot
+
+    def precalculer_cartes(self, snapshot):
+        """Écrit les cartes du snapshot dans le cache partagé (PARKING_PRECALCUL_CARTES=1)"""
+        if self.rendus is None:
+            return
+        try:
+            precalculer_cartes(self.rendus, snapshot, metadonnees(registre), registre.villes)
+        except OSError as e:
+            print(f"Cartes non précalculées: {e}")
+
+    def collecter(self, noms=None):
+        """Scrape les parkings demandés (tous par défaut) et publie le snapshot mis à jour"""
+        noms = list(parkings) if noms is None else noms
+        complet = set(parkings) <= set(noms)
+        debut = time.time()
+        print(f"[{horodatage()}] Scraping de {len(noms)} parking(s)...")
+        try:
+            with metriques.Chrono(metriques.sweeps) as chrono:
+                # API open data AMP d'abord, scraping Semepa pour les parkings manquants
+                mesures = collecter_sources(noms)
+                for nom, releve in mesures.items():
+                    self.planificateur.enregistrer(nom, releve)
+                # Les parkings non scrapés ou en échec gardent leur dernier relevé valide
+                data = fusionner(self.precedent, mesures, parkings)
+                snapshot = self.publier(data, mesures)
+        finally:
+            # Seul un sweep complet sert les demandes de scraping immédiat arrivées avant son début
+            if complet:
+                self.derniere_collecte = debut
+        if complet:
+            _noter_sweep_complet(debut)
+        print(f"[{horodatage()}] Scraping terminé et snapshot publié (séquence {snapshot['sequence']}, "
+              f"{chrono.duree:.2f} s)")
+        return data
+
+    def attendre(self, duree):
+        """Attend `duree` secondes ; True si un scraping immédiat a été demandé entre-temps"""
+        limite = time.monotonic() + duree
+        while time.monotonic() < limite:
+            if _date_demande() > self.derniere_collecte:
+                return True
+            time.sleep(min(0.5, max(0.0, limite - time.monotonic())))
+        return _date_demande() > self.derniere_collecte
+
+    def boucle(self):
+        """Scrape chaque parking à son échéance, calculée par le planificateur"""
+        while True:
+            self.actualiser_registre()
+            noms = self.planificateur.dus()
+            if noms:
+                try:
+                    self.collecter(noms)
+                except Exception as e:
+                    print(f"Erreur lors du scraping: {e}")
+                    self.planificateur.reporter(noms)
+            echeance = self.planificateur.prochaine_echeance()
+            attente = echeance - time.time() if echeance is not None else 60
+            if self.attendre(max(0.0, attente)):
+                self.planificateur.tout_replanifier()
+
+
+_thread_integre = None
+
+
+def demarrer_integre():
+    """Lance un collecteur dans un thread du processus courant si aucun autre ne tourne
+
+    Utilisé par le dashboard quand aucun collecteur autonome n'a été lancé
+    (ex. Streamlit Cloud) ; un seul processus obtient le verrou.
+    """
+    global _thread_integre
+    if _thread_integre is not None and _thread_integre.is_alive():
+        return True
+    verrou = acquerir_verrou()
+    if verrou is None:
+        return False
+    _thread_integre = threading.Thread(target=Collecteur(verrou).boucle, daemon=True)
+    _thread_integre.start()
+    metriques.demarrer_serveur()
+    print("🚀 Collecteur intégré lancé en background")
+    return True
+
+
+def main():
+    verrou = acquerir_verrou()
+    if verrou is None:
+        print("Un collecteur tourne déjà (collector.lock)")
+        return 1
+    print("🚀 Collecteur lancé")
+    if metriques.demarrer_serveur() is not None:
+        print(f"📈 Métriques sur http://127.0.0.1:{metriques.METRIQUES_PORT}/metrics")
+    Collecteur(verrou).boucle()
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
@@ -1,309 +1,358 @@
 import streamlit as st
-import requests
-import re
-import pandas as pd
-from datetime import datetime
-import threading
 import time
-import json
 import os
-from zoneinfo import ZoneInfo
-import folium
-from streamlit_folium import st_folium
+import streamlit.components.v1 as components
+from datetime import datetime
+from agregats import Agregats, choisir_niveau
+from chronologie import Chronologie
+from cache import load_vue
+from cache_partage import CachePartage
+from collector import FRAICHEUR_DEMANDE, attendre_snapshot, demander_collecte, demarrer_integre, rafraichir
+from historique import Historique
+from modele import FUSEAU, metadonnees
+from proximite import IndexSpatial
+from registre import registre
+from snapshot_partage import SegmentLecteur
+from vues import carte_html, cartes_page, famille_carte, filtrer, nombre_pages, preparer_vue
 
 st.set_page_config(
-    page_title="Parkings Aix-en-Provence",
+    page_title="Parkings",
     page_icon="🅿️",
     layout="centered",
     initial_sidebar_state="collapsed"
 )
 
-st.title("🅿️ Parkings Aix-en-Provence")
+# Une vue par ville du registre (parkings.json)
+if len(registre.villes) > 1:
+    st.title("🅿️ Parkings")
+    ville = st.selectbox("Ville", list(registre.villes))
+else:
+    ville = next(iter(registre.villes))
+    st.title(f"🅿️ Parkings {ville}")
 st.subheader("Places disponibles en temps réel")
 
-parkings = {
-    'Bellegarde': ('https://mamp.parkings-semepa.fr/', 213, 340, 43.5322096, 5.4502100),
-    'Cardeurs': ('https://mamp.parkings-semepa.fr/', 219, 125, 43.5298981, 5.4458118),
-    'Carnot': ('https://mamp.parkings-semepa.fr/', 211, 675, 43.5255598, 5.4554612),
-    'Méjanes': ('https://mamp.parkings-semepa.fr/', 150, 800, 43.5239974, 5.4413805),
-    'Mignet': ('https://mamp.parkings-semepa.fr/', 209, 800, 43.52425, 5.4476974),
-    'Pasteur': ('https://mamp.parkings-semepa.fr/', 215, 650, 43.5339951, 5.4462335),
-    'Rambot': ('https://parkings-semepa.fr/', 221, 400, 43.5304833, 5.4580851),
-    'Rotonde': ('https://parkings-semepa.fr/', 206, 1800, 43.5253922, 5.4440594),
-    'Signoret': ('https://mamp.parkings-semepa.fr/', 217, 350, 43.5333509, 5.4486254)
-}
-
-headers = {
-    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
-}
-
-CACHE_FILE = 'parkings_cache.json'
-TIMESTAMP_FILE = 'last_update.txt'
-
-def load_cache():
-    """Charge les données du cache"""
-    if os.path.exists(CACHE_FILE):
-        try:
-            with open(CACHE_FILE, 'r') as f:
-                return json.load(f)
-        except:
-            return {}
-    return {}
-
-def save_cache(data):
-    """Sauvegarde les données dans le cache"""
-    with open(CACHE_FILE, 'w') as f:
-        json.dump(data, f)
-    # Sauvegarder aussi le timestamp dans un fichier séparé
-    with open(TIMESTAMP_FILE, 'w') as f:
-        f.write(datetime.now(ZoneInfo("Europe/Paris")).strftime("%H:%M:%S"))
-
-import hashlib
-
-def get_timestamp_hash():
-    """Récupère le hash du fichier timestamp pour détecter les changements"""
-    if os.path.exists(TIMESTAMP_FILE):
-        try:
-            with open(TIMESTAMP_FILE, 'r') as f:
-                content = f.read().strip()
-            return hashlib.md5(content.encode()).hexdigest()
-        except:
-            return "error"
-    return "notfound"
-
-def load_timestamp():
-    """Charge le timestamp de la dernière mise à jour"""
-    if os.path.exists(TIMESTAMP_FILE):
-        try:
-            with open(TIMESTAMP_FILE, 'r') as f:
-                return f.read().strip()
-        except:
-            return "N/A"
-    return "N/A"
-
-def scraper_parkings():
-    """Scrape tous les parkings"""
-    data = {}
-    
-    for nom, (base_url, page_id, capacite, lat, lon) in parkings.items():
-        try:
-            response = requests.get(base_url, params={"page_id": page_id}, headers=headers, timeout=5)
-            
-            match_nombre = re.search(r'<p class="nbPlaces"><span[^>]*>(\d+)</span>', response.text)
-            match_texte = re.search(r'<p class="nbPlaces"><span[^>]*>([^<]+)</span>', response.text)
-            
-            if match_nombre:
-                places_libres = int(match_nombre.group(1))
-                affichage = "COMPLET" if places_libres <= 2 else f"{places_libres} / {capacite}"
-                data[nom] = {
-                    'Places': places_libres,
-                    'Capacite': capacite,
-                    'Affichage': affichage,
-                    'Statut': '✅ Ouvert',
-                    'Timestamp': datetime.now(ZoneInfo("Europe/Paris")).strftime("%H:%M:%S"),
-                    'latitude': lat,
-                    'longitude': lon
-                }
-            elif match_texte:
-                statut = match_texte.group(1).strip()
-                
-                # Si le texte est "COMPLET", on le traite comme un parking ouvert
-                if statut.upper() == "COMPLET":
-                    data[nom] = {
-                        'Places': 0,
-                        'Capacite': capacite,
-                        'Affichage': 'COMPLET',
-                        'Statut': '✅ Ouvert',
-                        'Timestamp': datetime.now(ZoneInfo("Europe/Paris")).strftime("%H:%M:%S"),
-                        'latitude': lat,
-                        'longitude': lon
-                    }
-                else:
-                    # Sinon c'est un vrai message d'erreur/fermeture
-                    data[nom] = {
-                        'Places': 0,
-                        'Capacite': capacite,
-                        'Affichage': statut,
-                        'Statut': f'⚠️ {statut}',
-                        'Timestamp': datetime.now(ZoneInfo("Europe/Paris")).strftime("%H:%M:%S"),
-                        'latitude': lat,
-                        'longitude': lon
-                    }
-            else:
-                data[nom] = {
-                    'Places': 0,
-                    'Capacite': capacite,
-                    'Affichage': 'N/A',
-                    'Statut': '❓ Pas de données',
-                    'Timestamp': datetime.now(ZoneInfo("Europe/Paris")).strftime("%H:%M:%S"),
-                    'latitude': lat,
-                    'longitude': lon
-                }
-            
-        except Exception as e:
-            data[nom] = {
-                'Places': 0,
-                'Capacite': capacite,
-                'Affichage': 'Erreur',
-                'Statut': f'❌ Erreur',
-                'Timestamp': datetime.now(ZoneInfo("Europe/Paris")).strftime("%H:%M:%S"),
-                'latitude': lat,
-                'longitude': lon
-            }
-        
-        time.sleep(0.5)
-    
-    return data
-
-def scraper_background():
-    """Fonction qui scrape en arrière-plan toutes les 2 mins"""
-    print("⏳ Scraper en attente de 2 minutes avant le premier scrape...")
-    time.sleep(120)
-    print("✅ Début du scraping!")
-    while True:
-        try:
-            now = datetime.now(ZoneInfo("Europe/Paris")).strftime("%d/%m/%Y %H:%M:%S")
-            print(f"[{now}] Scraping en arrière-plan...")
-            data = scraper_parkings()
-            save_cache(data)
-            now = datetime.now(ZoneInfo("Europe/Paris")).strftime("%d/%m/%Y %H:%M:%S")
-            print(f"[{now}] Scraping terminé et cache mis à jour")
-        except Exception as e:
-            print(f"Erreur lors du scraping: {e}")
-        
-        print("⏳ Scraper en attente de 10 minutes avant le prochain scrape...")
-        time.sleep(600)
-        print("✅ Scrape suivant!")
+@st.cache_resource
+def get_lecteur():
+    """Lecteur du snapshot partagé publié par le collecteur"""
+    return SegmentLecteur()
 
-# Lancer le thread de scraping une seule fois par processus
-if 'SCRAPER_STARTED' not in os.environ:
-    os.environ['SCRAPER_STARTED'] = '1'
-    scraper_thread = threading.Thread(target=scraper_background, daemon=True)
-    scraper_thread.start()
-    print("🚀 Thread de scraping lancé en background")
+# Le scraping est fait par le collecteur (python collector.py) ; sans collecteur
+# autonome, un seul processus du dashboard en lance un dans un thread
+if os.environ.get('PARKING_COLLECTEUR_EXTERNE') != '1':
+    demarrer_integre()
 
-cached_data = load_cache()
+lecteur = get_lecteur()
+# Vue du snapshot : en-tête, relevés en colonnes et prévisions (voir codec_snapshot)
+sequence, snapshot = lecteur.lire_vue()
 
-if not cached_data:
+if snapshot is None and load_vue() is None:
     st.info("🔄 Première initialisation... Chargement des données...")
     with st.spinner("Récupération des données en cours..."):
-        cached_data = scraper_parkings()
-        save_cache(cached_data)
+        demander_collecte()
+        attendre_snapshot(lecteur, sequence)
+        sequence, snapshot = lecteur.lire_vue()
     st.success("✅ Chargement des données terminé!")
 
-# Lire directement le contenu du fichier timestamp
-if os.path.exists(TIMESTAMP_FILE):
-    with open(TIMESTAMP_FILE, 'r') as f:
-        last_update_display = f.read().strip()
-else:
-    last_update_display = "N/A"
+if snapshot is None:
+    # Pas encore de snapshot partagé : repli sur le fichier du snapshot
+    snapshot = load_vue()
+
+if snapshot is None:
+    st.error("❌ Données indisponibles pour le moment, réessayez dans quelques instants.")
+    st.stop()
+
+cached_data = snapshot.modele
+# Identifie de façon unique le contenu du snapshot pour les caches de rendu
+version = (snapshot.sequence, snapshot.ts)
 
 col1, col2, col3 = st.columns([1, 1, 1])
 with col2:
     if st.button("🔄 Rafraîchir maintenant", use_container_width=True):
         with st.spinner("Récupération des données..."):
-            cached_data = scraper_parkings()
-            save_cache(cached_data)
-        st.success("✅ Données mises à jour!")
-        st.rerun()
-
-df = pd.DataFrame(cached_data).T
-df = df.sort_values('Places', ascending=False)
-
-col1, col2, col3 = st.columns(3)
-
-with col1:
-    total_places = df['Places'].sum()
-    st.metric("Total places", total_places, delta="places disponibles")
-
-with col2:
-    open_count = len(df[df['Statut'] == '✅ Ouvert'])
-    st.metric("Parkings ouverts", f"{open_count}/9")
+            # Un seul sweep pour tous les clics simultanés, de toutes les sessions et processus
+            rafraichi = rafraichir()
+        if rafraichi is None:
+            st.info(f"ℹ️ Données déjà à jour (relevé complet il y a moins de {FRAICHEUR_DEMANDE} s).")
+        elif rafraichi:
+            st.success("✅ Données mises à jour!")
+            st.rerun()
+        else:
+            st.warning("⏱️ Délai dépassé : la collecte est toujours en cours, réessayez dans quelques instants.")
+
+# Les fonctions suivantes sont mises en cache par version du snapshot : tant que
+# le collecteur n'a rien publié de nouveau, les reruns réutilisent le résultat.
+# Les données (argument préfixé par _) ne sont pas hachées, seule la version l'est.
+
+@st.cache_data(max_entries=32)
+def preparer_donnees(version, ville, _cached_data):
+    """DataFrame trié et indicateurs d'une ville pour une version du snapshot"""
+    # Seuls les parkings de la ville sont lus, via l'index du registre
+    return preparer_vue(_cached_data, registre.noms(ville))
+
+@st.cache_resource
+def get_rendus():
+    """Cache des cartes partagé entre les processus du dashboard (cache_partage.py)"""
+    return CachePartage()
+
+@st.cache_resource(max_entries=8)
+def construire_carte(version, ville, _df):
+    """HTML complet de la carte Folium d'une ville pour une version du snapshot"""
+    centre = registre.villes[ville]['centre']
+    if version[0] == 'passe':
+        return carte_html(_df, centre)
+    # Snapshot courant : carte précalculée par le collecteur, ou calculée une seule fois pour tous les processus
+    return get_rendus().lire_ou_calculer(famille_carte(ville), version, lambda: carte_html(_df, centre))
+
+df = preparer_donnees(version, ville, cached_data)[0]
+
+# Intervalle (s) de vérification d'un nouveau snapshot pour la partie en direct
+INTERVALLE_DIRECT = 5
+
+@st.fragment(run_every=INTERVALLE_DIRECT)
+def afficher_en_direct():
+    """Indicateurs et cartes des parkings, mis à jour sans réexécuter toute la page
+
+    Seule cette partie est réexécutée périodiquement : elle ne lit que l'en-tête
+    du segment partagé, et ne reconstruit les données que si la version a changé.
+    """
+    _, direct = lecteur.lire_vue()
+    if direct is None:
+        direct = snapshot
+    df_direct, total_places, open_count = preparer_donnees((direct.sequence, direct.ts), ville, direct.modele)
+
+    col1, col2, col3 = st.columns(3)
+
+    with col1:
+        st.metric("Total places", total_places, delta="places disponibles")
+
+    with col2:
+        st.metric("Parkings ouverts", f"{open_count}/{len(df_direct)}")
+
+    with col3:
+        st.metric("Dernière mise à jour", direct.timestamp)
+
+    st.divider()
+
+    # Filtre et pagination : seules les cartes de la page courante sont construites
+    col1, col2, col3 = st.columns([2, 1, 1])
+    with col1:
+        recherche = st.text_input("Rechercher un parking", key="recherche")
+    with col2:
+        ouverts_seulement = st.checkbox("Ouverts seulement", key="ouverts_seulement")
+    selection = filtrer(df_direct, recherche, ouverts_seulement)
+    # La sélection a pu rétrécir depuis le choix de la page
+    if st.session_state.get("page", 1) > nombre_pages(selection):
+        st.session_state["page"] = nombre_pages(selection)
+    with col3:
+        page = st.number_input("Page", min_value=1, max_value=nombre_pages(selection), key="page")
+    cartes = cartes_page(selection, page)
+
+    cols = st.columns(3)
+
+    for idx, (nom, statut, affichage, timestamp, age, qualite, anomalies) in enumerate(cartes):
+        col = cols[idx % 3]
+        
+        heure = f"🕐 {timestamp}"
+        if age is not None:
+            # Relevé en échec : dernière valeur valide, avec son âge
+            heure += f" · ⏳ dernière valeur connue (il y a {age // 60} min)"
+        if qualite is not None:
+            heure += f" · 📶 qualité {qualite} %"
+
+        with col:
+            if statut == '✅ Ouvert':
+                container = st.container(border=True)
+                container.metric(nom, affichage, delta=statut)
+                # Prévision lue dans le tableau du snapshot, pour les seules cartes affichées
+                prevision = direct.prevision(nom)
+                if prevision is not None:
+                    container.caption(f"🔮 15 min : {prevision['15']} · 30 min : {prevision['30']} · 1 h : {prevision['60']}")
+                if anomalies:
+                    # Relevé suspect : affiché, mais hors du total des places
+                    container.caption(f"🟣 Relevé suspect : {anomalies}")
+                container.caption(heure)
+            else:
+                container = st.container(border=True)
+                container.warning(f"**{nom}**\n\n{affichage}")
+                if anomalies:
+                    container.caption(f"🟣 Relevé suspect : {anomalies}")
+                container.caption(heure)
 
-with col3:
-    st.metric("Dernière mise à jour", last_update_display)
+afficher_en_direct()
 
 st.divider()
 
-cols = st.columns(3)
+# ===== MAP INTERACTIVE GOOGLE MAPS =====
+st.subheader("🗺️ Localisation des parkings")
 
-for idx, (nom, row) in enumerate(df.iterrows()):
-    col = cols[idx % 3]
-    
-    with col:
-        if row['Statut'] == '✅ Ouvert':
-            container = st.container(border=True)
-            container.metric(nom, row['Affichage'], delta=row['Statut'])
-            container.caption(f"🕐 {row['Timestamp']}")
-        else:
-            container = st.container(border=True)
-            container.warning(f"**{nom}**\n\n{row['Affichage']}")
-            container.caption(f"🕐 {row['Timestamp']}")
+# La carte n'est construite (et Folium importé) que sur demande : sur mobile, les cartes suffisent
+if st.toggle("Afficher la carte interactive", key="carte"):
+    # Afficher la map (HTML statique mis en cache : pas de rerun à chaque déplacement)
+    components.html(construire_carte(version, ville, df), height=600, width=700)
+
+    col1, col2, col3, col4, col5 = st.columns(5)
+    with col1:
+        st.markdown("🟢 **Plus de 50%** - Beaucoup de places")
+    with col2:
+        st.markdown("🟠 **10-50%** - Places limitées")
+    with col3:
+        st.markdown("🔴 **Moins de 10%** - Presque plein")
+    with col4:
+        st.markdown("⚫ **Parking Hors Service**")
+    with col5:
+        st.markdown("🟣 **Relevé suspect** - Hors du total")
 
 st.divider()
 
-# ===== MAP INTERACTIVE GOOGLE MAPS =====
-st.subheader("🗺️ Localisation des parkings")
+# ===== PARKINGS LES PLUS PROCHES =====
+st.subheader("📍 Parkings les plus proches")
 
-# Créer la map Folium avec tuiles Google Maps
-m = folium.Map(
-    location=[43.52829276, 5.4525416],
-    zoom_start=15,
-    tiles="https://mt1.google.com/vt/lyrs=m&x={x}&y={y}&z={z}",
-    attr="Google"
-)
+@st.cache_resource
+def get_index_spatial():
+    """Index spatial du registre partagé entre les sessions"""
+    return IndexSpatial()
 
-# Fonction pour obtenir la couleur selon le statut
-def get_color(statut, places, capacite):
-    """Retourne la couleur selon le statut et le taux de remplissage"""
-    # Si pas ouvert, retourner gris
-    if statut != '✅ Ouvert':
-        return 'gray'
-    
-    # Si ouvert, calculer le taux
-    taux = places / capacite
-    if taux > 0.5:
-        return 'green'  # Vert - beaucoup de places
-    elif taux > 0.1:
-        return 'orange'  # Orange - places limitées
-    else:
-        return 'red'  # Rouge - presque plein
-
-# Ajouter les marqueurs pour chaque parking
-for nom, row in df.iterrows():
-    color = get_color(row['Statut'], int(row['Places']), int(row['Capacite']))
-    
-    popup_text = f"""
-    <b>{nom}</b><br/>
-    Places: {row['Affichage']}<br/>
-    Statut: {row['Statut']}<br/>
-    MAJ: {row['Timestamp']}
-    """
-    
-    folium.CircleMarker(
-        location=[row['latitude'], row['longitude']],
-        radius=15,
-        popup=folium.Popup(popup_text, max_width=250),
-        tooltip=f"{nom}: {row['Affichage']}",
-        color=color,
-        fill=True,
-        fillColor=color,
-        fillOpacity=0.7,
-        weight=2
-    ).add_to(m)
-
-# Afficher la map
-st_folium(m, height=600, width=700)
+# L'index n'est mis à jour que si le registre a changé (et seulement les parkings modifiés)
+registre.actualiser()
+index_spatial = get_index_spatial()
+index_spatial.synchroniser(registre.parkings, registre.version)
 
+centre = registre.villes[ville]['centre']
 col1, col2, col3, col4 = st.columns(4)
 with col1:
-    st.markdown("🟢 **Plus de 50%** - Beaucoup de places")
+    latitude = st.number_input("Latitude", value=float(centre[0]), format="%.5f")
 with col2:
-    st.markdown("🟠 **10-50%** - Places limitées")
+    longitude = st.number_input("Longitude", value=float(centre[1]), format="%.5f")
 with col3:
-    st.markdown("🔴 **Moins de 10%** - Presque plein")
+    nombre = st.number_input("Nombre de parkings", min_value=1, max_value=20, value=3)
 with col4:
-    st.markdown("⚫ **Parking Hors Service**")
+    min_places = st.number_input("Places libres minimum", min_value=0, value=10, step=5)
+
+resultats = index_spatial.proches(latitude, longitude, cached_data, int(nombre), int(min_places))
+if resultats:
+    affichages = cached_data.affichages(cached_data.meta.indices([nom for nom, _, _ in resultats]))
+    st.dataframe(
+        [
+            {'Parking': nom, 'Places': affichage,
+             'Distance à pied (m)': metres, 'Temps à pied (min)': minutes}
+            for (nom, metres, minutes), affichage in zip(resultats, affichages)
+        ],
+        hide_index=True, use_container_width=True
+    )
+else:
+    st.info("Aucun parking ouvert avec assez de places à distance de marche")
+
+st.divider()
+
+# ===== HISTORIQUE =====
+st.subheader("📈 Historique")
+
+FENETRES = {
+    '6 heures': 6 * 3600,
+    '24 heures': 24 * 3600,
+    '7 jours': 7 * 86400,
+    '30 jours': 30 * 86400,
+    '1 an': 365 * 86400,
+}
+
+@st.cache_resource
+def get_agregats():
+    """Connexion aux agrégats partagée entre les sessions"""
+    return Agregats()
+
+col1, col2 = st.columns(2)
+with col1:
+    parking_historique = st.selectbox("Parking", list(df.index))
+with col2:
+    fenetre = st.selectbox("Période", list(FENETRES), index=1)
+
+# Le niveau d'agrégation est choisi selon la période pour limiter le nombre de points
+niveau = choisir_niveau(FENETRES[fenetre])
+serie = get_agregats().serie(parking_historique, time.time() - FENETRES[fenetre], niveau=niveau)
+if serie.empty:
+    st.info("Pas encore d'historique pour ce parking")
+else:
+    st.line_chart(serie, y_label="Places libres")
+    st.caption(f"Résolution : {niveau} (min / moyenne / max par tranche)")
+
+st.divider()
+
+# ===== REMONTER LE TEMPS =====
+st.subheader("🕰️ Remonter le temps")
+
+# Écart (s) entre deux positions du curseur, et entre deux images de l'animation
+PAS_CURSEUR = 300
+INTERVALLE_ANIMATION = 0.5
+
+@st.cache_resource
+def get_historique():
+    """Connexion à l'historique partagée entre les sessions"""
+    return Historique()
+
+@st.cache_resource(max_entries=8)
+def get_chronologie(jour, version_registre):
+    """Chronologie d'une journée (tous les parkings du registre), partagée entre les sessions"""
+    debut = int(datetime.combine(jour, datetime.min.time(), FUSEAU).timestamp())
+    fin = min(debut + 86400 - 1, int(time.time()))
+    return Chronologie.depuis_historique(get_historique(), metadonnees(registre), debut, fin)
+
+if st.toggle("Afficher l'état de la ville à un instant passé", key="passe"):
+    aujourd_hui = datetime.now(FUSEAU).date()
+    col1, col2, col3 = st.columns([2, 1, 1])
+    with col1:
+        jour = st.date_input("Jour", value=aujourd_hui, max_value=aujourd_hui, key="jour_passe")
+    with col2:
+        # Hors du fragment : changer de mode relance la page, et donc la cadence du fragment
+        lecture = st.toggle("▶️ Animer la journée", key="lecture_passe")
+    with col3:
+        carte_passe = st.toggle("🗺️ Carte de l'instant", key="carte_passe", disabled=lecture)
+    chronologie = get_chronologie(jour, registre.version)
+    if jour == aujourd_hui:
+        # Journée en cours : seuls les relevés arrivés depuis la construction sont lus
+        chronologie.actualiser(get_historique(), int(time.time()))
+    debut_jour = int(datetime.combine(jour, datetime.min.time(), FUSEAU).timestamp())
+    instants = list(range(debut_jour, min(debut_jour + 86400, int(time.time()) + 1), PAS_CURSEUR))
+
+    @st.fragment(run_every=INTERVALLE_ANIMATION if lecture else None)
+    def afficher_passe():
+        """État de la ville à l'instant du curseur ; en animation, le curseur avance à chaque exécution"""
+        if st.session_state.get("instant_passe") not in instants:
+            # Premier affichage ou autre jour : dernier instant de la journée
+            st.session_state["instant_passe"] = instants[-1]
+        elif lecture:
+            suivant = instants.index(st.session_state["instant_passe"]) + 1
+            st.session_state["instant_passe"] = instants[suivant % len(instants)]
+        instant = st.select_slider(
+            "Instant", options=instants, key="instant_passe",
+            format_func=lambda ts: datetime.fromtimestamp(ts, FUSEAU).strftime("%H:%M")
+        )
+        # Les images voisines sont calculées d'avance : le curseur et l'animation restent fluides
+        i = instants.index(instant)
+        chronologie.precharger(instants[i + 1:i + 4] + instants[max(0, i - 2):i])
+
+        df_passe, total_passe, ouverts_passe = preparer_vue(chronologie.image(instant), registre.noms(ville))
+        if df_passe.empty:
+            st.info("Pas d'historique pour ce jour")
+            return
+        col1, col2, col3 = st.columns(3)
+        with col1:
+            st.metric("Total places", total_passe)
+        with col2:
+            st.metric("Parkings ouverts", f"{ouverts_passe}/{len(df_passe)}")
+        with col3:
+            st.metric("Instant", datetime.fromtimestamp(instant, FUSEAU).strftime("%d/%m %H:%M"))
+        st.dataframe(
+            df_passe[['Affichage', 'Statut', 'Timestamp']].rename(columns={
+                'Affichage': 'Places', 'Timestamp': 'Dernier changement'
+            }),
+            use_container_width=True
+        )
+        # Carte propre à cette section (la carte en direct, plus haut, est hors du fragment) :
+        # reconstruite à chaque position du curseur, elle n'est pas affichée pendant l'animation
+        if carte_passe and not lecture:
+            components.html(construire_carte(('passe', instant), ville, df_passe), height=600, width=700)
+
+    afficher_passe()
 
 st.divider()
 
@@ -0,0 +1,216 @@
+"""Disjoncteurs et budget de relances du scraping
+
+Un disjoncteur suit les échecs d'un hôte (taux d'échec sur les dernières requêtes),
+d'un parking ou d'une source (échecs consécutifs) :
+- fermé : les requêtes passent ;
+- ouvert (seuil d'échecs atteint) : plus aucune requête jusqu'à la date de
+  réouverture, le sweep n'attend plus une page ou un hôte morts ;
+- demi-ouvert : une seule requête d'essai ; un succès referme, un échec rouvre
+  pour un délai doublé (jusqu'à DELAI_OUVERTURE_MAX).
+
+Les relances d'une requête échouée sont espacées d'une attente aléatoire
+(« full jitter ») et prélevées sur un budget par hôte : chaque requête y dépose
+RATIO_RELANCES jeton, chaque relance en consomme un. Passée une réserve de
+JETONS_MAX relances, un hôte en panne ne reçoit pas plus de 20 % de requêtes en plus.
+"""
+import random
+import threading
+import time
+from collections import deque
+
+FERME = 'ferme'
+OUVERT = 'ouvert'
+DEMI_OUVERT = 'demi_ouvert'
+
+# Hôte : ouvert si au moins TAUX_ECHEC_HOTE des FENETRE_HOTE dernières requêtes ont échoué
+# (une page morte parmi d'autres ne coupe pas tout l'hôte)
+FENETRE_HOTE = 20
+REQUETES_MIN_HOTE = 10
+TAUX_ECHEC_HOTE = 0.5
+# Parking ou source : ouvert après ce nombre d'échecs consécutifs
+SEUIL_ECHECS_PARKING = 2
+SEUIL_ECHECS_SOURCE = 3
+DELAI_OUVERTURE = 30       # secondes avant la première requête d'essai
+DELAI_OUVERTURE_MAX = 600
+
+TENTATIVES_MAX = 3         # requête initiale comprise
+ATTENTE_BASE = 0.2         # secondes, doublée à chaque relance (avant tirage aléatoire)
+ATTENTE_MAX = 2.0
+RATIO_RELANCES = 0.2
+JETONS_MAX = 10
+
+
+class DisjoncteurOuvert(Exception):
+    """Requête refusée sans être envoyée : le disjoncteur de l'hôte, du parking ou de la source est ouvert"""
+
+
+class Disjoncteur:
+    """Disjoncteur ouvert après `seuil` échecs consécutifs (fermé / ouvert / demi-ouvert)"""
+
+    def __init__(self, seuil, delai=None, delai_max=None):
+        self.seuil = seuil
+        self.delai_initial = delai if delai is not None else DELAI_OUVERTURE
+        self.delai_max = delai_max if delai_max is not None else DELAI_OUVERTURE_MAX
+        self.etat = FERME
+        self.echecs = 0
+        self.delai = self.delai_initial
+        self.reouverture = 0.0
+        self._essai_en_cours = False
+        self._verrou = threading.Lock()
+
+    def _enregistrer(self, succes):
+        self.echecs = 0 if succes else self.echecs + 1
+
+    def _depasse(self):
+        return self.echecs >= self.seuil
+
+    def _reinitialiser(self):
+        self.echecs = 0
+
+    def autorise(self, maintenant=None):
+        """True si une requête peut partir ; en demi-ouvert, une seule à la fois"""
+        with self._verrou:
+            if self.etat == FERME:
+                return True
+            maintenant = maintenant if maintenant is not None else time.monotonic()
+            if self.etat == OUVERT and maintenant >= self.reouverture:
+                self.etat = DEMI_OUVERT
+                self._essai_en_cours = False
+            if self.etat == DEMI_OUVERT and not self._essai_en_cours:
+                self._essai_en_cours = True
+                return True
+            return False
+
+    def succes(self):
+        """Compte un succès ; referme le disjoncteur après un essai réussi"""
+        with self._verrou:
+            if self.etat == FERME:
+                self._enregistrer(True)
+                return
+            self.etat = FERME
+            self.delai = self.delai_initial
+            self._essai_en_cours = False
+            self._reinitialiser()
+
+    def echec(self, maintenant=None):
+        """Compte un échec ; True si le disjoncteur vient de s'ouvrir"""
+        with self._verrou:
+            if self.etat == FERME:
+                self._enregistrer(False)
+                if not self._depasse():
+                    return False
+            elif self.etat == DEMI_OUVERT:
+                # L'essai a échoué : délai doublé
+                self.delai = min(self.delai * 2, self.delai_max)
+            else:
+                # Requête partie avant l'ouverture : déjà compté
+                return False
+            maintenant = maintenant if maintenant is not None else time.monotonic()
+            self.etat = OUVERT
+            self._essai_en_cours = False
+            self._reinitialiser()
+            # Réouvertures étalées pour que les parkings d'un hôte ne reviennent pas tous ensemble
+            self.reouverture = maintenant + self.delai * random.uniform(0.8, 1.2)
+            return True
+
+    def abandon(self):
+        """Libère l'essai en demi-ouvert sans conclure (requête jamais envoyée)"""
+        with self._verrou:
+            self._essai_en_cours = False
+
+
+class DisjoncteurTaux(Disjoncteur):
+    """Disjoncteur ouvert quand le taux d'échec des `fenetre` dernières requêtes atteint `taux`
+
+    Rien n'est décidé avant `seuil` requêtes dans la fenêtre.
+    """
+
+    def __init__(self, seuil=REQUETES_MIN_HOTE, taux=TAUX_ECHEC_HOTE, fenetre=FENETRE_HOTE, **options):
+        super().__init__(seuil, **options)
+        self.taux = taux
+        self._resultats = deque(maxlen=fenetre)
+        self._nb_echecs = 0
+
+    def _enregistrer(self, succes):
+        if len(self._resultats) == self._resultats.maxlen:
+            self._nb_echecs -= not self._resultats[0]
+        self._resultats.append(succes)
+        self._nb_echecs += not succes
+        self.echecs = self._nb_echecs
+
+    def _depasse(self):
+        return len(self._resultats) >= self.seuil and self._nb_echecs >= self.taux * len(self._resultats)
+
+    def _reinitialiser(self):
+        self._resultats.clear()
+        self._nb_echecs = self.echecs = 0
+
+
+class Disjoncteurs:
+    """Disjoncteurs créés à la demande, par clé (hôte, nom de parking ou de source)"""
+
+    def __init__(self, classe=Disjoncteur, **options):
+        self.classe = classe
+        self.options = options
+        self._disjoncteurs = {}
+        self._verrou = threading.Lock()
+
+    def __getitem__(self, cle):
+        with self._verrou:
+            if cle not in self._disjoncteurs:
+                self._disjoncteurs[cle] = self.classe(**self.options)
+            return self._disjoncteurs[cle]
+
+    def ouverts(self):
+        """Clés dont le disjoncteur n'est pas fermé"""
+        with self._verrou:
+            return [cle for cle, d in self._disjoncteurs.items() if d.etat != FERME]
+
+
+class BudgetRelances:
+    """Seau de jetons limitant les relances à une fraction des requêtes envoyées"""
+
+    def __init__(self, ratio=RATIO_RELANCES, jetons_max=JETONS_MAX):
+        self.ratio = ratio
+        self.jetons_max = jetons_max
+        self.jetons = float(jetons_max)
+        self._verrou = threading.Lock()
+
+    def deposer(self):
+        """Une requête est partie : crédite le budget"""
+        with self._verrou:
+            self.jetons = min(self.jetons_max, self.jetons + self.ratio)
+
+    def retirer(self):
+        """Prélève une relance ; False si le budget est épuisé"""
+        with self._verrou:
+            if self.jetons < 1:
+                return False
+            self.jetons -= 1
+            return True
+
+
+class BudgetsRelances:
+    """Budgets de relances par hôte"""
+
+    def __init__(self):
+        self._budgets = {}
+        self._verrou = threading.Lock()
+
+    def __getitem__(self, hote):
+        with self._verrou:
+            if hote not in self._budgets:
+                self._budgets[hote] = BudgetRelances()
+            return self._budgets[hote]
+
+
+def attente_relance(tentative, base=ATTENTE_BASE, maximum=ATTENTE_MAX):
+    """Attente aléatoire avant la relance n° `tentative` (1 pour la première)"""
+    return random.uniform(0, min(maximum, base * 2 ** (tentative - 1)))
+
+
+# Partagés par tous les sweeps du processus
+hotes = Disjoncteurs(DisjoncteurTaux)
+parkings = Disjoncteurs(seuil=SEUIL_ECHECS_PARKING)
+sources = Disjoncteurs(seuil=SEUIL_ECHECS_SOURCE)
+budgets = BudgetsRelances()
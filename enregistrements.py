@@ -0,0 +1,173 @@
+"""Enregistrement et rejeu des réponses HTTP (mode fixtures, pour travailler hors ligne)
+
+PARKING_FIXTURES_MODE=enregistrer   les réponses réelles sont aussi écrites sur disque
+PARKING_FIXTURES_MODE=rejouer       les réponses sont lues sur disque, sans réseau
+PARKING_FIXTURES_DIR                dossier des enregistrements (fixtures/http par défaut)
+
+ServeurRejeu sert les mêmes enregistrements en HTTP local, avec une latence
+configurable : le scraper fait alors de vraies requêtes (connexions, keep-alive,
+lecture en flux) sans dépendre des serveurs réels (voir benchmarks/suite.py).
+"""
+import hashlib
+import json
+import os
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qsl, urlsplit
+
+import requests
+from requests.structures import CaseInsensitiveDict
+
+FIXTURES_MODE = os.environ.get('PARKING_FIXTURES_MODE', '')
+FIXTURES_DIR = os.environ.get(
+    'PARKING_FIXTURES_DIR',
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures', 'http')
+)
+
+
+def url_complete(url, params=None):
+    """URL avec ses paramètres, dans un ordre stable"""
+    return requests.Request('GET', url, params=sorted((params or {}).items())).prepare().url
+
+
+class MagasinReponses:
+    """Réponses HTTP enregistrées, une par URL : <cle>.json (statut, en-têtes) et <cle>.bin (corps)"""
+
+    def __init__(self, dossier=FIXTURES_DIR):
+        self.dossier = dossier
+        self._verrou = threading.Lock()
+
+    def _cle(self, url, params):
+        return hashlib.sha1(url_complete(url, params).encode('utf-8')).hexdigest()[:16]
+
+    def enregistrer(self, url, params, response):
+        """Écrit une réponse sur disque (le corps est lu entièrement)"""
+        cle = self._cle(url, params)
+        meta = {
+            'url': url_complete(url, params),
+            'status': response.status_code,
+            'headers': {k: v for k, v in response.headers.items()
+                        if k.lower() not in ('content-encoding', 'content-length', 'transfer-encoding')},
+        }
+        with self._verrou:
+            os.makedirs(self.dossier, exist_ok=True)
+            with open(os.path.join(self.dossier, cle + '.bin'), 'wb') as f:
+                f.write(response.content)
+            with open(os.path.join(self.dossier, cle + '.json'), 'w') as f:
+                json.dump(meta, f, indent=1, ensure_ascii=False)
+
+    def lire(self, url, params):
+        """(meta, corps) d'une réponse enregistrée, ou None"""
+        cle = self._cle(url, params)
+        try:
+            with open(os.path.join(self.dossier, cle + '.json'), 'r') as f:
+                meta = json.load(f)
+            with open(os.path.join(self.dossier, cle + '.bin'), 'rb') as f:
+                return meta, f.read()
+        except FileNotFoundError:
+            return None
+
+    def rejouer(self, url, params):
+        """Réponse requests reconstruite depuis le disque (404 si absente)"""
+        enregistrement = self.lire(url, params)
+        response = requests.Response()
+        response.url = url_complete(url, params)
+        if enregistrement is None:
+            response.status_code = 404
+            response._content = b''
+        else:
+            meta, corps = enregistrement
+            response.status_code = meta['status']
+            response.headers = CaseInsensitiveDict(meta['headers'])
+            response._content = corps
+        # Le corps est déjà en mémoire : iter_content() le découpe sans passer par raw
+        response._content_consumed = True
+        response.encoding = requests.utils.get_encoding_from_headers(response.headers) or 'utf-8'
+        return response
+
+    def entrees(self):
+        """Liste des (url, meta, corps) enregistrés"""
+        if not os.path.isdir(self.dossier):
+            return []
+        entrees = []
+        for fichier in sorted(os.listdir(self.dossier)):
+            if fichier.endswith('.json'):
+                cle = fichier[:-5]
+                with open(os.path.join(self.dossier, fichier), 'r') as f:
+                    meta = json.load(f)
+                with open(os.path.join(self.dossier, cle + '.bin'), 'rb') as f:
+                    entrees.append((meta['url'], meta, f.read()))
+        return entrees
+
+
+def chemin_local(url):
+    """Chemin d'une URL réelle sur le serveur de rejeu : /<schéma>/<hôte><chemin>"""
+    morceaux = urlsplit(url)
+    return f'/{morceaux.scheme}/{morceaux.netloc}{morceaux.path or "/"}'
+
+
+class ServeurRejeu:
+    """Serveur HTTP/1.1 local qui rejoue les réponses d'un MagasinReponses
+
+    `url_locale(url)` donne l'adresse locale d'une URL réelle ; les paramètres de
+    la requête sont ceux de l'enregistrement. Chaque réponse attend `latence`
+    secondes ; If-None-Match est honoré si l'enregistrement a un ETag.
+    """
+
+    def __init__(self, magasin=None, latence=0.0, port=0):
+        self.magasin = magasin if magasin is not None else MagasinReponses()
+        self.latence = latence
+        self.requetes = 0
+        self._serveur = ThreadingHTTPServer(('127.0.0.1', port), self._gestionnaire())
+        self._serveur.daemon_threads = True
+        self.base = f'http://127.0.0.1:{self._serveur.server_address[1]}'
+
+    def url_locale(self, url):
+        return self.base + chemin_local(url)
+
+    def demarrer(self):
+        threading.Thread(target=self._serveur.serve_forever, daemon=True).start()
+        return self
+
+    def arreter(self):
+        self._serveur.shutdown()
+        self._serveur.server_close()
+
+    def _gestionnaire(self):
+        serveur = self
+
+        class Gestionnaire(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def do_GET(self):
+                serveur.requetes += 1
+                morceaux = urlsplit(self.path)
+                schema, _, reste = morceaux.path.lstrip('/').partition('/')
+                hote, _, chemin = reste.partition('/')
+                url = f'{schema}://{hote}/{chemin}'
+                enregistrement = serveur.magasin.lire(url, dict(parse_qsl(morceaux.query, keep_blank_values=True)))
+                time.sleep(serveur.latence)
+                if enregistrement is None:
+                    self._repondre(404, {}, b'')
+                    return
+                meta, corps = enregistrement
+                etag = CaseInsensitiveDict(meta['headers']).get('ETag')
+                if etag and etag == self.headers.get('If-None-Match'):
+                    self._repondre(304, {'ETag': etag}, b'')
+                    return
+                self._repondre(meta['status'], meta['headers'], corps)
+
+            def _repondre(self, statut, en_tetes, corps):
+                self.send_response(statut)
+                for cle, valeur in en_tetes.items():
+                    self.send_header(cle, valeur)
+                if statut != 304:
+                    self.send_header('Content-Length', str(len(corps)))
+                self.end_headers()
+                self.wfile.write(corps)
+
+            def log_message(self, *args):
+                pass
+
+        return Gestionnaire
@@ -0,0 +1,52 @@
+import re
+
+# Bloc Semepa : <p class="nbPlaces"><span style="...">205</span> places libres</p>
+ANCRE = b'<p class="nbPlaces">'
+FIN_BLOC = b'</span>'
+_BLOC = re.compile(rb'<p class="nbPlaces"><span[^>]*>([^<]+)</span>')
+
+
+def _valeur(brut):
+    """Nombre de places (int) ou texte de statut (str) contenu dans le bloc"""
+    if brut.isdigit():
+        return int(brut)
+    return brut.decode('utf-8', errors='replace').strip()
+
+
+def extraire(contenu):
+    """Extrait le contenu du bloc nbPlaces d'une page (bytes) en un seul passage
+
+    Retourne un int (places libres), un str (statut affiché à la place du
+    nombre, ex. "Fermeture temporaire" ou "COMPLET") ou None si pas de bloc.
+    """
+    match = _BLOC.search(contenu)
+    if match is None:
+        return None
+    return _valeur(match.group(1))
+
+
+def extraire_flux(morceaux):
+    """Comme extraire(), mais sur un itérable de morceaux de bytes
+
+    S'arrête dès que le bloc est trouvé : le reste de la page n'est ni lu ni
+    analysé. Seule la fin du tampon est gardée tant que l'ancre n'apparaît pas.
+    """
+    tampon = bytearray()
+    for morceau in morceaux:
+        tampon += morceau
+        while True:
+            pos = tampon.find(ANCRE)
+            if pos == -1:
+                # L'ancre peut être coupée entre deux morceaux
+                del tampon[:max(0, len(tampon) - len(ANCRE) + 1)]
+                break
+            match = _BLOC.match(tampon, pos)
+            if match is not None:
+                return _valeur(match.group(1))
+            if tampon.find(FIN_BLOC, pos) == -1:
+                # Bloc incomplet : attendre le morceau suivant
+                del tampon[:pos]
+                break
+            # Bloc complet mais dans un autre format : chercher l'ancre suivante
+            del tampon[:pos + 1]
+    return None
@@ -0,0 +1,130 @@
+import sqlite3
+import threading
+import time
+from pathlib import Path
+
+HISTORIQUE_DB = 'historique.db'
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS releves (
+    parking TEXT NOT NULL,
+    ts INTEGER NOT NULL,
+    places INTEGER NOT NULL,
+    capacite INTEGER NOT NULL,
+    statut TEXT NOT NULL,
+    PRIMARY KEY (parking, ts)
+) WITHOUT ROWID;
+"""
+
+
+class Historique:
+    """Historique des relevés, en ajout seul, stocké dans SQLite
+
+    La table est ordonnée physiquement par (parking, ts) : une requête sur un
+    parking et une plage de temps ne lit que les lignes concernées.
+    """
+
+    def __init__(self, chemin=HISTORIQUE_DB):
+        self.chemin = chemin
+        self._verrou = threading.Lock()
+        self._connexion = sqlite3.connect(chemin, check_same_thread=False, timeout=10)
+        # WAL : les lecteurs (dashboard) ne bloquent pas l'écriture du scraper
+        self._connexion.execute("PRAGMA journal_mode=WAL")
+        self._connexion.execute("PRAGMA synchronous=NORMAL")
+        self._connexion.executescript(_SCHEMA)
+
+    def ajouter(self, data, ts=None):
+        """Ajoute un sweep complet (dict au format du cache) à l'historique"""
+        ts = int(ts if ts is not None else time.time())
+        lignes = [
+            (nom, ts, int(releve['Places']), int(releve['Capacite']), releve['Statut'])
+            for nom, releve in data.items()
+        ]
+        with self._verrou, self._connexion:
+            self._connexion.executemany(
+                "INSERT OR REPLACE INTO releves (parking, ts, places, capacite, statut) VALUES (?, ?, ?, ?, ?)",
+                lignes
+            )
+
+    def serie(self, parking, debut, fin=None, pas=300):
+        """Places libres d'un parking entre debut et fin (epoch), par tranches de `pas` secondes
+
+        Retourne une liste de (debut_tranche, moyenne, minimum, maximum).
+        """
+        fin = int(fin if fin is not None else time.time())
+        with self._verrou:
+            return self._connexion.execute(
+                """
+                SELECT (ts / :pas) * :pas AS tranche, AVG(places), MIN(places), MAX(places)
+                FROM releves
+                WHERE parking = :parking AND ts >= :debut AND ts <= :fin
+                GROUP BY tranche
+                ORDER BY tranche
+                """,
+                {'pas': int(pas), 'parking': parking, 'debut': int(debut), 'fin': fin}
+            ).fetchall()
+
+    def releves(self, parking, debut, fin=None):
+        """Relevés bruts d'un parking entre debut et fin : liste de (ts, places, capacite, statut)"""
+        fin = int(fin if fin is not None else time.time())
+        with self._verrou:
+            return self._connexion.execute(
+                "SELECT ts, places, capacite, statut FROM releves "
+                "WHERE parking = ? AND ts >= ? AND ts <= ? ORDER BY ts",
+                (parking, int(debut), fin)
+            ).fetchall()
+
+    def releves_periode(self, parkings, debut, fin=None):
+        """Relevés (parking, ts, places, statut) de plusieurs parkings entre debut et fin
+
+        Pour chaque parking, le dernier relevé antérieur à `debut` est inclus : il
+        donne l'état du parking au début de la période (voir chronologie.py).
+        Chaque parking est lu par l'index (parking, ts), sans parcourir la table.
+        """
+        fin = int(fin if fin is not None else time.time())
+        lignes = []
+        with self._verrou:
+            for parking in parkings:
+                lignes.extend(self._connexion.execute(
+                    "SELECT parking, ts, places, statut FROM releves "
+                    "WHERE parking = :parking AND ts <= :fin AND ts >= COALESCE("
+                    "(SELECT MAX(ts) FROM releves WHERE parking = :parking AND ts <= :debut), :debut) "
+                    "ORDER BY ts",
+                    {'parking': parking, 'debut': int(debut), 'fin': fin}
+                ).fetchall())
+        return lignes
+
+    def parcourir(self, debut=None, statut=None, par_date=False, taille_lot=500_000):
+        """Relevés (parking, ts, places, statut) de tous les parkings, par lots de `taille_lot`
+
+        Filtrés sur ts >= debut et sur le statut si demandés, triés par date si
+        `par_date`, sinon par parking puis date (l'ordre de la clé, sans tri).
+        La lecture passe par une connexion en lecture seule dédiée : le curseur
+        reste ouvert entre les lots sans bloquer le thread qui ajoute les sweeps.
+        """
+        conditions, parametres = [], []
+        if debut is not None:
+            conditions.append("ts >= ?")
+            parametres.append(int(debut))
+        if statut is not None:
+            conditions.append("statut = ?")
+            parametres.append(statut)
+        requete = "SELECT parking, ts, places, statut FROM releves"
+        if conditions:
+            requete += " WHERE " + " AND ".join(conditions)
+        requete += " ORDER BY ts" if par_date else " ORDER BY parking, ts"
+        connexion = sqlite3.connect(Path(self.chemin).absolute().as_uri() + "?mode=ro", uri=True)
+        try:
+            curseur = connexion.execute(requete, parametres)
+            while True:
+                lot = curseur.fetchmany(taille_lot)
+                if not lot:
+                    return
+                yield lot
+        finally:
+            connexion.close()
+
+    def fermer(self):
+        """Ferme la connexion SQLite"""
+        with self._verrou:
+            self._connexion.close()
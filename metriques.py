@@ -0,0 +1,231 @@
+"""Métriques du collecteur au format texte Prometheus
+
+Compteurs et histogrammes en mémoire, sans dépendance, exposés en HTTP par
+le collecteur (GET /metrics sur PARKING_METRIQUES_PORT, 9108 par défaut) :
+
+    scraping_phase_secondes{hote,phase}        DNS, connexion TCP, TLS, TTFB, total de chaque requête
+    scraping_taille_octets{hote}               octets lus par requête (la lecture s'arrête au bloc nbPlaces)
+    scraping_analyse_secondes                  temps d'extraction hors attente réseau
+    scraping_resultats_total{hote,resultat}    nombre / complet / statut / sans_donnees / non_modifie /
+                                               json / timeout / erreur_http / erreur / disjoncte
+    scraping_relances_total{hote}              relances après un échec passager (voir disjoncteur.py)
+    scraping_parking_secondes_total{parking}   durée cumulée des requêtes de chaque parking
+    scraping_parking_requetes_total{parking}   (la moyenne par parking est le rapport des deux)
+    collecte_sweep_secondes                    durée d'un sweep complet (sources puis publication)
+    collecte_cache_ecriture_secondes           écriture atomique du cache JSON
+    collecte_page_legere_secondes              génération de la page légère (HTML + gzip)
+    collecte_publication_secondes              publication complète (cache, segment partagé, historique...)
+"""
+import math
+import os
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+METRIQUES_PORT = int(os.environ.get('PARKING_METRIQUES_PORT', '9108'))
+
+SEAUX_DUREE = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+SEAUX_SWEEP = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+SEAUX_TAILLE = (1024, 4096, 8192, 16384, 32768, 65536, 131072, 262144, 1048576)
+
+
+def _echapper(valeur):
+    return str(valeur).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _etiquettes(noms, valeurs):
+    if not noms:
+        return ''
+    return '{' + ','.join(f'{nom}="{_echapper(valeur)}"' for nom, valeur in zip(noms, valeurs)) + '}'
+
+
+def _nombre(valeur):
+    if valeur == math.inf:
+        return '+Inf'
+    return repr(float(valeur)) if isinstance(valeur, float) else str(valeur)
+
+
+class Compteur:
+    """Compteur croissant, par combinaison d'étiquettes"""
+
+    type = 'counter'
+
+    def __init__(self, nom, aide, etiquettes=()):
+        self.nom = nom
+        self.aide = aide
+        self.etiquettes = tuple(etiquettes)
+        self._valeurs = {}
+        self._verrou = threading.Lock()
+
+    def inc(self, valeur=1, **etiquettes):
+        cle = tuple(etiquettes[e] for e in self.etiquettes)
+        with self._verrou:
+            self._valeurs[cle] = self._valeurs.get(cle, 0) + valeur
+
+    def lignes(self):
+        with self._verrou:
+            valeurs = list(self._valeurs.items())
+        return [f'{self.nom}{_etiquettes(self.etiquettes, cle)} {_nombre(v)}' for cle, v in valeurs]
+
+
+class Histogramme:
+    """Histogramme cumulatif (seaux, somme, nombre), par combinaison d'étiquettes"""
+
+    type = 'histogram'
+
+    def __init__(self, nom, aide, seaux=SEAUX_DUREE, etiquettes=()):
+        self.nom = nom
+        self.aide = aide
+        self.seaux = tuple(seaux) + (math.inf,)
+        self.etiquettes = tuple(etiquettes)
+        self._series = {}  # cle -> [compteurs par seau..., somme, nombre]
+        self._verrou = threading.Lock()
+
+    def observer(self, valeur, **etiquettes):
+        cle = tuple(etiquettes[e] for e in self.etiquettes)
+        with self._verrou:
+            serie = self._series.get(cle)
+            if serie is None:
+                serie = self._series[cle] = [0] * len(self.seaux) + [0.0, 0]
+            for i, borne in enumerate(self.seaux):
+                if valeur <= borne:
+                    serie[i] += 1
+                    break
+            serie[-2] += valeur
+            serie[-1] += 1
+
+    def lignes(self):
+        with self._verrou:
+            series = [(cle, list(serie)) for cle, serie in self._series.items()]
+        lignes = []
+        noms = self.etiquettes + ('le',)
+        for cle, serie in series:
+            cumul = 0
+            for borne, n in zip(self.seaux, serie):
+                cumul += n
+                lignes.append(f'{self.nom}_bucket{_etiquettes(noms, cle + (_nombre(borne),))} {cumul}')
+            lignes.append(f'{self.nom}_sum{_etiquettes(self.etiquettes, cle)} {_nombre(serie[-2])}')
+            lignes.append(f'{self.nom}_count{_etiquettes(self.etiquettes, cle)} {serie[-1]}')
+        return lignes
+
+
+class Chrono:
+    """Chronomètre utilisable en `with`, qui observe la durée dans un histogramme"""
+
+    def __init__(self, histogramme, **etiquettes):
+        self.histogramme = histogramme
+        self.etiquettes = etiquettes
+
+    def __enter__(self):
+        self.debut = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.duree = time.perf_counter() - self.debut
+        self.histogramme.observer(self.duree, **self.etiquettes)
+
+
+phases = Histogramme('scraping_phase_secondes', "Durée des phases d'une requête", etiquettes=('hote', 'phase'))
+tailles = Histogramme('scraping_taille_octets', "Octets lus par requête", SEAUX_TAILLE, etiquettes=('hote',))
+analyse = Histogramme('scraping_analyse_secondes', "Extraction du bloc nbPlaces hors attente réseau")
+resultats = Compteur('scraping_resultats_total', "Résultats des requêtes par classe", ('hote', 'resultat'))
+relances = Compteur('scraping_relances_total', "Relances après un échec passager", ('hote',))
+duree_parking = Compteur('scraping_parking_secondes_total', "Durée cumulée des requêtes par parking", ('parking',))
+requetes_parking = Compteur('scraping_parking_requetes_total', "Requêtes par parking", ('parking',))
+sweeps = Histogramme('collecte_sweep_secondes', "Durée d'un sweep", SEAUX_SWEEP)
+ecriture_cache = Histogramme('collecte_cache_ecriture_secondes', "Écriture atomique du cache JSON")
+page_legere = Histogramme('collecte_page_legere_secondes', "Génération de la page légère")
+publication = Histogramme('collecte_publication_secondes', "Publication d'un snapshot")
+anomalies = Compteur('collecte_anomalies_total', "Relevés suspects écartés, par anomalie", ('type',))
+
+METRIQUES = [
+    phases, tailles, analyse, resultats, relances, duree_parking, requetes_parking,
+    sweeps, ecriture_cache, page_legere, publication, anomalies,
+]
+
+
+class MesureRequete:
+    """Durées d'une requête, renseignées par les connexions instrumentées (sessions.py)"""
+
+    __slots__ = ('dns', 'connexion', 'tls', 'debut')
+
+    def __init__(self):
+        self.dns = self.connexion = self.tls = 0.0
+        self.debut = time.perf_counter()
+
+
+_courante = threading.local()
+
+
+def commencer_mesure():
+    """Démarre la mesure de la requête du thread courant"""
+    _courante.mesure = MesureRequete()
+    return _courante.mesure
+
+
+def mesure_courante():
+    """Mesure en cours dans ce thread, ou None"""
+    return getattr(_courante, 'mesure', None)
+
+
+def terminer_mesure(hote, parking, resultat, ttfb=None, taille=None):
+    """Enregistre la requête du thread courant dans les métriques"""
+    mesure = getattr(_courante, 'mesure', None)
+    _courante.mesure = None
+    if mesure is None:
+        return
+    total = time.perf_counter() - mesure.debut
+    if mesure.dns:
+        phases.observer(mesure.dns, hote=hote, phase='dns')
+    if mesure.connexion:
+        phases.observer(mesure.connexion, hote=hote, phase='connexion')
+    if mesure.tls:
+        phases.observer(mesure.tls, hote=hote, phase='tls')
+    if ttfb is not None:
+        # Premier octet : depuis l'envoi de la requête, sans l'établissement de la connexion
+        phases.observer(max(0.0, ttfb - mesure.dns - mesure.connexion - mesure.tls), hote=hote, phase='ttfb')
+    phases.observer(total, hote=hote, phase='total')
+    if taille is not None:
+        tailles.observer(taille, hote=hote)
+    resultats.inc(hote=hote, resultat=resultat)
+    if parking is not None:
+        duree_parking.inc(total, parking=parking)
+        requetes_parking.inc(parking=parking)
+
+
+def exposer():
+    """Toutes les métriques au format texte Prometheus"""
+    lignes = []
+    for metrique in METRIQUES:
+        lignes.append(f'# HELP {metrique.nom} {metrique.aide}')
+        lignes.append(f'# TYPE {metrique.nom} {metrique.type}')
+        lignes.extend(metrique.lignes())
+    return '\n'.join(lignes) + '\n'
+
+
+class _Gestionnaire(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split('?')[0] != '/metrics':
+            self.send_error(404)
+            return
+        corps = exposer().encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+        self.send_header('Content-Length', str(len(corps)))
+        self.end_headers()
+        self.wfile.write(corps)
+
+    def log_message(self, *args):
+        pass
+
+
+def demarrer_serveur(port=METRIQUES_PORT, hote='127.0.0.1'):
+    """Sert /metrics dans un thread ; None si le port est déjà pris"""
+    try:
+        serveur = ThreadingHTTPServer((hote, port), _Gestionnaire)
+    except OSError as e:
+        print(f"Métriques non exposées (port {port}): {e}")
+        return None
+    serveur.daemon_threads = True
+    threading.Thread(target=serveur.serve_forever, daemon=True).start()
+    return serveur
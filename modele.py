@@ -0,0 +1,294 @@
+"""Modèle colonnaire du snapshot : champs statiques une fois, relevés dans des tableaux NumPy
+
+Dans le format d'échange (dict nom -> relevé, voir scraper.construire_releve),
+chaque parking répète sa capacité et ses coordonnées, et porte des chaînes
+d'affichage (Affichage, Statut avec emoji, Timestamp) calculées à chaque relevé.
+Ici :
+
+    Metadonnees         noms, capacités, coordonnées du registre, partagées par
+                        tous les snapshots d'une même version du registre
+    SnapshotParkings    un enregistrement de taille fixe par parking (RELEVE) :
+                        places, code de statut, date epoch, âge, message, source,
+                        qualité des données et anomalies (voir anomalies.py)
+
+Les chaînes d'affichage et les couleurs de la carte sont dérivées à la demande,
+sur des tableaux entiers (affichages, libelles_statut, heures, couleurs). Le
+format dict reste disponible (releves_dict) pour le cache JSON, l'API et les alertes.
+"""
+from collections.abc import Mapping
+from datetime import datetime
+from zoneinfo import ZoneInfo
+
+import numpy as np
+
+FUSEAU = ZoneInfo("Europe/Paris")
+
+# Codes de statut ; ABSENT : parking du registre sans relevé dans le snapshot
+OUVERT, MESSAGE, SANS_DONNEES, ERREUR = range(4)
+ABSENT = 255
+STATUT_OUVERT = '✅ Ouvert'
+CODES_STATUT = {STATUT_OUVERT: OUVERT, '❓ Pas de données': SANS_DONNEES, '❌ Erreur': ERREUR}
+# Seuil de places sous lequel un parking ouvert est affiché COMPLET (voir scraper.interpreter_page)
+SEUIL_COMPLET = 2
+# Anomalies d'un relevé (anomalies.py) : bit i pour ANOMALIES[i]
+ANOMALIES = ('fige', 'saut', 'hors_bornes', 'sans_donnees')
+LIBELLES_ANOMALIES = {
+    'fige': 'valeur figée', 'saut': 'saut brutal', 'hors_bornes': 'hors capacité',
+    'sans_donnees': 'pas de données prolongé',
+}
+QUALITE_INCONNUE = 255
+
+# Un relevé : 22 octets, sans pointeur (recopiable tel quel dans un tampon binaire)
+RELEVE = np.dtype([
+    ('places', '<i4'),
+    ('ts', '<i8'),         # date du relevé (epoch), -1 si inconnue
+    ('age', '<i4'),        # âge d'une dernière valeur connue (s), -1 pour un relevé frais
+    ('message', '<i2'),    # indice dans la table des messages (statut MESSAGE), -1 sinon
+    ('statut', 'u1'),
+    ('source', 'u1'),      # indice dans la table des sources, 0 : non renseignée
+    ('qualite', 'u1'),     # score de qualité des données du parking (%), QUALITE_INCONNUE sinon
+    ('anomalies', 'u1'),   # bits des ANOMALIES du relevé, 0 pour un relevé sain
+])
+
+
+def bits_anomalies(noms):
+    """Bits d'une liste d'anomalies ('fige', 'saut', ...)"""
+    return sum(1 << ANOMALIES.index(nom) for nom in noms)
+
+
+def noms_anomalies(bits):
+    """Liste des anomalies d'un champ de bits"""
+    return [nom for i, nom in enumerate(ANOMALIES) if bits >> i & 1]
+
+
+def releves_vides(n):
+    """Tableau de `n` relevés absents"""
+    releves = np.zeros(n, dtype=RELEVE)
+    releves['statut'] = ABSENT
+    releves['ts'] = releves['age'] = releves['message'] = -1
+    releves['qualite'] = QUALITE_INCONNUE
+    return releves
+
+
+class Metadonnees:
+    """Champs statiques des parkings d'un registre : nom -> indice, capacités, coordonnées"""
+
+    def __init__(self, noms, capacites, latitudes, longitudes):
+        self.noms = list(noms)
+        self.noms_tableau = np.array(self.noms, dtype=object)
+        self.index = {nom: i for i, nom in enumerate(self.noms)}
+        self.capacites = np.asarray(capacites, dtype=np.int32)
+        self.latitudes = np.asarray(latitudes, dtype=np.float64)
+        self.longitudes = np.asarray(longitudes, dtype=np.float64)
+
+    @classmethod
+    def depuis_registre(cls, parkings):
+        """Depuis le registre : nom -> (url, page_id, capacite, lat, lon)"""
+        valeurs = parkings.values()
+        return cls(parkings, [p[2] for p in valeurs], [p[3] for p in valeurs], [p[4] for p in valeurs])
+
+    @classmethod
+    def depuis_releves(cls, data):
+        """Depuis les relevés au format dict (Capacite, latitude, longitude)"""
+        valeurs = data.values()
+        return cls(data, [r['Capacite'] for r in valeurs], [r['latitude'] for r in valeurs],
+                   [r['longitude'] for r in valeurs])
+
+    def indices(self, noms):
+        """Indices des parkings `noms` connus du registre, dans l'ordre donné"""
+        index = self.index
+        return np.array([index[nom] for nom in noms if nom in index], dtype=np.intp)
+
+
+_metadonnees = (None, None)
+
+
+def metadonnees(registre):
+    """Métadonnées du registre, reconstruites seulement quand sa version change"""
+    global _metadonnees
+    cle = (id(registre), registre.version)
+    if _metadonnees[0] != cle:
+        _metadonnees = (cle, Metadonnees.depuis_registre(registre.parkings))
+    return _metadonnees[1]
+
+
+def _ts_depuis_heure(heure):
+    """Epoch d'une heure HH:MM:SS du jour (relevés antérieurs au champ Ts), -1 si illisible"""
+    try:
+        moment = datetime.strptime(heure, "%H:%M:%S").time()
+    except (TypeError, ValueError):
+        return -1
+    return int(datetime.combine(datetime.now(FUSEAU).date(), moment, FUSEAU).timestamp())
+
+
+class TableChaines:
+    """Table de chaînes internées : chaîne -> petit entier"""
+
+    def __init__(self, valeurs=()):
+        self.valeurs = list(valeurs)
+        self._index = {v: i for i, v in enumerate(self.valeurs)}
+
+    def code(self, valeur):
+        if valeur not in self._index:
+            self._index[valeur] = len(self.valeurs)
+            self.valeurs.append(valeur)
+        return self._index[valeur]
+
+
+class SnapshotParkings(Mapping):
+    """Relevés d'un snapshot alignés sur les métadonnées d'un registre
+
+    Se lit aussi comme le dict nom -> relevé (format dict construit à la demande,
+    parking par parking), pour les quelques accès par nom ; les requêtes qui
+    testent beaucoup de parkings (proximite.proches) lisent les colonnes.
+    """
+
+    def __init__(self, meta, releves=None, messages=(), sources=('',)):
+        self.meta = meta
+        if releves is None:
+            releves = releves_vides(len(meta.noms))
+        self.releves = releves
+        self.messages = list(messages)
+        self.sources = list(sources)
+
+    @classmethod
+    def depuis_releves(cls, parkings, meta):
+        """Construit le modèle depuis le format dict ; les parkings hors registre sont ignorés"""
+        modele = cls(meta)
+        messages, sources = TableChaines(), TableChaines(modele.sources)
+        lignes = modele.releves
+        index = meta.index
+        for nom, releve in parkings.items():
+            i = index.get(nom)
+            if i is None:
+                continue
+            statut = releve['Statut']
+            code = CODES_STATUT.get(statut, MESSAGE)
+            lignes[i] = (
+                releve['Places'], releve['Ts'] if 'Ts' in releve else _ts_depuis_heure(releve.get('Timestamp')),
+                releve.get('Age', -1),
+                messages.code(releve['Affichage']) if code == MESSAGE else -1,
+                code, sources.code(releve.get('Source', '')),
+                releve.get('Qualite', QUALITE_INCONNUE), bits_anomalies(releve.get('Anomalies', ())),
+            )
+        modele.messages, modele.sources = messages.valeurs, sources.valeurs
+        return modele
+
+    def __getitem__(self, nom):
+        i = self.meta.index.get(nom)
+        if i is None or self.releves['statut'][i] == ABSENT:
+            raise KeyError(nom)
+        return self.releves_dict([nom])[nom]
+
+    def __iter__(self):
+        return iter(self.meta.noms_tableau[self.presents()].tolist())
+
+    def __len__(self):
+        return int(np.count_nonzero(self.releves['statut'] != ABSENT))
+
+    def presents(self, indices=None):
+        """Indices (parmi `indices`, tous par défaut) des parkings ayant un relevé"""
+        if indices is None:
+            return np.flatnonzero(self.releves['statut'] != ABSENT)
+        return indices[self.releves['statut'][indices] != ABSENT]
+
+    def disponible(self, nom, min_places):
+        """Comme proximite.disponible, lu dans les colonnes du parking (sans construire son dict)"""
+        i = self.meta.index.get(nom)
+        if i is None:
+            return False
+        r = self.releves[i]
+        return bool(r['statut'] == OUVERT and r['places'] >= min_places and not r['anomalies'])
+
+    # --- Dérivations vectorisées (tableaux alignés sur `indices`) ---
+
+    def affichages(self, indices):
+        """Texte des places : 'COMPLET', 'places / capacité', message, 'N/A' ou 'Erreur'"""
+        r = self.releves[indices]
+        places = r['places']
+        capacites = self.meta.capacites[indices]
+        resultat = np.full(len(indices), 'Erreur', dtype=object)
+        ouverts = r['statut'] == OUVERT
+        resultat[ouverts] = [f'{p} / {c}' for p, c in zip(places[ouverts].tolist(), capacites[ouverts].tolist())]
+        resultat[ouverts & (places <= SEUIL_COMPLET)] = 'COMPLET'
+        resultat[r['statut'] == SANS_DONNEES] = 'N/A'
+        avec_message = r['statut'] == MESSAGE
+        if avec_message.any():
+            resultat[avec_message] = np.array(self.messages, dtype=object)[r['message'][avec_message]]
+        return resultat
+
+    def libelles_statut(self, indices):
+        """Statut affiché ('✅ Ouvert', '⚠️ <message>', ...)"""
+        libelles = np.array(['✅ Ouvert', '', '❓ Pas de données', '❌ Erreur'], dtype=object)
+        r = self.releves[indices]
+        statuts = r['statut']
+        resultat = libelles[np.minimum(statuts, ERREUR)]
+        avec_message = statuts == MESSAGE
+        if avec_message.any():
+            alertes = np.array([f'⚠️ {m}' for m in self.messages], dtype=object)
+            resultat[avec_message] = alertes[r['message'][avec_message]]
+        return resultat
+
+    def heures(self, indices):
+        """Heure locale des relevés (HH:MM:SS) ; une seule conversion par date distincte"""
+        ts = self.releves['ts'][indices]
+        uniques, inverse = np.unique(ts, return_inverse=True)
+        textes = np.array([datetime.fromtimestamp(t, FUSEAU).strftime("%H:%M:%S") if t >= 0 else 'N/A'
+                           for t in uniques.tolist()], dtype=object)
+        return textes[inverse.reshape(-1)]
+
+    def suspects(self, indices):
+        """Masque des relevés marqués suspects par la détection d'anomalies"""
+        return self.releves['anomalies'][indices] != 0
+
+    def libelles_anomalies(self, indices):
+        """Anomalies lisibles ('valeur figée, saut brutal'), '' pour un relevé sain"""
+        bits = self.releves['anomalies'][indices]
+        uniques, inverse = np.unique(bits, return_inverse=True)
+        textes = np.array([', '.join(LIBELLES_ANOMALIES[nom] for nom in noms_anomalies(b))
+                           for b in uniques.tolist()], dtype=object)
+        return textes[inverse.reshape(-1)]
+
+    def couleurs(self, indices):
+        """Couleur de la carte : gris hors service, violet suspect, puis vert / orange / rouge selon le taux"""
+        r = self.releves[indices]
+        capacites = self.meta.capacites[indices]
+        taux = np.divide(r['places'], capacites, out=np.zeros(len(indices)), where=capacites > 0)
+        return np.select([r['statut'] != OUVERT, r['anomalies'] != 0, taux > 0.5, taux > 0.1],
+                         ['gray', 'purple', 'green', 'orange'], 'red')
+
+    # --- Format d'échange ---
+
+    def releves_dict(self, noms=None):
+        """Relevés au format dict (scraper.construire_releve), dans l'ordre du registre par défaut"""
+        indices = self.presents(None if noms is None else self.meta.indices(noms))
+        r = self.releves[indices]
+        meta = self.meta
+        colonnes = zip(
+            indices.tolist(), r['places'].tolist(), self.affichages(indices), self.libelles_statut(indices),
+            self.heures(indices), r['ts'].tolist(), r['age'].tolist(), r['source'].tolist(),
+            r['qualite'].tolist(), r['anomalies'].tolist(),
+        )
+        data = {}
+        for i, places, affichage, statut, heure, ts, age, source, qualite, anomalies in colonnes:
+            releve = {
+                'Places': places, 'Capacite': int(meta.capacites[i]), 'Affichage': affichage,
+                'Statut': statut, 'Timestamp': heure,
+                'latitude': float(meta.latitudes[i]), 'longitude': float(meta.longitudes[i]),
+            }
+            if ts >= 0:
+                releve['Ts'] = ts
+            if source:
+                releve['Source'] = self.sources[source]
+            if age >= 0:
+                releve['Age'] = age
+            if qualite != QUALITE_INCONNUE:
+                releve['Qualite'] = qualite
+            if anomalies:
+                releve['Anomalies'] = noms_anomalies(anomalies)
+            data[meta.noms[i]] = releve
+        return data
+
+    def octets(self):
+        """Mémoire occupée par les relevés et leurs tables (hors métadonnées partagées)"""
+        return self.releves.nbytes + sum(len(m.encode('utf-8')) for m in self.messages + self.sources)
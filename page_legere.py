@@ -0,0 +1,108 @@
+"""Page légère des parkings : HTML statique pré-compressé, régénéré à chaque snapshot
+
+Le collecteur écrit, après chaque save_cache(), une page HTML autonome (sans
+JavaScript, ni carte, ni ressource externe) et sa version gzip :
+
+    statique/parkings.html       servie telle quelle par n'importe quel serveur statique
+    statique/parkings.html.gz    (nginx : gzip_static on ; api.py : GET /leger)
+
+Pour le registre d'Aix, la version gzip tient en moins de 2 Ko : elle arrive dans
+le premier aller-retour réseau (fenêtre TCP initiale d'environ 14 Ko), sans
+démarrer Streamlit, pandas ni Folium.
+
+PARKING_STATIQUE_DIR    dossier des fichiers générés (statique/ par défaut)
+"""
+import gzip
+import html
+import os
+import tempfile
+
+STATIQUE_DIR = os.environ.get('PARKING_STATIQUE_DIR', 'statique')
+PAGE_FILE = 'parkings.html'
+# La page se recharge d'elle-même (le collecteur publie au plus souvent toutes les 2 min)
+RAFRAICHISSEMENT = 60
+
+STYLE = (
+    "body{font:15px/1.4 system-ui,sans-serif;margin:0 auto;max-width:40em;padding:0 .8em;color:#222}"
+    "h1{font-size:1.3em}h2{font-size:1.1em;margin:1.2em 0 .3em}"
+    "table{border-collapse:collapse;width:100%}td{padding:.35em .2em;border-bottom:1px solid #ddd}"
+    "td.p{text-align:right;font-weight:600;white-space:nowrap}small{color:#777}"
+    "i{display:inline-block;width:.7em;height:.7em;border-radius:50%;margin-right:.4em}"
+    ".g{background:#2a2}.o{background:#e80}.r{background:#d22}.x{background:#999}.s{background:#93c}"
+)
+
+
+def classe_couleur(releve):
+    """Classe CSS de la pastille : mêmes seuils que la carte du dashboard"""
+    if releve['Statut'] != '✅ Ouvert':
+        return 'x'
+    if releve.get('Anomalies'):
+        return 's'
+    taux = releve['Places'] / releve['Capacite'] if releve['Capacite'] else 0
+    return 'g' if taux > 0.5 else 'o' if taux > 0.1 else 'r'
+
+
+def _ligne(nom, releve, prevision):
+    details = []
+    if releve['Statut'] != '✅ Ouvert':
+        details.append(releve['Statut'])
+    if prevision:
+        details.append(f"dans 30 min : {prevision['30']}")
+    if releve.get('Age') is not None:
+        details.append(f"dernière valeur connue, il y a {releve['Age'] // 60} min")
+    if releve.get('Anomalies'):
+        details.append("relevé suspect, hors du total")
+    detail = f"<br><small>{html.escape(' · '.join(details))}</small>" if details else ''
+    return (
+        f'<tr><td><i class="{classe_couleur(releve)}"></i>{html.escape(nom)}{detail}</td>'
+        f'<td class="p">{html.escape(str(releve["Affichage"]))}</td></tr>'
+    )
+
+
+def generer_page(snapshot, villes):
+    """HTML de la page pour un snapshot ; `villes` : ville -> noms des parkings (ordre d'affichage)"""
+    parkings = snapshot['parkings']
+    previsions = snapshot.get('previsions', {})
+    morceaux = [
+        '<!DOCTYPE html><html lang="fr"><head><meta charset="utf-8">'
+        '<meta name="viewport" content="width=device-width,initial-scale=1">'
+        f'<meta http-equiv="refresh" content="{RAFRAICHISSEMENT}">'
+        f'<title>Parkings</title><style>{STYLE}</style></head><body>'
+        f'<h1>🅿️ Places disponibles</h1><p><small>Mise à jour {html.escape(snapshot["timestamp"])}</small></p>'
+    ]
+    for ville, noms in villes.items():
+        noms = sorted((nom for nom in noms if nom in parkings), key=lambda nom: -parkings[nom]['Places'])
+        if not noms:
+            continue
+        total = sum(int(parkings[nom]['Places']) for nom in noms if not parkings[nom].get('Anomalies'))
+        morceaux.append(f'<h2>{html.escape(ville)} <small>{total} places</small></h2><table>')
+        morceaux.extend(_ligne(nom, parkings[nom], previsions.get(nom)) for nom in noms)
+        morceaux.append('</table>')
+    morceaux.append('</body></html>')
+    return ''.join(morceaux)
+
+
+def _ecrire_atomique(chemin, contenu):
+    """Écrit un fichier par fichier temporaire puis rename (jamais de page à moitié écrite)"""
+    fd, temporaire = tempfile.mkstemp(dir=os.path.dirname(chemin), prefix='.page.', suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(contenu)
+        os.chmod(temporaire, 0o644)
+        os.replace(temporaire, chemin)
+    except BaseException:
+        os.unlink(temporaire)
+        raise
+
+
+def publier_page(snapshot, villes, dossier=STATIQUE_DIR):
+    """Génère la page et sa version gzip dans `dossier` ; retourne (taille, taille gzip)"""
+    os.makedirs(dossier, exist_ok=True)
+    page = generer_page(snapshot, villes).encode('utf-8')
+    # mtime=0 : même page, mêmes octets (ETag stable côté serveur statique)
+    compressee = gzip.compress(page, 9, mtime=0)
+    chemin = os.path.join(os.path.abspath(dossier), PAGE_FILE)
+    # La version gzip en dernier : elle signale aux lecteurs (api.PageStatique) une nouvelle page
+    _ecrire_atomique(chemin, page)
+    _ecrire_atomique(chemin + '.gz', compressee)
+    return len(page), len(compressee)
@@ -0,0 +1,142 @@
+import heapq
+import time
+from datetime import datetime
+from zoneinfo import ZoneInfo
+
+# Bornes de l'intervalle entre deux scrapings d'un même parking (secondes)
+INTERVALLE_MIN = 120
+INTERVALLE_MAX = 1800
+INTERVALLE_DEFAUT = 600
+
+# Budget global : en moyenne une requête toutes les 10 minutes par parking du registre
+BUDGET_PAR_PARKING_PAR_HEURE = 6
+
+# Variation (en fraction de la capacité) attendue entre deux scrapings
+VARIATION_CIBLE = 0.02
+LISSAGE = 0.3
+
+# Facteur appliqué à l'intervalle selon l'heure (la nuit, les parkings bougent peu)
+HEURES_CREUSES = range(0, 6)
+FACTEUR_HEURES_CREUSES = 3.0
+# Un parking presque plein (< 10 % de places libres) est surveillé deux fois plus souvent
+SEUIL_PRESQUE_PLEIN = 0.1
+FACTEUR_PRESQUE_PLEIN = 0.5
+
+
+class EtatParking:
+    """Dernière observation et vitesse de variation lissée d'un parking"""
+
+    __slots__ = ('places', 'ts', 'vitesse', 'ouvert', 'intervalle', 'echeance')
+
+    def __init__(self):
+        self.places = None
+        self.ts = None
+        self.vitesse = None  # places par seconde, moyenne mobile exponentielle
+        self.ouvert = True
+        self.intervalle = INTERVALLE_DEFAUT
+        self.echeance = 0.0
+
+
+class Planificateur:
+    """Échéance de scraping propre à chaque parking, dans un budget global de requêtes
+
+    L'intervalle d'un parking est le temps attendu pour que ses places libres
+    varient de VARIATION_CIBLE de sa capacité, raccourci s'il est presque plein,
+    allongé la nuit ou s'il est fermé. Si la somme des fréquences dépasse le
+    budget, tous les intervalles sont allongés dans la même proportion.
+    """
+
+    def __init__(self, capacites, budget_par_heure=None):
+        # Budget par défaut : proportionnel au registre, recalculé quand il change
+        self._budget_fixe = budget_par_heure
+        self.etats = {}
+        self.actualiser(capacites)
+
+    def actualiser(self, capacites):
+        """Suit un nouveau registre : les parkings ajoutés sont dus tout de suite, les retirés oubliés"""
+        self.capacites = dict(capacites)
+        self.budget_par_heure = self._budget_fixe
+        if self.budget_par_heure is None:
+            self.budget_par_heure = BUDGET_PAR_PARKING_PAR_HEURE * max(1, len(self.capacites))
+        self.etats = {nom: self.etats.get(nom) or EtatParking() for nom in self.capacites}
+        # Somme des fréquences souhaitées (requêtes par heure), tenue à jour au fil de l'eau
+        self._demande = sum(3600 / e.intervalle for e in self.etats.values())
+        self._tas = [(e.echeance, nom) for nom, e in self.etats.items()]
+        heapq.heapify(self._tas)
+
+    def _intervalle_souhaite(self, nom, etat, maintenant):
+        if not etat.ouvert:
+            return INTERVALLE_MAX
+        if etat.vitesse is None:
+            intervalle = INTERVALLE_DEFAUT
+        else:
+            capacite = self.capacites[nom]
+            intervalle = VARIATION_CIBLE * capacite / max(etat.vitesse, 1e-6)
+            if etat.places is not None and etat.places < SEUIL_PRESQUE_PLEIN * capacite:
+                intervalle *= FACTEUR_PRESQUE_PLEIN
+        if datetime.fromtimestamp(maintenant, ZoneInfo("Europe/Paris")).hour in HEURES_CREUSES:
+            intervalle *= FACTEUR_HEURES_CREUSES
+        return min(max(intervalle, INTERVALLE_MIN), INTERVALLE_MAX)
+
+    def enregistrer(self, nom, releve, maintenant=None):
+        """Prend en compte un relevé (format du cache) et replanifie le parking"""
+        maintenant = maintenant if maintenant is not None else time.time()
+        etat = self.etats.get(nom)
+        if etat is None:
+            # Parking retiré du registre pendant le sweep
+            return
+        if releve['Statut'] == '❌ Erreur':
+            # Échec de la requête : rien appris sur le parking, nouvel essai rapide
+            self._planifier(nom, etat, maintenant, INTERVALLE_MIN)
+            return
+
+        places = int(releve['Places'])
+        etat.ouvert = releve['Statut'] == '✅ Ouvert'
+        if etat.ouvert and etat.places is not None and maintenant > etat.ts:
+            vitesse = abs(places - etat.places) / (maintenant - etat.ts)
+            etat.vitesse = vitesse if etat.vitesse is None else LISSAGE * vitesse + (1 - LISSAGE) * etat.vitesse
+        etat.places, etat.ts = places, maintenant
+
+        self._planifier(nom, etat, maintenant, self._intervalle_souhaite(nom, etat, maintenant))
+
+    def _planifier(self, nom, etat, maintenant, intervalle):
+        self._demande += 3600 / intervalle - 3600 / etat.intervalle
+        etat.intervalle = intervalle
+        # Respect du budget global : étirement proportionnel de tous les intervalles
+        etirement = max(1.0, self._demande / self.budget_par_heure)
+        etat.echeance = maintenant + intervalle * etirement
+        heapq.heappush(self._tas, (etat.echeance, nom))
+
+    def reporter(self, noms, delai=INTERVALLE_MIN, maintenant=None):
+        """Replanifie des parkings dans `delai` secondes sans nouveau relevé"""
+        maintenant = maintenant if maintenant is not None else time.time()
+        for nom in noms:
+            etat = self.etats.get(nom)
+            if etat is None:
+                continue
+            etat.echeance = maintenant + delai
+            heapq.heappush(self._tas, (etat.echeance, nom))
+
+    def dus(self, maintenant=None):
+        """Parkings dont l'échéance est atteinte"""
+        maintenant = maintenant if maintenant is not None else time.time()
+        noms = {}
+        while self._tas and self._tas[0][0] <= maintenant:
+            echeance, nom = heapq.heappop(self._tas)
+            # Entrée périmée : le parking a été replanifié depuis
+            if echeance == self.etats[nom].echeance:
+                noms[nom] = None
+        return list(noms)
+
+    def prochaine_echeance(self):
+        """Date de la prochaine échéance (epoch), ou None"""
+        while self._tas and self._tas[0][0] != self.etats[self._tas[0][1]].echeance:
+            heapq.heappop(self._tas)
+        return self._tas[0][0] if self._tas else None
+
+    def tout_replanifier(self, maintenant=None):
+        """Rend tous les parkings dus immédiatement (ex. rafraîchissement manuel)"""
+        maintenant = maintenant if maintenant is not None else time.time()
+        for nom, etat in self.etats.items():
+            etat.echeance = maintenant
+            heapq.heappush(self._tas, (maintenant, nom))
@@ -0,0 +1,151 @@
+"""Prévision des places libres à 15, 30 et 60 minutes
+
+Pour chaque parking, le modèle garde :
+- un profil saisonnier : taux de places libres moyen par (jour de la semaine, heure),
+  appris par moyenne mobile au fil des relevés ;
+- l'écart récent au profil (résidu) et sa vitesse de variation (tendance).
+
+Prévision = profil à l'heure visée + (résidu + tendance x délai), l'écart s'estompant
+avec le délai (constante AMORTISSEMENT). Tous les parkings sont traités en un seul
+calcul NumPy : l'apprentissage d'un sweep et la prévision du registre entier prennent
+quelques millisecondes, ce qui permet de les faire dans la boucle du collecteur.
+"""
+import time
+from datetime import datetime
+from zoneinfo import ZoneInfo
+
+import numpy as np
+import pandas as pd
+
+HORIZONS = (15, 30, 60)  # minutes
+CRENEAUX = 7 * 24        # heures de la semaine
+# Taux d'apprentissage minimal du profil (le profil suit les changements d'habitudes)
+ALPHA_MIN = 0.05
+# Au-delà de ce délai (s), l'écart au profil observé n'est plus pris en compte
+AMORTISSEMENT = 3600
+LISSAGE_TENDANCE = 0.1
+# Écart maximal (s) entre deux relevés pour estimer une tendance
+ECART_MAX_TENDANCE = 2 * 3600
+
+FUSEAU = ZoneInfo("Europe/Paris")
+
+
+def position_semaine(ts):
+    """Position dans la semaine en heures (0 = lundi 0 h, heure de Paris), pour un ou plusieurs epoch"""
+    if np.ndim(ts) == 0:
+        d = datetime.fromtimestamp(float(ts), FUSEAU)
+        return d.weekday() * 24 + d.hour + d.minute / 60 + d.second / 3600
+    dates = pd.to_datetime(np.asarray(ts, dtype=np.int64), unit='s', utc=True).tz_convert(FUSEAU)
+    return (dates.dayofweek * 24 + dates.hour + dates.minute / 60 + dates.second / 3600).to_numpy()
+
+
+def _interpolation(position):
+    """Créneaux voisins et poids pour interpoler le profil entre les milieux d'heure"""
+    x = np.asarray(position) - 0.5
+    bas = np.floor(x)
+    poids = x - bas
+    return bas.astype(np.int64) % CRENEAUX, (bas.astype(np.int64) + 1) % CRENEAUX, poids
+
+
+class Prevision:
+    """Modèle de prévision de tous les parkings, tenu dans des tableaux NumPy
+
+    Les parkings sont indexés dans l'ordre de `capacites` (nom -> capacité).
+    """
+
+    def __init__(self, capacites):
+        self.noms = list(capacites)
+        self.indices = {nom: i for i, nom in enumerate(self.noms)}
+        self.capacites = np.array([capacites[nom] for nom in self.noms], dtype=np.float64)
+        n = len(self.noms)
+        self.profil = np.zeros((n, CRENEAUX), dtype=np.float32)
+        self.poids = np.zeros((n, CRENEAUX), dtype=np.float32)
+        self.dernier_ts = np.full(n, np.nan)
+        self.dernier_taux = np.zeros(n)
+        self.residu = np.zeros(n)
+        self.tendance = np.zeros(n)  # variation du résidu par seconde
+
+    def _profil_a(self, lignes, position):
+        """Profil interpolé (et s'il est connu) pour des parkings à des positions de la semaine"""
+        bas, haut, f = _interpolation(position)
+        valeur = self.profil[lignes, bas] * (1 - f) + self.profil[lignes, haut] * f
+        connu = (self.poids[lignes, bas] > 0) | (self.poids[lignes, haut] > 0)
+        # Un seul créneau connu : sa valeur plutôt qu'un mélange avec zéro
+        valeur = np.where(self.poids[lignes, bas] == 0, self.profil[lignes, haut], valeur)
+        valeur = np.where(self.poids[lignes, haut] == 0, self.profil[lignes, bas], valeur)
+        return valeur, connu
+
+    def apprendre(self, noms, places, ts=None):
+        """Intègre un sweep : places libres observées (parkings ouverts seulement) à l'instant ts"""
+        ts = float(ts if ts is not None else time.time())
+        lignes = np.array([self.indices[nom] for nom in noms if nom in self.indices], dtype=np.int64)
+        if len(lignes) == 0:
+            return
+        places = np.array([p for nom, p in zip(noms, places) if nom in self.indices], dtype=np.float64)
+        taux = np.clip(places / self.capacites[lignes], 0.0, 1.0)
+        position = position_semaine(ts)
+
+        # Écart au profil avant mise à jour, et sa tendance depuis le relevé précédent
+        attendu, connu = self._profil_a(lignes, position)
+        residu = np.where(connu, taux - attendu, 0.0)
+        ecart = ts - self.dernier_ts[lignes]
+        valide = (ecart > 0) & (ecart <= ECART_MAX_TENDANCE)
+        vitesse = np.where(valide, (residu - self.residu[lignes]) / np.where(valide, ecart, 1.0), 0.0)
+        self.tendance[lignes] = np.where(
+            valide, LISSAGE_TENDANCE * vitesse + (1 - LISSAGE_TENDANCE) * self.tendance[lignes], 0.0
+        )
+        self.residu[lignes] = residu
+        self.dernier_ts[lignes] = ts
+        self.dernier_taux[lignes] = taux
+
+        creneau = int(position) % CRENEAUX
+        alpha = np.maximum(1.0 / (self.poids[lignes, creneau] + 1), ALPHA_MIN)
+        self.profil[lignes, creneau] += (alpha * (taux - self.profil[lignes, creneau])).astype(np.float32)
+        self.poids[lignes, creneau] += 1
+
+    def apprendre_sweep(self, data, ts=None):
+        """Intègre un sweep au format du cache (les parkings non ouverts sont ignorés)"""
+        ouverts = [nom for nom, releve in data.items() if releve['Statut'] == '✅ Ouvert']
+        self.apprendre(ouverts, [int(data[nom]['Places']) for nom in ouverts], ts)
+
+    def entrainer(self, historique, taille_lot=500_000):
+        """Reconstruit le modèle depuis l'historique brut (profils par moyenne, par lots)"""
+        somme = np.zeros((len(self.noms), CRENEAUX))
+        compte = np.zeros((len(self.noms), CRENEAUX))
+        for lot in historique.parcourir(statut='✅ Ouvert', taille_lot=taille_lot):
+            lot = [ligne for ligne in lot if ligne[0] in self.indices]
+            if not lot:
+                continue
+            parkings, ts, places, _ = zip(*lot)
+            lignes = np.array([self.indices[nom] for nom in parkings], dtype=np.int64)
+            taux = np.clip(np.asarray(places, dtype=np.float64) / self.capacites[lignes], 0.0, 1.0)
+            creneaux = position_semaine(ts).astype(np.int64) % CRENEAUX
+            np.add.at(somme, (lignes, creneaux), taux)
+            np.add.at(compte, (lignes, creneaux), 1)
+        self.profil = np.where(compte > 0, somme / np.maximum(compte, 1), 0.0).astype(np.float32)
+        self.poids = compte.astype(np.float32)
+
+    def prevoir(self, ts=None, horizons=HORIZONS):
+        """Places libres prévues : tableau (parkings, horizons), NaN pour un parking jamais observé"""
+        ts = float(ts if ts is not None else time.time())
+        delais = np.asarray(horizons, dtype=np.float64) * 60
+        lignes = np.arange(len(self.noms))[:, None]
+        positions = np.array([position_semaine(ts + d) for d in delais])[None, :]
+        profil, connu = self._profil_a(lignes, positions)
+
+        age = (ts + delais)[None, :] - self.dernier_ts[:, None]
+        amorti = np.exp(-np.maximum(age, 0.0) / AMORTISSEMENT)
+        ecart = (self.residu[:, None] + self.tendance[:, None] * age) * amorti
+        # Sans profil pour l'heure visée : dernier taux observé (persistance)
+        taux = np.where(connu, profil + ecart, self.dernier_taux[:, None])
+        places = np.rint(np.clip(taux, 0.0, 1.0) * self.capacites[:, None])
+        return np.where(np.isnan(self.dernier_ts)[:, None], np.nan, places)
+
+    def previsions(self, ts=None):
+        """Prévisions au format du snapshot : nom -> {'15': places, '30': ..., '60': ...}"""
+        places = self.prevoir(ts)
+        observes = ~np.isnan(places[:, 0])
+        return {
+            self.noms[i]: {str(h): int(p) for h, p in zip(HORIZONS, places[i])}
+            for i in np.flatnonzero(observes)
+        }
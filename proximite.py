@@ -0,0 +1,141 @@
+"""Index spatial des parkings : les k parkings ouverts les plus proches d'un point
+
+Grille régulière en degrés (cellules d'environ 500 m) : chaque cellule contient
+les parkings qui s'y trouvent. Une requête parcourt les anneaux de cellules autour
+du point, du plus proche au plus lointain, et s'arrête dès que les k meilleurs
+résultats sont plus proches que tout ce qui reste à visiter.
+
+La distance à pied est estimée à partir de la distance à vol d'oiseau
+(facteur de détour moyen en ville), faute de réseau piéton.
+"""
+import math
+import threading
+
+TAILLE_CELLULE = 0.005  # degrés (~550 m en latitude, ~400 m en longitude à Aix)
+RAYON_TERRE = 6371000
+METRES_PAR_DEGRE = math.pi * RAYON_TERRE / 180
+FACTEUR_DETOUR = 1.3
+VITESSE_MARCHE = 80  # mètres par minute (~4,8 km/h)
+DISTANCE_MAX = 5000  # au-delà (à pied), un parking n'est plus proposé
+
+
+def distance(lat1, lon1, lat2, lon2):
+    """Distance à vol d'oiseau en mètres (haversine)"""
+    phi1, phi2 = math.radians(lat1), math.radians(lat2)
+    dphi = phi2 - phi1
+    dlambda = math.radians(lon2 - lon1)
+    a = math.sin(dphi / 2) ** 2 + math.cos(phi1) * math.cos(phi2) * math.sin(dlambda / 2) ** 2
+    return 2 * RAYON_TERRE * math.asin(math.sqrt(a))
+
+
+def disponible(releve, min_places):
+    """Parking ouvert avec au moins `min_places` places libres, d'après un relevé non suspect"""
+    return (releve is not None and releve['Statut'] == '✅ Ouvert' and releve['Places'] >= min_places
+            and not releve.get('Anomalies'))
+
+
+class IndexSpatial:
+    """Grille des parkings du registre, mise à jour par différence quand il change"""
+
+    def __init__(self, taille=TAILLE_CELLULE):
+        self.taille = taille
+        self.cellules = {}   # (i, j) -> {nom: (lat, lon)}
+        self.positions = {}  # nom -> (lat, lon, cellule)
+        self.version = None
+        self._verrou = threading.Lock()
+
+    def _cellule(self, lat, lon):
+        return math.floor(lat / self.taille), math.floor(lon / self.taille)
+
+    def _inserer(self, nom, lat, lon):
+        cellule = self._cellule(lat, lon)
+        self.cellules.setdefault(cellule, {})[nom] = (lat, lon)
+        self.positions[nom] = (lat, lon, cellule)
+
+    def _retirer(self, nom):
+        _, _, cellule = self.positions.pop(nom)
+        contenu = self.cellules[cellule]
+        del contenu[nom]
+        if not contenu:
+            del self.cellules[cellule]
+
+    def synchroniser(self, parkings, version=None):
+        """Aligne l'index sur le registre (nom -> (..., lat, lon)) ; nombre de parkings modifiés
+
+        Si `version` est celle du dernier appel, rien n'est fait. Sinon seuls les
+        parkings ajoutés, retirés ou déplacés sont mis à jour dans la grille.
+        """
+        with self._verrou:
+            if version is not None and version == self.version:
+                return 0
+            modifies = 0
+            for nom in [nom for nom in self.positions if nom not in parkings]:
+                self._retirer(nom)
+                modifies += 1
+            for nom, p in parkings.items():
+                lat, lon = p[3], p[4]
+                position = self.positions.get(nom)
+                if position is not None and position[:2] == (lat, lon):
+                    continue
+                if position is not None:
+                    self._retirer(nom)
+                self._inserer(nom, lat, lon)
+                modifies += 1
+            self.version = version
+            return modifies
+
+    def _anneau(self, i, j, rayon):
+        """Cellules à distance de Tchebychev `rayon` de (i, j)"""
+        if rayon == 0:
+            yield i, j
+            return
+        for dj in range(-rayon, rayon + 1):
+            yield i - rayon, j + dj
+            yield i + rayon, j + dj
+        for di in range(-rayon + 1, rayon):
+            yield i + di, j - rayon
+            yield i + di, j + rayon
+
+    def proches(self, lat, lon, data, k=3, min_places=1, distance_max=DISTANCE_MAX):
+        """Les k parkings disponibles les plus proches, triés par distance à pied
+
+        `data` est le dictionnaire des relevés du snapshot, ou son modèle en
+        colonnes (modele.SnapshotParkings, lu par index sans construire de dict).
+        Retourne une liste de (nom, distance à pied en mètres, minutes de marche).
+        """
+        if k <= 0:
+            return []
+        if hasattr(data, 'disponible'):
+            est_disponible = data.disponible
+        else:
+            def est_disponible(nom, min_places):
+                return disponible(data.get(nom), min_places)
+        i, j = self._cellule(lat, lon)
+        # Côté d'une cellule en mètres (le plus petit des deux, pour une borne inférieure sûre)
+        cote = self.taille * METRES_PAR_DEGRE * min(1.0, math.cos(math.radians(abs(lat) + self.taille)))
+        vol_max = distance_max / FACTEUR_DETOUR
+        trouves = []
+        with self._verrou:
+            rayon = 0
+            while True:
+                for cellule in self._anneau(i, j, rayon):
+                    for nom, (plat, plon) in self.cellules.get(cellule, {}).items():
+                        if est_disponible(nom, min_places):
+                            d = distance(lat, lon, plat, plon)
+                            if d <= vol_max:
+                                trouves.append((d, nom))
+                # Tout parking hors des anneaux déjà vus est à plus de rayon * cote mètres
+                borne = rayon * cote
+                if borne > vol_max:
+                    break
+                if len(trouves) >= k:
+                    trouves.sort()
+                    del trouves[k:]
+                    if trouves[-1][0] <= borne:
+                        break
+                rayon += 1
+        trouves.sort()
+        return [
+            (nom, round(d * FACTEUR_DETOUR), round(d * FACTEUR_DETOUR / VITESSE_MARCHE, 1))
+            for d, nom in trouves[:k]
+        ]
@@ -0,0 +1,105 @@
+"""Registre des parkings, chargé depuis un fichier de configuration
+
+Deux formats sont acceptés :
+- JSON (parkings.json) : {"villes": {ville: {"centre", "commune_amp", "parkings": {nom: {...}}}}}
+- CSV, une ligne par parking : ville,nom,url,page_id,capacite,latitude,longitude
+
+PARKING_REGISTRE    chemin du fichier (parkings.json à la racine du projet par défaut)
+"""
+import csv
+import json
+import os
+
+REGISTRE_FILE = os.environ.get(
+    'PARKING_REGISTRE',
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), 'parkings.json')
+)
+
+
+class Registre:
+    """Parkings de toutes les villes, avec un index par ville
+
+    `parkings` associe chaque nom à (base_url, page_id, capacite, lat, lon),
+    le format utilisé par le scraper ; les noms sont uniques toutes villes confondues.
+    """
+
+    def __init__(self, villes, chemin=None):
+        self.chemin = chemin
+        self._mtime = os.stat(chemin).st_mtime_ns if chemin else None
+        # Incrémentée à chaque rechargement (les index dérivés s'y synchronisent)
+        self.version = 0
+        self.villes = {}
+        self.parkings = {}
+        self.ville_de = {}
+        for ville, config in villes.items():
+            noms = []
+            for nom, p in config.get('parkings', {}).items():
+                if nom in self.parkings:
+                    raise ValueError(f"Parking en double dans le registre : {nom}")
+                self.parkings[nom] = (p['url'], int(p['page_id']), int(p['capacite']),
+                                      float(p['latitude']), float(p['longitude']))
+                self.ville_de[nom] = ville
+                noms.append(nom)
+            self.villes[ville] = {
+                'centre': tuple(config['centre']) if config.get('centre') else _centre(self.parkings, noms),
+                'commune_amp': config.get('commune_amp'),
+                'noms': noms,
+            }
+
+    def actualiser(self):
+        """Relit le fichier s'il a été modifié ; True si le registre a changé
+
+        Les dictionnaires sont mis à jour en place : les modules qui en gardent
+        une référence (ex. scraper.parkings) voient le nouveau registre.
+        """
+        if self.chemin is None:
+            return False
+        try:
+            mtime = os.stat(self.chemin).st_mtime_ns
+        except OSError:
+            return False
+        if mtime == self._mtime:
+            return False
+        try:
+            nouveau = charger_registre(self.chemin)
+        except (OSError, ValueError, KeyError) as e:
+            print(f"Registre invalide, ancien registre conservé: {e}")
+            return False
+        self._mtime = mtime
+        for attribut in ('villes', 'parkings', 'ville_de'):
+            courant = getattr(self, attribut)
+            courant.clear()
+            courant.update(getattr(nouveau, attribut))
+        self.version += 1
+        return True
+
+    def noms(self, ville=None):
+        """Noms des parkings d'une ville (tous par défaut), dans l'ordre du registre"""
+        return list(self.parkings) if ville is None else self.villes[ville]['noms']
+
+
+def _centre(parkings, noms):
+    """Centre d'une ville sans centre configuré : moyenne des coordonnées de ses parkings"""
+    if not noms:
+        return (0.0, 0.0)
+    return (sum(parkings[n][3] for n in noms) / len(noms), sum(parkings[n][4] for n in noms) / len(noms))
+
+
+def _lire_csv(chemin):
+    villes = {}
+    with open(chemin, newline='', encoding='utf-8') as f:
+        for ligne in csv.DictReader(f):
+            ville = villes.setdefault(ligne['ville'], {'parkings': {}})
+            ville['parkings'][ligne['nom']] = ligne
+    return villes
+
+
+def charger_registre(chemin=REGISTRE_FILE):
+    """Charge le registre depuis un fichier JSON ou CSV"""
+    if chemin.endswith('.csv'):
+        return Registre(_lire_csv(chemin), chemin)
+    with open(chemin, 'r', encoding='utf-8') as f:
+        return Registre(json.load(f)['villes'], chemin)
+
+
+registre = charger_registre()
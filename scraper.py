@@ -0,0 +1,305 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from urllib.parse import urlparse
+from zoneinfo import ZoneInfo
+
+import requests
+from urllib3.exceptions import ReadTimeoutError
+
+import disjoncteur
+import metriques
+from extraction import extraire_flux
+from enregistrements import FIXTURES_MODE, MagasinReponses
+from registre import registre
+from sessions import PoolSessions
+
+# Registre chargé depuis parkings.json (voir registre.py) : nom -> (base_url, page_id, capacite, lat, lon)
+parkings = registre.parkings
+FUSEAU = ZoneInfo("Europe/Paris")
+
+headers = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
+}
+
+# Politesse envers les serveurs Semepa : au plus 8 requêtes simultanées par hôte,
+# et au moins 20 ms entre deux départs de requête sur le même hôte
+MAX_REQUETES_PAR_HOTE = 8
+INTERVALLE_MIN_PAR_HOTE = 0.02
+TIMEOUT = 5
+# Durée maximale consacrée à un parking dans un sweep, relances comprises
+DELAI_MAX_PARKING = 8
+MAX_WORKERS = 64
+TAILLE_MORCEAU = 8 * 1024
+
+
+class LimiteHote:
+    """Limite la concurrence et le rythme des requêtes vers un même hôte"""
+
+    def __init__(self, max_simultanees=MAX_REQUETES_PAR_HOTE, intervalle_min=INTERVALLE_MIN_PAR_HOTE):
+        self.semaphore = threading.BoundedSemaphore(max_simultanees)
+        self.intervalle_min = intervalle_min
+        self.verrou = threading.Lock()
+        self.prochain_depart = 0.0
+
+    def __enter__(self):
+        self.semaphore.acquire()
+        # Réserver un créneau de départ sans bloquer les autres threads pendant l'attente
+        with self.verrou:
+            maintenant = time.monotonic()
+            depart = max(maintenant, self.prochain_depart)
+            self.prochain_depart = depart + self.intervalle_min
+        attente = depart - maintenant
+        if attente > 0:
+            time.sleep(attente)
+        return self
+
+    def __exit__(self, *exc):
+        self.semaphore.release()
+
+
+_limites = {}
+_limites_verrou = threading.Lock()
+
+
+def limite_pour(base_url):
+    """Retourne le limiteur partagé de l'hôte de base_url"""
+    hote = urlparse(base_url).netloc
+    with _limites_verrou:
+        if hote not in _limites:
+            _limites[hote] = LimiteHote()
+        return _limites[hote]
+
+
+# Sessions keep-alive partagées entre les sweeps du thread de fond et les rafraîchissements manuels
+sessions = PoolSessions(
+    headers=headers,
+    max_par_hote=MAX_REQUETES_PAR_HOTE,
+    magasin=MagasinReponses() if FIXTURES_MODE else None,
+    mode=FIXTURES_MODE
+)
+
+# Dernier résultat extrait de chaque page, réutilisé quand le serveur répond 304
+_dernieres_pages = {}
+
+
+# Dernière heure formatée (epoch, texte) : un sweep relève des centaines de parkings dans la même seconde
+_derniere_heure = (None, None)
+
+
+def heure_str(ts):
+    """Heure (Europe/Paris) d'une date epoch, au format affiché dans le dashboard"""
+    global _derniere_heure
+    derniere_ts, texte = _derniere_heure
+    if ts != derniere_ts:
+        texte = datetime.fromtimestamp(ts, FUSEAU).strftime("%H:%M:%S")
+        _derniere_heure = (ts, texte)
+    return texte
+
+
+def maintenant_str():
+    """Heure courante (Europe/Paris) au format affiché dans le dashboard"""
+    return heure_str(int(time.time()))
+
+
+def construire_releve(places, capacite, affichage, statut, lat, lon, ts=None):
+    """Construit l'entrée d'un parking au format du cache (Ts : date du relevé, epoch, maintenant par défaut)"""
+    ts = int(ts if ts is not None else time.time())
+    return {
+        'Places': places,
+        'Capacite': capacite,
+        'Affichage': affichage,
+        'Statut': statut,
+        'Timestamp': heure_str(ts),
+        'Ts': ts,
+        'latitude': lat,
+        'longitude': lon
+    }
+
+
+def interpreter_page(valeur, capacite):
+    """Convertit le contenu du bloc nbPlaces en (places, affichage, statut)"""
+    if isinstance(valeur, int):
+        places_libres = valeur
+        affichage = "COMPLET" if places_libres <= 2 else f"{places_libres} / {capacite}"
+        return places_libres, affichage, '✅ Ouvert'
+    elif valeur:
+        # Si le texte est "COMPLET", on le traite comme un parking ouvert
+        if valeur.upper() == "COMPLET":
+            return 0, 'COMPLET', '✅ Ouvert'
+        # Sinon c'est un vrai message d'erreur/fermeture
+        return 0, valeur, f'⚠️ {valeur}'
+    else:
+        return 0, 'N/A', '❓ Pas de données'
+
+
+class LectureMesuree:
+    """Itère sur les morceaux d'une réponse en comptant les octets et le temps d'attente réseau"""
+
+    def __init__(self, morceaux):
+        self.morceaux = morceaux
+        self.taille = 0
+        self.attente = 0.0
+
+    def __iter__(self):
+        morceaux = iter(self.morceaux)
+        while True:
+            debut = time.perf_counter()
+            morceau = next(morceaux, None)
+            self.attente += time.perf_counter() - debut
+            if morceau is None:
+                return
+            self.taille += len(morceau)
+            yield morceau
+
+
+def classer(valeur):
+    """Classe de résultat (métriques) d'une valeur extraite"""
+    if isinstance(valeur, int):
+        return 'nombre'
+    if valeur:
+        return 'complet' if valeur.upper() == "COMPLET" else 'statut'
+    return 'sans_donnees'
+
+
+def classer_erreur(erreur):
+    """Classe de résultat (métriques) d'une requête en échec"""
+    # Délai dépassé pendant la lecture du corps : requests lève ConnectionError(ReadTimeoutError)
+    if isinstance(erreur, requests.Timeout) or any(isinstance(a, ReadTimeoutError) for a in erreur.args):
+        return 'timeout'
+    if isinstance(erreur, requests.HTTPError):
+        return 'erreur_http'
+    return 'erreur'
+
+
+def relancable(erreur):
+    """True si l'échec est probablement passager (réseau, délai, erreur serveur 5xx / 429)"""
+    if isinstance(erreur, requests.HTTPError):
+        statut = erreur.response.status_code if erreur.response is not None else 0
+        return statut >= 500 or statut == 429
+    return isinstance(erreur, (requests.ConnectionError, requests.Timeout, requests.exceptions.ChunkedEncodingError))
+
+
+def _requete_parking(nom, base_url, params, capacite, timeout):
+    """Une requête vers la page d'un parking : (places, affichage, statut) ; lève en cas d'échec"""
+    hote = urlparse(base_url).netloc
+    mesure = None
+    try:
+        with limite_pour(base_url):
+            mesure = metriques.commencer_mesure()
+            response = sessions.get(base_url, params=params, timeout=timeout, stream=True)
+        # En stream, get() rend la main dès les en-têtes reçus
+        ttfb = time.perf_counter() - mesure.debut
+        lecture = None
+
+        try:
+            if response.status_code >= 400:
+                raise requests.HTTPError(f"HTTP {response.status_code}", response=response)
+            if response.status_code == 304:
+                # Page inchangée depuis le dernier sweep : pas besoin de la re-parser
+                resultat = _dernieres_pages.get(nom)
+                classe = 'non_modifie'
+            else:
+                # Lecture du corps brut interrompue dès que le bloc nbPlaces est trouvé
+                lecture = LectureMesuree(response.iter_content(TAILLE_MORCEAU))
+                debut = time.perf_counter()
+                valeur = extraire_flux(lecture)
+                metriques.analyse.observer(time.perf_counter() - debut - lecture.attente)
+                resultat = interpreter_page(valeur, capacite)
+                classe = classer(valeur)
+                _dernieres_pages[nom] = resultat
+        finally:
+            sessions.liberer(response)
+    except Exception as e:
+        if mesure is not None:
+            metriques.terminer_mesure(hote, nom, classer_erreur(e))
+        raise
+
+    metriques.terminer_mesure(hote, nom, classe, ttfb, lecture.taille if lecture else 0)
+    if resultat is None:
+        # Validateurs d'une page jamais lue par ce processus : requête complète
+        sessions.oublier(base_url, params)
+        return _requete_parking(nom, base_url, params, capacite, timeout)
+    return resultat
+
+
+def scraper_parking(nom):
+    """Scrape un seul parking et retourne son entrée pour le cache
+
+    Les échecs passagers sont relancés (attente aléatoire, budget de relances de
+    l'hôte, au plus DELAI_MAX_PARKING secondes en tout) ; un hôte ou un parking
+    dont le disjoncteur est ouvert n'est pas interrogé. Le disjoncteur du parking
+    compte chaque tentative, celui de l'hôte le résultat final de chaque parking.
+    """
+    base_url, page_id, capacite, lat, lon = parkings[nom]
+    hote = urlparse(base_url).netloc
+    params = {"page_id": page_id}
+    if not disjoncteur.hotes[hote].autorise():
+        metriques.resultats.inc(hote=hote, resultat='disjoncte')
+        return construire_releve(0, capacite, 'Erreur', '❌ Erreur', lat, lon)
+
+    budget = disjoncteur.budgets[hote]
+    limite = time.monotonic() + DELAI_MAX_PARKING
+    resultat, tentative = None, 0
+    while True:
+        if not disjoncteur.parkings[nom].autorise():
+            metriques.resultats.inc(hote=hote, resultat='disjoncte')
+            break
+        tentative += 1
+        budget.deposer()
+        try:
+            resultat = _requete_parking(nom, base_url, params, capacite, min(TIMEOUT, limite - time.monotonic()))
+        except Exception as e:
+            disjoncteur.parkings[nom].echec()
+            if not relancable(e) or tentative >= disjoncteur.TENTATIVES_MAX:
+                break
+            attente = disjoncteur.attente_relance(tentative)
+            # Pas de relance qui ne pourrait aboutir avant la limite, ni au-delà du budget de l'hôte
+            if time.monotonic() + attente >= limite or not budget.retirer():
+                break
+            metriques.relances.inc(hote=hote)
+            time.sleep(attente)
+            continue
+        disjoncteur.parkings[nom].succes()
+        break
+
+    if resultat is not None:
+        disjoncteur.hotes[hote].succes()
+        places, affichage, statut = resultat
+        return construire_releve(places, capacite, affichage, statut, lat, lon)
+    if tentative:
+        disjoncteur.hotes[hote].echec()
+    else:
+        # Aucune requête envoyée (disjoncteur du parking ouvert) : rien appris sur l'hôte
+        disjoncteur.hotes[hote].abandon()
+    return construire_releve(0, capacite, 'Erreur', '❌ Erreur', lat, lon)
+
+
+def repartir_par_hote(noms):
+    """Découpe les parkings en shards, un par hôte, puis les entrelace
+
+    Les tâches sont soumises à tour de rôle pour chaque hôte : les workers ne
+    restent pas bloqués sur la limite d'un seul hôte pendant que les autres attendent.
+    """
+    shards = {}
+    for nom in noms:
+        shards.setdefault(urlparse(parkings[nom][0]).netloc, []).append(nom)
+    ordre = []
+    for i in range(max((len(s) for s in shards.values()), default=0)):
+        ordre.extend(shard[i] for shard in shards.values() if i < len(shard))
+    return ordre, len(shards)
+
+
+def scraper_parkings(noms=None):
+    """Scrape les parkings (tous par défaut) en parallèle, répartis par hôte"""
+    noms = list(parkings) if noms is None else list(noms)
+    if not noms:
+        return {}
+    ordre, nb_hotes = repartir_par_hote(noms)
+    # Assez de workers pour occuper chaque hôte jusqu'à sa limite, dans la limite de MAX_WORKERS
+    workers = min(MAX_WORKERS, nb_hotes * MAX_REQUETES_PAR_HOTE, len(noms))
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        resultats = dict(zip(ordre, executor.map(scraper_parking, ordre)))
+    # Conserver l'ordre demandé
+    return {nom: resultats[nom] for nom in noms}
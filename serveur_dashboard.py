@@ -0,0 +1,148 @@
+"""Service multi-processus du dashboard, préchauffé avant d'accepter du trafic
+
+    python serveur_dashboard.py --processus 4 --port 8501
+
+1. collecteur : lancé (python collector.py, PARKING_PRECALCUL_CARTES=1) si aucun ne
+   tient collector.lock ; c'est le seul processus qui scrape et rafraîchit le snapshot
+   partagé et les cartes (leader), les processus du dashboard ne font que les lire ;
+2. préchauffage partagé : on attend qu'un snapshot soit publié dans le segment (le
+   collecteur republie au démarrage le dernier snapshot sur disque, sinon fait son
+   premier sweep), puis la carte de chaque ville est écrite dans le cache partagé ;
+3. processus Streamlit : `--processus` serveurs sur des ports consécutifs
+   (PARKING_COLLECTEUR_EXTERNE=1) ; chacun importe ses modules et lit le snapshot
+   avant d'ouvrir son port (prechauffer_processus).
+
+Le service n'est annoncé prêt que lorsque tous les ports répondent. Devant les
+processus, un répartiteur avec affinité de session (Streamlit utilise un WebSocket) :
+
+    upstream dashboard { ip_hash; server 127.0.0.1:8501; server 127.0.0.1:8502; ... }
+"""
+import argparse
+import os
+import signal
+import subprocess
+import sys
+import time
+import urllib.request
+
+RACINE = os.path.dirname(os.path.abspath(__file__))
+SCRIPT = os.path.join(RACINE, 'dashboard_parking.py')
+DELAI_PRECHAUFFAGE = 120
+
+
+def lancer_collecteur():
+    """Processus du collecteur, ou None si un collecteur tourne déjà"""
+    from collector import acquerir_verrou
+
+    verrou = acquerir_verrou()
+    if verrou is None:
+        return None
+    verrou.close()
+    return subprocess.Popen([sys.executable, os.path.join(RACINE, 'collector.py')],
+                            env={**os.environ, 'PARKING_PRECALCUL_CARTES': '1'})
+
+
+def prechauffer(delai=DELAI_PRECHAUFFAGE):
+    """Attend un snapshot publié et écrit la carte de chaque ville dans le cache partagé"""
+    from cache_partage import CachePartage
+    from modele import metadonnees
+    from registre import registre
+    from snapshot_partage import SegmentLecteur
+    from vues import precalculer_cartes
+
+    lecteur = SegmentLecteur()
+    limite = time.monotonic() + delai
+    while lecteur.sequence_courante() == 0:
+        if time.monotonic() > limite:
+            raise TimeoutError("Aucun snapshot publié par le collecteur")
+        time.sleep(0.2)
+    _, snapshot = lecteur.lire_snapshot()
+    precalculer_cartes(CachePartage(), snapshot, metadonnees(registre), registre.villes)
+    return snapshot
+
+
+def prechauffer_processus():
+    """Ce que paierait la première session d'un processus : imports, registre, snapshot, vues"""
+    # Modules importés par dashboard_parking.py (le script lui-même ne s'exécute que par session)
+    import folium  # noqa: F401
+    import streamlit.components.v1  # noqa: F401
+
+    import agregats, cache, cache_partage, chronologie, collector, historique, proximite  # noqa: F401
+    from registre import registre
+    from snapshot_partage import SegmentLecteur
+    from vues import preparer_vue
+
+    _, vue = SegmentLecteur().lire_vue()
+    if vue is not None:
+        for ville in registre.villes:
+            preparer_vue(vue.modele, registre.noms(ville))
+
+
+def servir(port):
+    """Processus Streamlit préchauffé sur `port`"""
+    os.environ['PARKING_COLLECTEUR_EXTERNE'] = '1'
+    prechauffer_processus()
+    from streamlit.web import bootstrap
+
+    options = {'server_port': port, 'server_headless': True}
+    bootstrap.load_config_options(flag_options=options)
+    bootstrap.run(SCRIPT, False, [], options)
+
+
+def attendre_port(port, delai=DELAI_PRECHAUFFAGE):
+    """Attend que le serveur Streamlit du port réponde à son contrôle de santé"""
+    limite = time.monotonic() + delai
+    while time.monotonic() < limite:
+        try:
+            with urllib.request.urlopen(f'http://127.0.0.1:{port}/_stcore/health', timeout=1) as reponse:
+                if reponse.status == 200:
+                    return True
+        except OSError:
+            time.sleep(0.2)
+    return False
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--processus', type=int, default=os.cpu_count() or 1)
+    parser.add_argument('--port', type=int, default=8501, help="port du premier processus")
+    parser.add_argument('--servir', type=int, metavar='PORT', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.servir is not None:
+        servir(args.servir)
+        return 0
+
+    # Arrêt (SIGTERM) : les processus enfants sont arrêtés avec le service
+    signal.signal(signal.SIGTERM, lambda *_: sys.exit(0))
+    enfants = []
+    collecteur = lancer_collecteur()
+    if collecteur is not None:
+        enfants.append(collecteur)
+        print("🚀 Collecteur lancé")
+    try:
+        debut = time.monotonic()
+        snapshot = prechauffer()
+        print(f"🔥 Snapshot {snapshot['sequence']} et cartes prêts en {time.monotonic() - debut:.1f} s")
+
+        ports = range(args.port, args.port + args.processus)
+        for port in ports:
+            enfants.append(subprocess.Popen([sys.executable, os.path.abspath(__file__), '--servir', str(port)]))
+        for port in ports:
+            if not attendre_port(port):
+                raise TimeoutError(f"Le processus du port {port} ne répond pas")
+        print(f"✅ {args.processus} processus prêts : ports {ports.start} à {ports.stop - 1}")
+        while all(enfant.poll() is None for enfant in enfants):
+            time.sleep(1)
+        print("Un processus s'est arrêté, arrêt du service")
+        return 1
+    except KeyboardInterrupt:
+        return 0
+    finally:
+        for enfant in enfants:
+            enfant.terminate()
+        for enfant in enfants:
+            enfant.wait()
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
@@ -0,0 +1,167 @@
+import socket
+import threading
+import time
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.connection import HTTPConnection, HTTPSConnection
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+from urllib3.exceptions import NameResolutionError, NewConnectionError
+
+from metriques import mesure_courante
+
+
+class _MesureConnexion:
+    """Mesure la résolution DNS et la connexion TCP des nouvelles connexions (voir metriques.py)"""
+
+    def _new_conn(self):
+        mesure = mesure_courante()
+        if mesure is None:
+            return super()._new_conn()
+        debut = time.perf_counter()
+        hote = self._dns_host
+        try:
+            adresse = socket.getaddrinfo(hote, self.port, type=socket.SOCK_STREAM)[0][4][0]
+        except socket.gaierror as e:
+            raise NameResolutionError(self.host, self, e) from e
+        resolu = time.perf_counter()
+        mesure.dns += resolu - debut
+        # Connexion à l'adresse résolue (le nom reste utilisé pour TLS / SNI)
+        self._dns_host = adresse
+        try:
+            sock = super()._new_conn()
+        except NewConnectionError:
+            # Première adresse injoignable : laisser urllib3 essayer toutes les adresses
+            self._dns_host = hote
+            sock = super()._new_conn()
+        finally:
+            self._dns_host = hote
+        mesure.connexion += time.perf_counter() - resolu
+        return sock
+
+
+class _ConnexionMesuree(_MesureConnexion, HTTPConnection):
+    pass
+
+
+class _ConnexionHTTPSMesuree(_MesureConnexion, HTTPSConnection):
+
+    def connect(self):
+        mesure = mesure_courante()
+        if mesure is None:
+            return super().connect()
+        avant = mesure.dns + mesure.connexion
+        debut = time.perf_counter()
+        super().connect()
+        # Le reste de connect() après _new_conn() est la poignée de main TLS
+        mesure.tls += time.perf_counter() - debut - (mesure.dns + mesure.connexion - avant)
+
+
+class _PoolMesure(HTTPConnectionPool):
+    ConnectionCls = _ConnexionMesuree
+
+
+class _PoolHTTPSMesure(HTTPSConnectionPool):
+    ConnectionCls = _ConnexionHTTPSMesuree
+
+
+class AdaptateurMesure(HTTPAdapter):
+    """HTTPAdapter dont les connexions renseignent la mesure de la requête en cours"""
+
+    def init_poolmanager(self, *args, **kwargs):
+        super().init_poolmanager(*args, **kwargs)
+        self.poolmanager.pool_classes_by_scheme = {'http': _PoolMesure, 'https': _PoolHTTPSMesure}
+
+
+class PoolSessions:
+    """Sessions HTTP keep-alive partagées, une par base_url
+
+    Chaque session garde ses connexions TCP/TLS ouvertes d'un sweep à l'autre,
+    et les validateurs ETag / Last-Modified de chaque page sont conservés pour
+    envoyer des requêtes conditionnelles (réponse 304 si la page n'a pas changé).
+    """
+
+    def __init__(self, headers=None, max_par_hote=8, magasin=None, mode=''):
+        self.headers = dict(headers or {})
+        self.max_par_hote = max_par_hote
+        # Mode fixtures (voir enregistrements.py) : 'enregistrer', 'rejouer' ou ''
+        self.magasin = magasin
+        self.mode = mode if magasin is not None else ''
+        self._sessions = {}
+        self._validateurs = {}
+        self._verrou = threading.Lock()
+
+    def session(self, base_url):
+        """Retourne (en la créant si besoin) la session associée à base_url"""
+        with self._verrou:
+            session = self._sessions.get(base_url)
+            if session is None:
+                session = requests.Session()
+                session.headers.update(self.headers)
+                adapter = AdaptateurMesure(pool_connections=1, pool_maxsize=self.max_par_hote)
+                session.mount('https://', adapter)
+                session.mount('http://', adapter)
+                self._sessions[base_url] = session
+            return session
+
+    def get(self, base_url, params=None, timeout=5, **kwargs):
+        """GET conditionnel : response.status_code == 304 si la page n'a pas changé"""
+        if self.mode == 'rejouer':
+            return self.magasin.rejouer(base_url, params)
+        if self.mode == 'enregistrer':
+            kwargs.pop('stream', None)
+            response = self.session(base_url).get(base_url, params=params, timeout=timeout, **kwargs)
+            self.magasin.enregistrer(base_url, params, response)
+            return response
+
+        cle = (base_url, tuple(sorted((params or {}).items())))
+        en_tetes = {}
+        with self._verrou:
+            etag, last_modified = self._validateurs.get(cle, (None, None))
+        if etag:
+            en_tetes['If-None-Match'] = etag
+        if last_modified:
+            en_tetes['If-Modified-Since'] = last_modified
+
+        response = self.session(base_url).get(base_url, params=params, headers=en_tetes, timeout=timeout, **kwargs)
+
+        if response.status_code == 200:
+            validateurs = (response.headers.get('ETag'), response.headers.get('Last-Modified'))
+            with self._verrou:
+                if any(validateurs):
+                    self._validateurs[cle] = validateurs
+                else:
+                    self._validateurs.pop(cle, None)
+        return response
+
+    def liberer(self, response, max_vidange=64 * 1024):
+        """Rend la connexion d'une réponse lue en stream au pool
+
+        Si le reste du corps est court, il est vidé pour que la connexion
+        keep-alive soit réutilisée ; sinon la connexion est fermée.
+        """
+        try:
+            restant = max_vidange
+            while restant > 0:
+                morceau = response.raw.read(min(restant, 16 * 1024), decode_content=False)
+                if not morceau:
+                    break
+                restant -= len(morceau)
+        except Exception:
+            pass
+        finally:
+            response.close()
+
+    def oublier(self, base_url, params=None):
+        """Supprime les validateurs d'une page (la prochaine requête sera complète)"""
+        cle = (base_url, tuple(sorted((params or {}).items())))
+        with self._verrou:
+            self._validateurs.pop(cle, None)
+
+    def fermer(self):
+        """Ferme toutes les sessions et leurs connexions"""
+        with self._verrou:
+            for session in self._sessions.values():
+                session.close()
+            self._sessions.clear()
+            self._validateurs.clear()
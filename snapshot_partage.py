@@ -0,0 +1,157 @@
+import mmap
+import os
+import struct
+import threading
+import time
+
+import codec_snapshot
+
+# Segment partagé : /dev/shm (mémoire) quand il existe, sinon un fichier local
+SNAPSHOT_SHM = os.environ.get(
+    'PARKING_SNAPSHOT_SHM',
+    '/dev/shm/parkings_snapshot' if os.path.isdir('/dev/shm') else 'parkings_snapshot.shm'
+)
+
+# En-tête : magic (4 octets), longueur du contenu (uint32), séquence (uint64)
+MAGIC = b'PKS1'
+_ENTETE = struct.Struct('<4sIQ')
+DEBUT_CONTENU = 64
+TAILLE_INITIALE = 1 << 20
+
+
+class SegmentEcrivain:
+    """Publie le dernier snapshot dans un fichier mappé en mémoire (un seul écrivain)
+
+    Protocole seqlock : la séquence est impaire pendant l'écriture et paire
+    une fois le contenu complet, ce qui permet aux lecteurs de détecter une
+    lecture concurrente sans aucun verrou.
+    """
+
+    def __init__(self, chemin=SNAPSHOT_SHM):
+        self.chemin = chemin
+        self._fd = os.open(chemin, os.O_RDWR | os.O_CREAT, 0o644)
+        if os.fstat(self._fd).st_size < TAILLE_INITIALE:
+            os.ftruncate(self._fd, TAILLE_INITIALE)
+        self._map = mmap.mmap(self._fd, os.fstat(self._fd).st_size)
+        magic, _, sequence = _ENTETE.unpack_from(self._map, 0)
+        self.sequence = sequence + (sequence & 1) if magic == MAGIC else 0
+
+    def _agrandir(self, taille):
+        """Agrandit le segment ; les lecteurs remappent en voyant la nouvelle longueur"""
+        nouvelle_taille = len(self._map)
+        while nouvelle_taille < taille:
+            nouvelle_taille *= 2
+        self._map.close()
+        os.ftruncate(self._fd, nouvelle_taille)
+        self._map = mmap.mmap(self._fd, nouvelle_taille)
+
+    def publier(self, contenu):
+        """Publie un contenu (bytes) et retourne son numéro de séquence"""
+        if DEBUT_CONTENU + len(contenu) > len(self._map):
+            self._agrandir(DEBUT_CONTENU + len(contenu))
+        longueur = _ENTETE.unpack_from(self._map, 0)[1]
+        _ENTETE.pack_into(self._map, 0, MAGIC, longueur, self.sequence + 1)
+        self._map[DEBUT_CONTENU:DEBUT_CONTENU + len(contenu)] = contenu
+        self.sequence += 2
+        _ENTETE.pack_into(self._map, 0, MAGIC, len(contenu), self.sequence)
+        return self.sequence
+
+    def publier_snapshot(self, snapshot, codec=None, meta=None):
+        """Publie un snapshot encodé par son codec (binaire par défaut, voir codec_snapshot)"""
+        codec = codec_snapshot.CODEC if codec is None else codec
+        return self.publier(codec.encoder(snapshot, meta))
+
+    def fermer(self):
+        """Ferme le segment (le fichier reste en place pour les lecteurs)"""
+        self._map.close()
+        os.close(self._fd)
+
+
+class SegmentLecteur:
+    """Lit le snapshot publié par le collecteur, sans verrou
+
+    La séquence est lue avant de copier le contenu : si elle n'a pas changé
+    depuis la dernière lecture, le contenu précédent est réutilisé tel quel.
+    """
+
+    def __init__(self, chemin=SNAPSHOT_SHM):
+        self.chemin = chemin
+        self._fd = None
+        self._map = None
+        self.sequence = 0
+        self._dernier = None
+        self._sequence_objet = None
+        self._objet = None
+        # Protège le remappage quand le lecteur est partagé entre threads
+        self._verrou = threading.Lock()
+
+    def _ouvrir(self):
+        if self._map is not None:
+            self._map.close()
+            os.close(self._fd)
+            self._map = None
+        try:
+            self._fd = os.open(self.chemin, os.O_RDONLY)
+        except FileNotFoundError:
+            return False
+        taille = os.fstat(self._fd).st_size
+        if taille < DEBUT_CONTENU:
+            os.close(self._fd)
+            return False
+        self._map = mmap.mmap(self._fd, taille, access=mmap.ACCESS_READ)
+        return True
+
+    def sequence_courante(self):
+        """Numéro de séquence publié (0 si aucun snapshot), lecture de l'en-tête seulement"""
+        with self._verrou:
+            if self._map is None and not self._ouvrir():
+                return 0
+            magic, _, sequence = _ENTETE.unpack_from(self._map, 0)
+            return sequence if magic == MAGIC else 0
+
+    def lire(self, essais=100):
+        """Retourne (sequence, contenu bytes) ou (0, None) si rien n'a été publié"""
+        with self._verrou:
+            return self._lire(essais)
+
+    def _lire(self, essais):
+        for _ in range(essais):
+            if self._map is None and not self._ouvrir():
+                return 0, None
+            magic, longueur, sequence = _ENTETE.unpack_from(self._map, 0)
+            if magic != MAGIC or sequence == 0:
+                return 0, None
+            if sequence & 1:
+                # Écriture en cours
+                time.sleep(0.0005)
+                continue
+            if sequence == self.sequence and self._dernier is not None:
+                return sequence, self._dernier
+            if DEBUT_CONTENU + longueur > len(self._map):
+                # Le segment a été agrandi par l'écrivain
+                self._ouvrir()
+                continue
+            contenu = bytes(self._map[DEBUT_CONTENU:DEBUT_CONTENU + longueur])
+            if _ENTETE.unpack_from(self._map, 0)[2] != sequence:
+                continue
+            self.sequence, self._dernier = sequence, contenu
+            return sequence, contenu
+        return self.sequence, self._dernier
+
+    def _decoder(self, decodeur):
+        """(sequence, objet décodé) ; le contenu n'est re-décodé que s'il a changé"""
+        sequence, contenu = self.lire()
+        if contenu is None:
+            return 0, None
+        with self._verrou:
+            if (sequence, decodeur) != self._sequence_objet:
+                self._sequence_objet, self._objet = (sequence, decodeur), decodeur(contenu)
+            return sequence, self._objet
+
+    def lire_snapshot(self):
+        """Retourne (sequence, snapshot complet au format dict) ou (0, None)"""
+        return self._decoder(codec_snapshot.decoder)
+
+    def lire_vue(self):
+        """Retourne (sequence, VueSnapshot) ou (0, None) : relevés en colonnes, sans dict par parking"""
+        return self._decoder(codec_snapshot.decoder_vue)
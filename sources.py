@@ -0,0 +1,194 @@
+"""Sources de données des parkings, fusionnées en un seul snapshot
+
+1. L'API open data AMP Métropole : une requête (par page de 100) pour tous les parkings
+   des villes du registre qui ont une `commune_amp`.
+   Seuls les parkings qu'elle publie en temps réel, avec un relevé de moins de
+   AGE_MAX_AMP secondes et une capacité non nulle, sont retenus.
+2. Le scraping des pages Semepa (scraper.py), pour les parkings absents de l'API
+   ou dont les données ne sont pas en temps réel, trop anciennes, ou qui sont
+   hors service (la page Semepa donne alors le message de fermeture).
+
+Une source en panne (disjoncteur ouvert, voir disjoncteur.py) est
+sautée sans attendre : ses parkings passent directement à la source suivante.
+"""
+import time
+import unicodedata
+from datetime import datetime
+from urllib.parse import urlparse
+
+import disjoncteur
+import metriques
+from disjoncteur import DisjoncteurOuvert
+from enregistrements import FIXTURES_MODE
+from registre import registre
+from scraper import classer_erreur, construire_releve, interpreter_page, parkings, scraper_parkings, sessions, TIMEOUT
+
+AMP_URL = 'https://data.ampmetropole.fr/api/explore/v2.0/catalog/datasets/disponibilites-des-places-de-parkings/records'
+# Taille de page maximale de l'API (Opendatasoft v2.0)
+AMP_LIMITE = 100
+# Âge maximal (s) d'un relevé AMP ; au-delà, le parking passe à Semepa. Les réponses
+# rejouées datent de leur enregistrement : pas de limite en mode fixtures 'rejouer'
+AGE_MAX_AMP = None if FIXTURES_MODE == 'rejouer' else 15 * 60
+
+
+def normaliser_nom(nom):
+    """Nom sans accents, casse ni préfixe 'Parking', pour rapprocher 'PARKING MEJANES' (AMP) et 'Méjanes'"""
+    nom = unicodedata.normalize('NFKD', nom)
+    nom = ''.join(c for c in nom if not unicodedata.combining(c)).strip().lower()
+    return nom.removeprefix('parking ').strip()
+
+
+def date_releve(enregistrement):
+    """Date (epoch) d'un enregistrement de l'API, None si absente ou illisible"""
+    try:
+        return int(datetime.fromisoformat(enregistrement['timestamp']).timestamp())
+    except (KeyError, TypeError, ValueError):
+        return None
+
+
+def _vrai(valeur):
+    """Le champ tempsreel peut être un booléen ou une chaîne 'True' / 'False'"""
+    return str(valeur).strip().lower() in ('true', '1', 'oui')
+
+
+class SourceAMP:
+    """API open data de la Métropole (source principale, une requête par sweep)"""
+
+    nom = 'amp'
+
+    def __init__(self):
+        communes = {}
+        self._index = {}
+        for ville, config in registre.villes.items():
+            if config['commune_amp']:
+                communes[config['commune_amp']] = None
+                for nom in config['noms']:
+                    self._index[(normaliser_nom(config['commune_amp']), normaliser_nom(nom))] = nom
+        self.communes = list(communes)
+        # Dernière page lue pour chaque offset : servie telle quelle sur une réponse 304
+        self._pages = {}
+
+    def parametres(self, offset=0):
+        """Paramètres de la requête : toutes les communes du registre, une page de résultats"""
+        params = {
+            'limit': AMP_LIMITE,
+            'where': ' OR '.join(f"commune='{commune}'" for commune in self.communes)
+        }
+        if offset:
+            params['offset'] = offset
+        return params
+
+    def _page(self, offset):
+        hote = urlparse(AMP_URL).netloc
+        mesure = metriques.commencer_mesure()
+        try:
+            response = sessions.get(AMP_URL, params=self.parametres(offset), timeout=TIMEOUT)
+            ttfb = time.perf_counter() - mesure.debut
+            try:
+                if response.status_code == 304:
+                    metriques.terminer_mesure(hote, None, 'non_modifie', ttfb, 0)
+                    page = self._pages.get(offset)
+                else:
+                    response.raise_for_status()
+                    page = response.json()
+            finally:
+                sessions.liberer(response)
+        except Exception as e:
+            metriques.terminer_mesure(hote, None, classer_erreur(e))
+            raise
+        if response.status_code == 304:
+            if page is not None:
+                return page
+            # Validateurs d'une page jamais lue par cette source : requête complète
+            sessions.oublier(AMP_URL, self.parametres(offset))
+            return self._page(offset)
+        metriques.terminer_mesure(hote, None, 'json', ttfb, len(response.content))
+        self._pages[offset] = page
+        return page
+
+    def enregistrements(self):
+        """Tous les enregistrements des communes, page par page"""
+        enregistrements, offset = [], 0
+        while True:
+            page = self._page(offset)
+            enregistrements.extend(page.get('records', []))
+            offset += AMP_LIMITE
+            if offset >= page.get('total_count', 0):
+                break
+        return enregistrements
+
+    def recuperer(self, noms):
+        """Relevés des parkings demandés que l'API fournit en temps réel, datés de l'API"""
+        if not self.communes:
+            return {}
+        # Une seule requête par sweep : disjoncteur à échecs consécutifs, propre à la source
+        if not disjoncteur.sources[self.nom].autorise():
+            metriques.resultats.inc(hote=urlparse(AMP_URL).netloc, resultat='disjoncte')
+            raise DisjoncteurOuvert(self.nom)
+        try:
+            enregistrements = self.enregistrements()
+        except Exception:
+            disjoncteur.sources[self.nom].echec()
+            raise
+        disjoncteur.sources[self.nom].succes()
+        demandes = set(noms)
+        maintenant = time.time()
+        data = {}
+        for enregistrement in enregistrements:
+            record = enregistrement.get('record', {})
+            fields = record.get('fields', {})
+            cle = (normaliser_nom(fields.get('commune', '')), normaliser_nom(fields.get('nom', '')))
+            nom = self._index.get(cle)
+            if nom not in demandes or not _vrai(fields.get('tempsreel')):
+                continue
+            dispo = fields.get('voitureplacesdisponibles')
+            ts = date_releve(record)
+            if dispo is None or ts is None:
+                continue
+            if AGE_MAX_AMP is not None and maintenant - ts > AGE_MAX_AMP:
+                continue
+            # L'API n'a pas de champ d'ouverture : un parking hors service y publie
+            # une capacité nulle, et son statut est laissé à la page Semepa
+            if not fields.get('voitureplacescapacite', 1):
+                continue
+            _, _, capacite, lat, lon = parkings[nom]
+            places, affichage, statut = interpreter_page(int(dispo), capacite)
+            data[nom] = construire_releve(places, capacite, affichage, statut, lat, lon, ts)
+        return data
+
+
+class SourceSemepa:
+    """Scraping des pages Semepa, une requête par parking (source de repli)"""
+
+    nom = 'semepa'
+
+    def recuperer(self, noms):
+        return scraper_parkings(noms)
+
+
+SOURCES = [SourceAMP(), SourceSemepa()]
+
+
+def actualiser():
+    """Reconstruit la source AMP (communes, index des noms) après un rechargement du registre"""
+    SOURCES[:] = [SourceAMP() if isinstance(source, SourceAMP) else source for source in SOURCES]
+
+
+def collecter(noms=None, sources=SOURCES):
+    """Interroge les sources dans l'ordre ; chacune ne reçoit que les parkings encore manquants"""
+    restants = list(parkings) if noms is None else list(noms)
+    data = {}
+    for source in sources:
+        if not restants:
+            break
+        try:
+            obtenus = source.recuperer(restants)
+        except Exception as e:
+            print(f"Source {source.nom} indisponible: {e}")
+            continue
+        for nom, releve in obtenus.items():
+            releve['Source'] = source.nom
+            data[nom] = releve
+        restants = [nom for nom in restants if nom not in data]
+    # Ordre du registre, comme scraper_parkings()
+    return {nom: data[nom] for nom in (parkings if noms is None else noms) if nom in data}
@@ -0,0 +1,135 @@
+"""Vues du dashboard par ville : filtrage et pagination des parkings, carte
+
+Fonctions sans Streamlit, pour pouvoir les mesurer (benchmarks/bench_multi_villes.py)
+et les appeler hors du dashboard (carte précalculée par le collecteur, cache_partage.py).
+Seule la page de cartes affichée est construite, quel que soit le nombre de parkings.
+"""
+import math
+
+import numpy as np
+import pandas as pd
+
+from modele import OUVERT, QUALITE_INCONNUE, SnapshotParkings
+
+PAR_PAGE = 30
+
+
+def preparer_vue(modele, noms):
+    """DataFrame trié par places libres, total des places et nombre d'ouverts des parkings `noms`
+
+    `modele` : SnapshotParkings. Les colonnes sont typées (entiers, flottants) ; les
+    chaînes d'affichage et la couleur de la carte sont dérivées pour ces seuls parkings.
+    Les relevés suspects (anomalies.py) restent affichés mais ne comptent pas dans le total.
+    """
+    indices = modele.presents(modele.meta.indices(noms))
+    ordre = np.argsort(-modele.releves['places'][indices], kind='stable')
+    indices = indices[ordre]
+    releves, meta = modele.releves[indices], modele.meta
+    df = pd.DataFrame({
+        'Places': releves['places'],
+        'Capacite': meta.capacites[indices],
+        'Affichage': modele.affichages(indices),
+        'Statut': modele.libelles_statut(indices),
+        'Timestamp': modele.heures(indices),
+        'latitude': meta.latitudes[indices],
+        'longitude': meta.longitudes[indices],
+        'Age': np.where(releves['age'] >= 0, releves['age'], np.nan),
+        'Couleur': modele.couleurs(indices),
+        'Qualite': np.where(releves['qualite'] != QUALITE_INCONNUE, releves['qualite'], np.nan),
+        'Anomalies': modele.libelles_anomalies(indices),
+    }, index=pd.Index(meta.noms_tableau[indices], dtype=object))
+    total = int(releves['places'][~modele.suspects(indices)].sum())
+    return df, total, int((releves['statut'] == OUVERT).sum())
+
+
+def filtrer(df, texte='', ouverts_seulement=False):
+    """Parkings dont le nom contient `texte` (sans casse), éventuellement ouverts seulement"""
+    masque = pd.Series(True, index=df.index)
+    if texte:
+        masque &= df.index.astype(str).str.contains(texte, case=False, regex=False)
+    if ouverts_seulement:
+        masque &= df['Statut'] == '✅ Ouvert'
+    return df[masque]
+
+
+def nombre_pages(df, par_page=PAR_PAGE):
+    """Nombre de pages de cartes (au moins une)"""
+    return max(1, math.ceil(len(df) / par_page))
+
+
+def cartes_page(df, page, par_page=PAR_PAGE):
+    """Contenu des cartes de la page `page` (à partir de 1) :
+    (nom, statut, affichage, heure, âge, qualité, anomalies)
+
+    L'âge (secondes) n'est renseigné que pour une dernière valeur connue, servie
+    à la place d'un relevé en échec (voir collector.fusionner) ; la qualité (%)
+    pour un parking déjà évalué par la détection d'anomalies.
+    """
+    tranche = df.iloc[(page - 1) * par_page:page * par_page]
+    ages = [None if math.isnan(age) else int(age) for age in tranche['Age'].tolist()]
+    qualites = [None if math.isnan(qualite) else int(qualite) for qualite in tranche['Qualite'].tolist()]
+    return list(zip(tranche.index, tranche['Statut'], tranche['Affichage'], tranche['Timestamp'], ages,
+                    qualites, tranche['Anomalies']))
+
+
+def carte_html(df, centre, zoom=15):
+    """HTML complet de la carte Folium des parkings d'une vue (preparer_vue)"""
+    # Import à la demande : Folium (~0,6 s au démarrage) n'est chargé que si une carte est construite
+    import folium
+
+    # Créer la map Folium avec tuiles Google Maps
+    m = folium.Map(
+        location=list(centre),
+        zoom_start=zoom,
+        tiles="https://mt1.google.com/vt/lyrs=m&x={x}&y={y}&z={z}",
+        attr="Google"
+    )
+
+    # Ajouter les marqueurs pour chaque parking
+    for nom, row in df.iterrows():
+        # Couleur dérivée avec le DataFrame (modele.SnapshotParkings.couleurs)
+        color = row['Couleur']
+
+        popup_text = f"""
+        <b>{nom}</b><br/>
+        Places: {row['Affichage']}<br/>
+        Statut: {row['Statut']}<br/>
+        MAJ: {row['Timestamp']}
+        """
+        if row['Anomalies']:
+            popup_text += f"<br/>Relevé suspect : {row['Anomalies']}"
+        if not math.isnan(row['Qualite']):
+            popup_text += f"<br/>Qualité des données : {int(row['Qualite'])} %"
+
+        folium.CircleMarker(
+            location=[row['latitude'], row['longitude']],
+            radius=15,
+            popup=folium.Popup(popup_text, max_width=250),
+            tooltip=f"{nom}: {row['Affichage']}",
+            color=color,
+            fill=True,
+            fillColor=color,
+            fillOpacity=0.7,
+            weight=2
+        ).add_to(m)
+
+    return m.get_root().render()
+
+
+def famille_carte(ville):
+    """Famille des cartes d'une ville dans le cache partagé (cache_partage.py)"""
+    return f'carte-{ville}'
+
+
+def precalculer_cartes(rendus, snapshot, meta, villes):
+    """Écrit dans le cache partagé la carte de chaque ville d'un snapshot (dict) publié
+
+    `villes` : ville -> configuration du registre (noms, centre). La version est
+    celle que lit le dashboard : (séquence, date) du snapshot.
+    """
+    modele = SnapshotParkings.depuis_releves(snapshot['parkings'], meta)
+    version = (snapshot['sequence'], snapshot['ts'])
+    for ville, config in villes.items():
+        if rendus.lire(famille_carte(ville), version) is None:
+            df = preparer_vue(modele, config['noms'])[0]
+            rendus.ecrire(famille_carte(ville), version, carte_html(df, config['centre']))